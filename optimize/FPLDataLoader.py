@@ -1,29 +1,17 @@
-from fpl import FPL
-import aiohttp
-import asyncio
-import pandas as pd
-import numpy as np
-import pulp
-from fixtures import get_fdr_adj
-from fixtures import detect_gw_num
+from .snapshot import SnapshotStore, fetch_all_players, fetch_players, fetch_team_fixtures
 
 class FPLDataLoader:
-    def __init__(self, apply_filters, current_gameweek) -> None:
+    def __init__(self, apply_filters, current_gameweek, store=None) -> None:
         self.apply_filters = apply_filters
         self.current_gameweek = current_gameweek
+        self.store = store or SnapshotStore()
 
-    async def get_all_players(ret_json=True) -> dict:
-        session = aiohttp.ClientSession()
-        fpl = FPL(session)
-        players = await fpl.get_players(return_json = ret_json)
-        await session.close()
-        return players
+    async def get_all_players(self, ret_json=True) -> dict:
+        return await fetch_all_players(ret_json, self.store)
 
-    async def get_players(pids):
-        async with aiohttp.ClientSession() as session:
-            fpl = FPL(session)
-            players = await fpl.get_players(
-                    pids,
-                    include_summary=True)
-        return players
-        
\ No newline at end of file
+    async def get_players(self, pids):
+        return await fetch_players(pids, self.store)
+
+    async def get_team_fixtures(self, team_id):
+        return await fetch_team_fixtures(team_id, self.store)
+        
@@ -0,0 +1,47 @@
+"""FPL squad optimizer.
+
+Importing the package does nothing but define names; each one below is
+resolved from its module on first use, so ``import optimize`` does not pull in
+aiohttp, pandas, pulp, scipy or pyomo. Functions named like their module are
+exported as ``run_<name>``: once the submodule is imported, the package
+attribute of that name is the module.
+"""
+
+__version__ = "0.1.0"
+
+_EXPORTS = {
+    "SnapshotStore": "snapshot",
+    "SnapshotMiss": "snapshot",
+    "run_ingest": ("ingest", "ingest"),
+    "refresh": "ingest",
+    "IngestResult": "ingest",
+    "PlayerTable": "player_table",
+    "HistoryMatrix": "scoring",
+    "HistoryStore": "history_store",
+    "FixtureTensor": "fixtures",
+    "CandidatePool": "pool",
+    "prune_dominated": "pruning",
+    "select_team": "selection",
+    "select_team_highs": "selection",
+    "select_team_dp": "dp_solver",
+    "select_team_two_stage": "two_stage",
+    "plan_transfers": "transfers",
+    "Projector": "projection",
+    "SquadModel": "squad_model",
+    "Trace": "tracing",
+    "run_backtest": ("backtest", "backtest"),
+    "generate_league": "synthetic",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    import importlib
+    module, attr = module if isinstance(module, tuple) else (module, name)
+    value = getattr(importlib.import_module("." + module, __name__), attr)
+    globals()[name] = value
+    return value
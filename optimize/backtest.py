@@ -0,0 +1,356 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .fixtures import FixtureTensor
+from .pruning import prune_dominated
+from .scoring import HISTORY_STATS, SEASON_GAMEWEEKS, HistoryMatrix, linear_kernel
+from .selection import STARTING_LIMITS
+from .sweep import grid
+
+# Replays a finished (part of a) season: before each gameweek's deadline the
+# expected scores are rebuilt from the rounds already played, the squad is
+# selected, and the pick is scored on what actually happened that gameweek,
+# with the game's auto-substitution and vice-captain rules. Every
+# (strategy, gameweek) pair is one job on a process pool.
+#
+# Only the fixture list and each round's prices are taken "from the future";
+# both are known at the deadline. Injury flags are not kept historically and
+# ownership only as a count of managers, so backtests select without them (no
+# differential limits).
+
+STRATEGY_DEFAULTS = {
+    "depth": 5,
+    "num_gws": 1,
+    "fdr_horizon": 5,
+    "fdr_weight": 0.0,
+    "sub_factor": 0.2,
+    "total_budget": 100.0,
+    "min_minutes": 18.5,  # per gameweek played so far; the scripts' 500 by gameweek 27
+    "solver": "highs",
+    "model": "kernel",  # or "fitted": projection.Projector instead of the linear kernel
+}
+STRATEGY_PARAMS = tuple(STRATEGY_DEFAULTS)
+BACKTEST_STATS = HISTORY_STATS + ("value", "selected")
+FIXTURE_COLUMNS = ("element", "round", "fixture", "opponent_team", "was_home")
+
+_season = None
+
+
+class Season:
+    """Everything a backtest reads about one season, as players x gameweeks arrays.
+
+    ``prices[:, g - 1]`` is the price in gameweek g (the last known one for
+    rounds a player did not feature in), and ``fixtures`` is built from the
+    fixtures the players actually played, so doubles and blanks are exact.
+    """
+
+    def __init__(self, ids, names, positions, clubs, prices, history, fixtures) -> None:
+        self.ids = ids
+        self.names = names
+        self.positions = positions
+        self.clubs = clubs
+        self.prices = prices
+        self.history = history
+        self.fixtures = fixtures
+        self._projector = None
+
+    @classmethod
+    def from_ingest(cls, data, num_gameweeks=SEASON_GAMEWEEKS):
+        # an IngestResult (a snapshot, or synthetic.generate_league)
+        from .history_store import records_from_summaries
+        players = [p for p in data.players if p["id"] in data.summaries]
+        history = HistoryMatrix.from_players([{"id": p["id"], **data.summaries[p["id"]]} for p in players],
+                                             BACKTEST_STATS, num_gameweeks)
+        records = list(records_from_summaries({p["id"]: data.summaries[p["id"]] for p in players}))
+        rows = {c: np.asarray([float(r.get(c) or 0) for r in records]) for c in FIXTURE_COLUMNS}
+        return cls.from_history(players, history, rows, data.bootstrap.get("teams", []))
+
+    @classmethod
+    def from_store(cls, store, season, players, teams=(), num_gameweeks=SEASON_GAMEWEEKS):
+        # a HistoryStore season plus that season's bootstrap elements (and teams) for positions and clubs
+        players = [p for p in players if store.player_rows(season, p["id"]).stop]
+        history = store.matrix(season, [p["id"] for p in players], BACKTEST_STATS, num_gameweeks=num_gameweeks)
+        rows = store.season_rows(season)
+        return cls.from_history(players, history, {c: np.asarray(store.column(c, rows)) for c in FIXTURE_COLUMNS},
+                                teams)
+
+    @classmethod
+    def from_history(cls, players, history, rows, teams=()):
+        ids = np.array([p["id"] for p in players], dtype=int)
+        clubs = np.array([p["team"] for p in players], dtype=int)
+        # difficulty of a fixture: the opponent's strength, 3 when the teams list has none
+        strength = {t["id"]: t.get("strength", 3) for t in teams}
+
+        # one fixture per (club, fixture id), taken from any player of the club who has the row
+        order = np.argsort(ids)
+        row_player = order[np.searchsorted(ids, rows["element"].astype(int), sorter=order)]
+        row_club = clubs[row_player]
+        _, first = np.unique(np.column_stack([row_club, rows["fixture"].astype(int)]), axis=0, return_index=True)
+        team_fixtures = {int(c): [] for c in np.unique(clubs)}
+        for i in first:
+            team_fixtures[int(row_club[i])].append({
+                "event": int(rows["round"][i]), "is_home": bool(rows["was_home"][i]),
+                "difficulty": strength.get(int(rows["opponent_team"][i]), 3)})
+        fixtures = FixtureTensor.from_team_fixtures(team_fixtures, history.num_gameweeks)
+
+        # price per round: mean value over that round's fixtures, carried forward then back
+        current = np.array([p["now_cost"] for p in players], dtype=float)
+        played = history.appearances > 0
+        value = np.divide(history.stats["value"], history.appearances, out=np.zeros(played.shape), where=played)
+        last = np.maximum.accumulate(np.where(played, np.arange(played.shape[1]), -1), axis=1)
+        first_seen = np.where(played.any(axis=1), played.argmax(axis=1), -1)
+        last = np.where(last >= 0, last, first_seen[:, None])
+        prices = np.where(last >= 0, np.take_along_axis(value, np.maximum(last, 0), axis=1), current[:, None]) / 10.0
+
+        return cls(ids=ids,
+                   names=np.array([p.get("web_name", str(p["id"])) for p in players]),
+                   positions=np.array([p["element_type"] for p in players], dtype=int),
+                   clubs=clubs, prices=prices, history=history, fixtures=fixtures)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def last_gameweek(self) -> int:
+        # the last round with any recorded appearance
+        played = np.flatnonzero(self.history.appearances.any(axis=0))
+        return int(played[-1]) + 1 if len(played) else 0
+
+    def history_before(self, gameweek) -> HistoryMatrix:
+        # the season as it looked at the gameweek's deadline: later rounds zeroed
+        cut = gameweek - 1
+        stats = {}
+        for s, m in self.history.stats.items():
+            m = m.copy()
+            m[:, cut:] = 0
+            stats[s] = m
+        appearances = self.history.appearances.copy()
+        appearances[:, cut:] = 0
+        return HistoryMatrix(self.history.player_ids, stats, appearances)
+
+    def projector(self, gameweek):
+        # the fitted model as of the deadline; moving forward only observes the new rounds
+        from .projection import Projector, season_round
+        if self._projector is None or self._projector.gameweek > gameweek:
+            self._projector = Projector.from_season(self, gameweek)
+        while self._projector.gameweek < gameweek:
+            self._projector.observe(*season_round(self, self._projector.gameweek))
+        return self._projector
+
+    def expected_scores(self, gameweek, strategy) -> np.ndarray:
+        # CandidatePool.expected_scores as of the deadline: form up to the previous round, fixtures from this one
+        if strategy.get("model") == "fitted":
+            num_gws = strategy["num_gws"]
+            weeks = self.projector(gameweek).project(range(gameweek, gameweek + num_gws))
+            return weeks @ np.round(1 - (1 / num_gws) * np.arange(num_gws), 2)
+        history = self.history_before(gameweek)
+        scores = history.score(linear_kernel(gameweek - 1, strategy["depth"], history.num_gameweeks))
+        scores = scores * self.fixtures.gw_num_factor(strategy["num_gws"], gameweek)[self.clubs]
+        if strategy["fdr_weight"]:
+            scores = scores * self.fixtures.fdr(strategy["fdr_horizon"], gameweek)[self.clubs] ** strategy["fdr_weight"]
+        return scores
+
+    def candidates(self, gameweek, strategy) -> np.ndarray:
+        minutes = self.history.stats["minutes"][:, :gameweek - 1].sum(axis=1)
+        return np.flatnonzero(minutes >= strategy["min_minutes"] * (gameweek - 1))
+
+
+def valid_lineup(positions, limits=STARTING_LIMITS) -> bool:
+    counts = np.bincount(positions, minlength=5)
+    return all(lo <= counts[p] <= hi for p, (lo, hi) in limits.items())
+
+
+def auto_subs(starters, bench, positions, minutes, limits=STARTING_LIMITS) -> list:
+    # the game's rule: each starter who did not play is replaced by the first bench player
+    # (in bench order) who did and keeps the formation valid; returns the final eleven
+    lineup = list(starters)
+    bench = [b for b in bench if minutes[b] > 0]
+    for i, s in enumerate(starters):
+        if minutes[s] > 0:
+            continue
+        for b in bench:
+            trial = lineup[:i] + [b] + lineup[i + 1:]
+            if valid_lineup(positions[trial], limits):
+                lineup = trial
+                bench.remove(b)
+                break
+    return lineup
+
+
+def score_gameweek(x, y, z, expected, positions, points, minutes) -> dict:
+    """Points the pick actually scored, with auto-subs and the vice-captain.
+
+    The bench is ordered by expected score (goalkeeper first, as the game
+    requires) and the vice-captain is the best expected starter after the
+    captain. ``points``/``minutes`` are the gameweek's actuals per player.
+    """
+    starters = list(np.flatnonzero(x))
+    bench = sorted(np.flatnonzero(z), key=lambda i: (positions[i] != 1, -expected[i]))
+    lineup = auto_subs(starters, bench, positions, minutes)
+    captain = int(np.flatnonzero(y)[0])
+    if minutes[captain] <= 0:
+        vice = [i for i in sorted(starters, key=lambda i: -expected[i]) if i != captain]
+        captain = next((i for i in vice if minutes[i] > 0 and i in lineup), None)
+    captain_points = float(points[captain]) if captain is not None else 0.0
+    lineup_points = float(points[lineup].sum())
+    return {"points": round(lineup_points + captain_points, 2),
+            "xi_points": round(float(points[starters].sum()), 2),
+            "captain_points": round(captain_points, 2),
+            "bench_points": round(float(points[bench].sum()), 2),
+            "autosubs": len(set(lineup) - set(starters)),
+            "objective": round(float((expected * (x + y)).sum()), 3)}
+
+
+def select(season, gameweek, strategy):
+    # candidates, their expected scores and the chosen (x, y, z) as of the deadline
+    cand = season.candidates(gameweek, strategy)
+    scores = season.expected_scores(gameweek, strategy)[cand]
+    prices = season.prices[cand, gameweek - 1]
+    positions, clubs = season.positions[cand], season.clubs[cand]
+    keep = prune_dominated(scores, prices, positions, clubs, verbose=False)
+    cand, scores, prices, positions, clubs = cand[keep], scores[keep], prices[keep], positions[keep], clubs[keep]
+    if strategy["solver"] == "two-stage":
+        from .two_stage import select_team_two_stage
+        x, y, z = select_team_two_stage(scores, prices, positions, clubs, total_budget=strategy["total_budget"],
+                                        sub_factor=strategy["sub_factor"], verbose=False)
+    elif strategy["solver"] == "dp":
+        from .dp_solver import select_team_dp
+        x, y, z = select_team_dp(scores, prices, positions, clubs, total_budget=strategy["total_budget"],
+                                 sub_factor=strategy["sub_factor"], verbose=False)
+    else:
+        from .selection import select_team_highs
+        x, y, z = select_team_highs(scores, prices, positions, clubs, total_budget=strategy["total_budget"],
+                                    sub_factor=strategy["sub_factor"], verbose=False)
+    return cand, scores, (x, y, z)
+
+
+def _init(season):
+    global _season
+    _season = season
+
+
+def run_gameweek(job) -> dict:
+    strategy, gameweek = job
+    season = _season
+    row = {**strategy, "gameweek": gameweek}
+    start = time.perf_counter()
+    try:
+        cand, scores, (x, y, z) = select(season, gameweek, strategy)
+        points = season.history.stats["total_points"][cand, gameweek - 1]
+        minutes = season.history.stats["minutes"][cand, gameweek - 1]
+        row.update(score_gameweek(x, y, z, scores, season.positions[cand], points, minutes))
+        row["cost"] = round(float(season.prices[cand, gameweek - 1][(x + z) > 0].sum()), 1)
+        row["captain"] = int(season.ids[cand][y.argmax()])
+        row["squad"] = [int(i) for i in season.ids[cand][(x + z) > 0]]
+    except (RuntimeError, ValueError) as e:
+        row["error"] = str(e)
+    row["solve_seconds"] = round(time.perf_counter() - start, 4)
+    return row
+
+
+def strategies(**axes) -> list:
+    # every combination of the given values, the rest from STRATEGY_DEFAULTS
+    unknown = set(axes) - set(STRATEGY_DEFAULTS)
+    if unknown:
+        raise ValueError("unknown strategy parameters: {}".format(", ".join(sorted(unknown))))
+    return [{**STRATEGY_DEFAULTS, **s} for s in grid(**axes)]
+
+
+def backtest(season, strategies, gameweeks, workers=None) -> list:
+    """One result row per (strategy, gameweek), run on a process pool.
+
+    The season is sent to each worker once at start-up; ``workers=0`` runs
+    everything in this process.
+    """
+    jobs = [(s, g) for s in strategies for g in gameweeks]
+    if workers == 0:
+        _init(season)
+        return [run_gameweek(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(season,)) as executor:
+        return list(executor.map(run_gameweek, jobs, chunksize=max(1, len(jobs) // (4 * (workers or 4)))))
+
+
+def summarize(rows) -> list:
+    # per strategy: total and mean points over the gameweeks it completed, best first
+    groups = {}
+    for row in rows:
+        groups.setdefault(json.dumps({k: row[k] for k in STRATEGY_PARAMS}, sort_keys=True), []).append(row)
+    summary = []
+    for key, group in groups.items():
+        points = np.array([r["points"] for r in group if "error" not in r])
+        summary.append({**json.loads(key), "gameweeks": len(points), "errors": len(group) - len(points),
+                        "total": round(float(points.sum()), 1),
+                        "mean": round(float(points.mean()), 2) if len(points) else None,
+                        "std": round(float(points.std()), 2) if len(points) else None,
+                        "captain_points": round(sum(r.get("captain_points", 0) for r in group), 1),
+                        "autosubs": sum(r.get("autosubs", 0) for r in group)})
+    return sorted(summary, key=lambda s: -s["total"])
+
+
+def load_season(args):
+    if args.store:
+        from .history_store import HistoryStore
+        from .snapshot import SnapshotStore
+        snap = SnapshotStore(args.snapshot_dir, offline=True)
+        bootstrap = snap.require("bootstrap", snap.current_gameweek())
+        return Season.from_store(HistoryStore(args.store), args.season, bootstrap["elements"], bootstrap["teams"])
+    if args.synthetic is not None:
+        from .synthetic import generate_league
+        return Season.from_ingest(generate_league(num_players=args.players, current_gameweek=SEASON_GAMEWEEKS + 1,
+                                                  seed=args.synthetic))
+    import asyncio
+    from .ingest import ingest, use_selector_event_loop
+    from .snapshot import SnapshotStore
+    use_selector_event_loop()
+    return Season.from_ingest(asyncio.run(ingest(SnapshotStore(args.snapshot_dir, offline=True))))
+
+
+def main(argv=None, prog=None) -> None:
+    parser = argparse.ArgumentParser(prog=prog, description="Replay past gameweeks to compare selection strategies")
+    data = parser.add_argument_group("data (default: the snapshot's current season so far)")
+    data.add_argument("--snapshot-dir", default=None)
+    data.add_argument("--synthetic", type=int, default=None, metavar="SEED", help="a generated full season")
+    data.add_argument("--players", type=int, default=600, help="players in the generated season")
+    data.add_argument("--store", default=None, help="a history store; positions and clubs from the snapshot")
+    data.add_argument("--season", default=None, help="season name in --store")
+    parser.add_argument("--start", type=int, default=6, help="first gameweek to replay")
+    parser.add_argument("--end", type=int, default=None, help="last gameweek (default: the last one played)")
+    parser.add_argument("--depth", type=int, nargs="+", default=[STRATEGY_DEFAULTS["depth"]])
+    parser.add_argument("--num-gws", type=int, nargs="+", default=[STRATEGY_DEFAULTS["num_gws"]])
+    parser.add_argument("--fdr-horizon", type=int, nargs="+", default=[STRATEGY_DEFAULTS["fdr_horizon"]])
+    parser.add_argument("--fdr-weight", type=float, nargs="+", default=[STRATEGY_DEFAULTS["fdr_weight"]])
+    parser.add_argument("--sub-factor", type=float, nargs="+", default=[STRATEGY_DEFAULTS["sub_factor"]])
+    parser.add_argument("--total-budget", type=float, nargs="+", default=[STRATEGY_DEFAULTS["total_budget"]])
+    parser.add_argument("--min-minutes", type=float, nargs="+", default=[STRATEGY_DEFAULTS["min_minutes"]])
+    parser.add_argument("--solver", choices=("highs", "two-stage", "dp"), nargs="+", default=[STRATEGY_DEFAULTS["solver"]])
+    parser.add_argument("--model", choices=("kernel", "fitted"), nargs="+", default=[STRATEGY_DEFAULTS["model"]])
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (0: run in-process)")
+    parser.add_argument("--out", default=None, help="write every result row to this JSON file")
+    args = parser.parse_args(argv)
+    if args.store and not args.season:
+        parser.error("--store needs --season")
+
+    start = time.perf_counter()
+    season = load_season(args)
+    end = args.end or season.last_gameweek
+    configs = strategies(**{k: getattr(args, k) for k in STRATEGY_PARAMS})
+    rows = backtest(season, configs, range(args.start, end + 1), args.workers)
+    summary = summarize(rows)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"gameweeks": [args.start, end], "summary": summary, "rows": rows}, f, indent=1)
+
+    varying = [k for k in STRATEGY_PARAMS if len(getattr(args, k)) > 1] or ["depth"]
+    print(" ".join(f"{k:>12s}" for k in varying) + f" {'total':>8s} {'mean':>6s} {'std':>6s} {'errors':>6s}")
+    for s in summary:
+        print(" ".join(f"{s[k]!s:>12s}" for k in varying) +
+              f" {s['total']:8.1f} {s['mean'] or 0:6.2f} {s['std'] or 0:6.2f} {s['errors']:6d}")
+    print("{} strategies x {} gameweeks in {:.1f}s".format(len(configs), end - args.start + 1,
+                                                          time.perf_counter() - start), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
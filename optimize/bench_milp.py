@@ -0,0 +1,52 @@
+import argparse
+import time
+import numpy as np
+import pulp
+from scipy.optimize import Bounds, milp
+from .selection import build_team_model, build_squad_milp
+
+# Build and solve time of the pulp/CBC select_team model against the sparse
+# matrix model handed to HiGHS, on synthetic pools of increasing size.
+
+
+def synthetic_pool(n, num_clubs=20, seed=0):
+    rng = np.random.default_rng(seed)
+    positions = rng.choice([1, 2, 3, 4], size=n, p=[0.1, 0.34, 0.4, 0.16])
+    clubs = rng.integers(1, num_clubs + 1, size=n)
+    quality = rng.gamma(2.0, 1.0, size=n)
+    prices = np.round(np.clip(4.0 + 1.5 * quality + rng.normal(0, 0.7, n), 4.0, 14.0), 1)
+    scores = np.round(np.clip(quality * 6 + rng.normal(0, 3, n), 0, None), 2)
+    differentials = np.round(rng.gamma(0.8, 8.0, size=n), 1)
+    return scores, prices, positions, clubs, differentials
+
+
+def bench_pulp(scores, prices, positions, clubs, differentials):
+    start = time.perf_counter()
+    model, *_ = build_team_model(scores, prices, positions, clubs, differentials)
+    built = time.perf_counter()
+    model.solve(pulp.PULP_CBC_CMD(msg=0))
+    done = time.perf_counter()
+    return built - start, done - built, model.objective.value()
+
+
+def bench_highs(scores, prices, positions, clubs, differentials):
+    start = time.perf_counter()
+    c, constraints = build_squad_milp(scores, prices, positions, clubs, differentials)
+    built = time.perf_counter()
+    res = milp(c, constraints=constraints, integrality=np.ones(len(c)), bounds=Bounds(0, 1))
+    done = time.perf_counter()
+    return built - start, done - built, -res.fun
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 300, 400, 500, 600, 700])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'n':>5s} {'pulp build':>11s} {'cbc solve':>10s} {'mat build':>10s} {'highs solve':>12s} {'obj diff':>9s}")
+    for n in args.sizes:
+        pool = synthetic_pool(n, seed=n)
+        p = min((bench_pulp(*pool) for _ in range(args.repeats)), key=lambda r: r[0] + r[1])
+        h = min((bench_highs(*pool) for _ in range(args.repeats)), key=lambda r: r[0] + r[1])
+        print(f"{n:5d} {p[0]:11.3f} {p[1]:10.3f} {h[0]:10.4f} {h[1]:12.3f} {abs(p[2] - h[2]):9.2e}")
@@ -0,0 +1,77 @@
+import argparse
+import time
+import numpy as np
+import pulp
+from .bench_milp import synthetic_pool
+from .dp_solver import select_team_dp
+from .selection import build_team_model, select_team_highs
+from .scoring import HistoryMatrix, linear_kernel
+from .snapshot import SnapshotStore
+
+# Wall time of the native DP solver against CBC and GLPK (through pulp) and
+# HiGHS on the same select_team model, on synthetic pools and, when a
+# snapshot is available, on the real player pool.
+
+
+def pool_from_snapshot(store, depth=5):
+    gameweek = store.current_gameweek()
+    players = store.require("players", gameweek)
+    summaries = store.require("summaries", gameweek)
+    players = [p for p in players if str(p["id"]) in summaries and p["minutes"] > 500
+               and (p["chance_of_playing_this_round"] is None or p["chance_of_playing_this_round"] > 50)]
+    history = HistoryMatrix.from_players([summaries[str(p["id"])] for p in players])
+    scores = np.round(history.score(linear_kernel(gameweek, depth)), 2)
+    prices = np.array([p["now_cost"] for p in players]) / 10.0
+    positions = np.array([p["element_type"] for p in players])
+    clubs = np.array([p["team"] for p in players])
+    return scores, prices, positions, clubs
+
+
+def run_pulp(solver):
+    def run(scores, prices, positions, clubs):
+        model, *_ = build_team_model(scores, prices, positions, clubs)
+        model.solve(solver)
+        return model.objective.value()
+    return run
+
+
+def run_dp(scores, prices, positions, clubs):
+    x, y, z = select_team_dp(scores, prices, positions, clubs, verbose=False)
+    return float(((x + y + 0.2 * z) * scores).sum())
+
+
+def run_highs(scores, prices, positions, clubs):
+    x, y, z = select_team_highs(scores, prices, positions, clubs, verbose=False)
+    return float(((x + y + 0.2 * z) * scores).sum())
+
+
+def available_solvers():
+    solvers = {"dp": run_dp, "highs": run_highs}
+    for name, solver in (("cbc", pulp.PULP_CBC_CMD(msg=0)), ("glpk", pulp.GLPK_CMD(msg=0))):
+        if solver.available():
+            solvers[name] = run_pulp(solver)
+    return solvers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 400, 700])
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--snapshot-dir", default=None, help="also benchmark the recorded real pool")
+    args = parser.parse_args()
+
+    pools = [("synthetic n={} seed={}".format(n, seed), synthetic_pool(n, seed=seed)[:4])
+             for n in args.sizes for seed in range(args.seeds)]
+    if args.snapshot_dir:
+        pools.insert(0, ("real", pool_from_snapshot(SnapshotStore(args.snapshot_dir, offline=True))))
+
+    solvers = available_solvers()
+    print(f"{'pool':28s}" + "".join(f"{name:>10s}" for name in solvers) + f"{'max diff':>10s}")
+    for label, pool in pools:
+        times, objectives = [], []
+        for run in solvers.values():
+            start = time.perf_counter()
+            objectives.append(run(*pool))
+            times.append(time.perf_counter() - start)
+        print(f"{label:28s}" + "".join(f"{t:10.3f}" for t in times)
+              + f"{max(objectives) - min(objectives):10.2e}")
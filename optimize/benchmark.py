@@ -0,0 +1,151 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+import pulp
+from scipy.optimize import Bounds, milp
+from .fixtures import FixtureTensor, get_fdr, get_gw_num_factor
+from .player_table import PlayerTable
+from .pool import CandidatePool
+from .scoring import HistoryMatrix, linear_kernel
+from .selection import build_squad_milp, build_team_model
+from .squad_model import SquadModel
+from .synthetic import generate_league
+
+# Times every stage of the pipeline on a generated league so runs are
+# comparable across commits: normalizing the bootstrap JSON, scoring history,
+# fixture factors, model construction and the solves. Results go to a JSON
+# file; --compare prints the ratio against an earlier one.
+
+DEPTH = 5
+
+
+def timed(fn, repeats):
+    # (result of the last call, list of wall times)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, times
+
+
+def score_loop(summaries, ids, gameweek, depth=DEPTH):
+    # the per-player loop the scripts used before HistoryMatrix
+    scores = []
+    for pid in ids:
+        points = 0
+        for i, gw in enumerate(summaries[pid]["history"][gameweek - depth:]):
+            points += ((i + 1) / depth) * gw["total_points"]
+        scores.append(points)
+    return scores
+
+
+def fixtures_loop(team_fixtures, cur_gw, horizon=5):
+    return {team: (get_fdr(fixtures, horizon), get_gw_num_factor(fixtures, 1, cur_gw))
+            for team, fixtures in team_fixtures.items()}
+
+
+def fixtures_tensor(team_fixtures, cur_gw, horizon=5):
+    tensor = FixtureTensor.from_team_fixtures(team_fixtures)
+    return tensor.fdr(horizon, cur_gw), tensor.gw_num_factor(1, cur_gw)
+
+
+def run(league, repeats=3, solve_repeats=1, pyomo=True) -> dict:
+    pool = CandidatePool.from_ingest(league)
+    gameweek, next_gw = pool.form_gameweek, pool.next_gameweek
+    ids = [int(i) for i in pool.ids]
+    scores = np.round(pool.expected_scores(depth=DEPTH), 3)
+    args = (scores, pool.prices, pool.positions, pool.clubs, pool.differentials)
+
+    stages = {}
+    _, stages["normalize"] = timed(lambda: pd.json_normalize(league.players), repeats)
+    _, stages["player_table"] = timed(lambda: PlayerTable.from_players(league.players), repeats)
+    _, stages["score_loop"] = timed(lambda: score_loop(league.summaries, ids, gameweek), repeats)
+    _, stages["score_matrix"] = timed(
+        lambda: HistoryMatrix.from_players([league.summaries[i] for i in ids]).score(linear_kernel(gameweek, DEPTH)),
+        repeats)
+    _, stages["fixtures_loop"] = timed(lambda: fixtures_loop(league.team_fixtures, next_gw), repeats)
+    _, stages["fixtures_tensor"] = timed(lambda: fixtures_tensor(league.team_fixtures, next_gw), repeats)
+
+    model, stages["build_pulp"] = timed(lambda: build_team_model(*args)[0], repeats)
+    _, stages["solve_cbc"] = timed(lambda: model.solve(pulp.PULP_CBC_CMD(msg=0)), solve_repeats)
+    objectives = {"cbc": model.objective.value()}
+
+    (c, constraints), stages["build_highs"] = timed(lambda: build_squad_milp(*args), repeats)
+    res, stages["solve_highs"] = timed(
+        lambda: milp(c, constraints=constraints, integrality=np.ones(len(c)), bounds=Bounds(0, 1)), solve_repeats)
+    objectives["highs"] = -res.fun
+
+    if pyomo:
+        squad, stages["build_pyomo"] = timed(lambda: SquadModel(scores, pool.prices, pool.positions, pool.clubs),
+                                             repeats)
+        _, stages["solve_pyomo"] = timed(squad.solve, solve_repeats)
+        objectives["pyomo_squad"] = squad.objective()
+
+    return {"stages": {name: {"min": min(t), "median": statistics.median(t), "runs": len(t)}
+                       for name, t in stages.items()},
+            "objectives": objectives,
+            "pool_size": len(pool)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current, baseline) -> None:
+    print(f"{'stage':16s} {'baseline':>10s} {'current':>10s} {'ratio':>7s}")
+    for name, stage in current["stages"].items():
+        old = baseline["stages"].get(name)
+        if old is None:
+            continue
+        print(f"{name:16s} {old['min']:10.4f} {stage['min']:10.4f} {stage['min'] / max(old['min'], 1e-9):7.2f}")
+
+
+def main(argv=None, prog=None) -> None:
+    parser = argparse.ArgumentParser(prog=prog, description="Benchmark the pipeline stages on a synthetic league")
+    parser.add_argument("--players", type=int, default=600)
+    parser.add_argument("--clubs", type=int, default=20)
+    parser.add_argument("--gameweek", type=int, default=27)
+    parser.add_argument("--double", type=int, nargs="*", default=[], help="clubs playing twice in --gameweek")
+    parser.add_argument("--blank", type=int, nargs="*", default=[], help="clubs without a fixture in --gameweek")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--solve-repeats", type=int, default=1)
+    parser.add_argument("--no-pyomo", action="store_true")
+    parser.add_argument("--out", default="benchmark.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    league = generate_league(args.players, args.clubs, current_gameweek=args.gameweek, seed=args.seed,
+                             double_gameweeks={args.gameweek: args.double}, blank_gameweeks={args.gameweek: args.blank})
+    generated = time.perf_counter() - start
+
+    results = run(league, args.repeats, args.solve_repeats, pyomo=not args.no_pyomo)
+    results["config"] = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+    results["generate_seconds"] = generated
+    results["commit"] = git_commit()
+    results["python"] = platform.python_version()
+    results["created"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for name, stage in results["stages"].items():
+        print(f"{name:16s} {stage['min']:10.4f}s")
+    print("pool {} players, objectives {}".format(results["pool_size"], results["objectives"]))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
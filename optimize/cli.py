@@ -0,0 +1,212 @@
+import argparse
+import sys
+
+# fpl-opt fetch|score|solve|bench|backtest|history|plan|project|serve. Only argparse is imported up front; each
+# command imports what it needs, so --help and cached runs start quickly.
+
+POSITION_NAMES = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+SOLVERS = ("highs", "two-stage", "dp", "cbc", "pyomo")
+
+
+def _store(args):
+    from .snapshot import SnapshotStore
+    return SnapshotStore(args.snapshot_dir, offline=True if args.offline else None)
+
+
+def _load(args, trace):
+    import asyncio
+    from .ingest import ingest, use_selector_event_loop
+    from .pool import CandidatePool
+    use_selector_event_loop()
+    with trace.stage("fetch") as span:
+        data = asyncio.run(ingest(_store(args)))
+        span.update(data.stats.as_dict() if data.stats else {"requests": 0, "cached": True})
+    with trace.stage("pool") as span:
+        pool = CandidatePool.from_ingest(data, args.min_minutes, args.min_chance)
+        span["players"] = len(pool)
+    with trace.stage("score"):
+        scores = pool.expected_scores(args.gameweek, args.depth, args.num_gws, args.fdr_horizon, args.fdr_weight)
+    return pool, scores
+
+
+def _snapshot_args(args, offline=True) -> list:
+    # the global snapshot flags, for commands that hand their arguments to a module's parser
+    forwarded = ["--snapshot-dir", args.snapshot_dir] if args.snapshot_dir else []
+    return forwarded + (["--offline"] if offline and args.offline else [])
+
+
+def cmd_fetch(args, trace) -> None:
+    import asyncio
+    from .ingest import ingest, refresh, use_selector_event_loop
+    use_selector_event_loop()
+    store = _store(args)
+    kw = {"concurrency": args.concurrency, "rate": args.rate}
+    with trace.stage("fetch") as span:
+        if args.refresh:
+            data = asyncio.run(refresh(store, **kw))
+        else:
+            data = asyncio.run(ingest(store, force=args.force, **kw))
+        span.update(data.stats.as_dict() if data.stats else {"requests": 0, "cached": True})
+    fetched = data.stats.requests if data.stats else 0
+    print("gameweek {}: {} players, {} requests, snapshot in {}".format(
+        data.gameweek, len(data.players), fetched, store.root))
+
+
+def cmd_score(args, trace) -> None:
+    import numpy as np
+    pool, scores = _load(args, trace)
+    order = np.argsort(-scores, kind="stable")[:args.top]
+    for i in order:
+        print(f"{pool.ids[i]:5d} {pool.names[i]:20s} {POSITION_NAMES[pool.positions[i]]:4s} "
+              f"{pool.clubs[i]:3d} {pool.prices[i]:5.1f} {scores[i]:7.2f}")
+
+
+def cmd_solve(args, trace) -> None:
+    import numpy as np
+    from .pruning import differential_groups, prune_dominated
+    pool, scores = _load(args, trace)
+    with trace.stage("prune") as span:
+        cand = np.flatnonzero(~np.isin(pool.ids, args.exclude))
+        # the squad-only pyomo and two-stage models have no ownership bands to respect
+        groups = None if args.solver in ("pyomo", "two-stage") else differential_groups(pool.differentials[cand])
+        keep = cand[prune_dominated(scores[cand], pool.prices[cand], pool.positions[cand], pool.clubs[cand],
+                                    groups=groups, verbose=False)]
+        span.update(before=len(pool), after=len(keep))
+    args_ = (scores[keep], pool.prices[keep], pool.positions[keep], pool.clubs[keep])
+
+    with trace.stage("solve", solver=args.solver) as span:
+        if args.solver == "pyomo":
+            from .squad_model import SquadModel
+            model = SquadModel(*args_, budget=args.budget)
+            squad = np.zeros(len(keep), dtype=int)
+            squad[model.solve()] = 1
+            span.update(model.stats)
+            x, y, z = squad, np.zeros_like(squad), np.zeros_like(squad)
+        elif args.solver == "dp":
+            from .dp_solver import select_team_dp
+            x, y, z = select_team_dp(*args_, total_budget=args.budget, sub_factor=args.sub_factor, verbose=False)
+        elif args.solver == "two-stage":
+            from .two_stage import select_team_two_stage
+            x, y, z = select_team_two_stage(*args_, total_budget=args.budget, sub_factor=args.sub_factor,
+                                            verbose=False, stats=span)
+        elif args.solver == "highs":
+            from .selection import select_team_highs
+            x, y, z = select_team_highs(*args_, pool.differentials[keep], total_budget=args.budget,
+                                        sub_factor=args.sub_factor, verbose=False, stats=span)
+        else:
+            from .selection import select_team
+            x, y, z = [np.array([v.value() for v in d]).round().astype(int) for d in
+                       select_team(*args_, pool.differentials[keep], total_budget=args.budget,
+                                   sub_factor=args.sub_factor, stats=span)]
+
+    scores = scores[keep]
+    for title, chosen in (("Starting 11", x), ("Captain", y), ("Subs", z)):
+        if not chosen.any():
+            continue
+        print(title)
+        for i in np.flatnonzero(chosen):
+            j = keep[i]
+            print(f"  {pool.names[j]:20s} {POSITION_NAMES[pool.positions[j]]:4s} {pool.prices[j]:5.1f} {scores[i]:7.2f}")
+    print("objective {:.2f}, cost {:.1f}".format(float(((x + y + args.sub_factor * z) * scores).sum()),
+                                                float(((x + z) * pool.prices[keep]).sum())))
+
+
+def cmd_bench(args, trace) -> None:
+    from .benchmark import main as bench_main
+    bench_main(args.bench_args, prog="fpl-opt bench")
+
+
+def cmd_backtest(args, trace) -> None:
+    from .backtest import main as backtest_main
+    backtest_main(_snapshot_args(args, offline=False) + args.backtest_args, prog="fpl-opt backtest")
+
+
+def cmd_history(args, trace) -> None:
+    from .history_store import main as history_main
+    history_main(args.history_args, prog="fpl-opt history")
+
+
+def cmd_plan(args, trace) -> None:
+    from .transfers import main as plan_main
+    plan_main(_snapshot_args(args) + args.plan_args, prog="fpl-opt plan")
+
+
+def cmd_project(args, trace) -> None:
+    from .projection import main as project_main
+    project_main(_snapshot_args(args, offline=False) + args.project_args, prog="fpl-opt project")
+
+
+def cmd_serve(args, trace) -> None:
+    from .service import main as serve_main
+    serve_main(_snapshot_args(args) + args.serve_args, prog="fpl-opt serve")
+
+
+def parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="fpl-opt", description="Fantasy Premier League squad optimizer")
+    p.add_argument("--snapshot-dir", default=None, help="snapshot root (default $FPL_SNAPSHOT_DIR)")
+    p.add_argument("--offline", action="store_true", help="only use snapshots, never fetch")
+    p.add_argument("--trace", default=None, help="write a JSON stage trace here")
+    commands = p.add_subparsers(dest="command", required=True)
+
+    fetch = commands.add_parser("fetch", help="fetch (or refresh) the snapshot for the current gameweek")
+    fetch.add_argument("--refresh", action="store_true", help="only re-fetch summaries that changed")
+    fetch.add_argument("--force", action="store_true", help="re-fetch everything")
+    fetch.add_argument("--concurrency", type=int, default=20)
+    fetch.add_argument("--rate", type=float, default=None, help="requests per second")
+    fetch.set_defaults(run=cmd_fetch)
+
+    for name, run, help in (("score", cmd_score, "expected scores of the candidate pool"),
+                            ("solve", cmd_solve, "pick the optimal squad")):
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument("--gameweek", type=int, default=None,
+                         help="gameweek to pick for (default: the next one); form comes from the rounds before it")
+        sub.add_argument("--depth", type=int, default=5)
+        sub.add_argument("--num-gws", type=int, default=1)
+        sub.add_argument("--fdr-horizon", type=int, default=5)
+        sub.add_argument("--fdr-weight", type=float, default=0.0)
+        sub.add_argument("--min-minutes", type=int, default=500)
+        sub.add_argument("--min-chance", type=int, default=50)
+        sub.set_defaults(run=run)
+        if name == "score":
+            sub.add_argument("--top", type=int, default=30)
+        else:
+            sub.add_argument("--solver", choices=SOLVERS, default="highs")
+            sub.add_argument("--budget", type=float, default=100)
+            sub.add_argument("--sub-factor", type=float, default=0.2)
+            sub.add_argument("--exclude", type=int, nargs="*", default=[], metavar="ID")
+
+    # everything after "bench"/"backtest"/"history"/"plan"/"project"/"serve" is handed to that module's own parser
+    bench = commands.add_parser("bench", help="time the pipeline stages on a synthetic league", add_help=False)
+    bench.set_defaults(run=cmd_bench)
+    backtest = commands.add_parser("backtest", help="replay past gameweeks to compare strategies", add_help=False)
+    backtest.set_defaults(run=cmd_backtest)
+    history = commands.add_parser("history", help="build a multi-season history store", add_help=False)
+    history.set_defaults(run=cmd_history)
+    plan = commands.add_parser("plan", help="plan transfers over the next gameweeks", add_help=False)
+    plan.set_defaults(run=cmd_plan)
+    project = commands.add_parser("project", help="walk-forward test of the fitted projection", add_help=False)
+    project.set_defaults(run=cmd_project)
+    serve = commands.add_parser("serve", help="answer squad queries over HTTP", add_help=False)
+    serve.set_defaults(run=cmd_serve)
+    return p
+
+
+def main(argv=None) -> None:
+    p = parser()
+    args, extra = p.parse_known_args(argv)
+    if args.command in ("bench", "backtest", "history", "plan", "project", "serve"):
+        setattr(args, args.command + "_args", extra)
+    elif extra:
+        p.error("unrecognized arguments: {}".format(" ".join(extra)))
+    from .tracing import Trace
+    trace = Trace.from_env()
+    if args.trace:
+        trace.path = args.trace
+    try:
+        args.run(args, trace)
+    finally:
+        trace.finish()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+import heapq
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .selection import STARTING_LIMITS, SQUAD_LIMITS, MAX_PER_CLUB
+
+# Exact solver for select_team's model without the differential constraints:
+# a squad of 2/5/5/3, at most 3 per club, within budget, scoring the XI, a
+# captain (counted twice) and the bench at sub_factor.
+#
+# Prices are integers on a price_unit grid (FPL uses 0.1), so each position is
+# solved by a DP over (starters, bench, captain used, exact cost). The four
+# position tables are merged with max-plus convolutions over cost. That gives
+# the optimum with club limits relaxed. Club limits are then enforced by
+# best-first branch-and-bound: each node is bounded by Lagrangian relaxation
+# of the club limits (a per-club penalty on every selected player, tuned by
+# subgradient steps), and a club with too many players is branched into
+# "first i of them in, the (i+1)-th out" for i = 0..3.
+#
+# The branch-and-bound is cheap when few clubs are over-full, as on pruned
+# pools spread over 20 clubs, where this beats HiGHS. With many candidates
+# at few clubs the tree grows quickly and HiGHS is much faster; use it there.
+
+NEG = -np.inf
+SKIP, BENCH, START, CAPTAIN = 0, 1, 2, 3
+
+
+def maxplus(a, b, length):
+    # c[k] = max_i a[i] + b[k - i] for k < length, with the maximising i
+    ia = np.flatnonzero(a > NEG)
+    ib = np.flatnonzero(b > NEG)
+    out = np.full(length, NEG)
+    arg = np.zeros(length, dtype=np.intp)
+    if not len(ia) or not len(ib):
+        return out, arg
+    a0, b0 = ia[0], ib[0]
+    A = a[a0:ia[-1] + 1]
+    B = b[b0:ib[-1] + 1]
+    pad = np.full(len(A) - 1, NEG)
+    W = sliding_window_view(np.concatenate([pad, B, pad]), len(A))
+    M = W + A[::-1][None, :]
+    t = np.argmax(M, axis=1)
+    vals = M[np.arange(len(M)), t]
+    end = min(length - (a0 + b0), len(vals))
+    if end > 0:
+        out[a0 + b0:a0 + b0 + end] = vals[:end]
+        arg[a0 + b0:a0 + b0 + end] = a0 + (len(A) - 1 - t[:end])
+    return out, arg
+
+
+class PositionTable:
+    # best value of a full quota at one position, by (starters, captain used, exact cost)
+
+    def __init__(self, players, costs, values, position, length, forced=()) -> None:
+        start, captain, bench = values
+        smin, smax = STARTING_LIMITS[position]
+        quota = SQUAD_LIMITS[position]
+        bmax = quota - smin
+        T = np.full((smax + 1, bmax + 1, 2, length), NEG)
+        T[0, 0, 0, 0] = 0.0
+        decisions = []
+        for i in players:
+            w = costs[i]
+            new = np.full_like(T, NEG) if i in forced else T.copy()
+            d = np.zeros(T.shape, dtype=np.int8)
+            if w < length:
+                moves = [(START, np.s_[1:, :, :, w:], T[:-1, :, :, :length - w] + start[i]),
+                         (CAPTAIN, np.s_[1:, :, 1, w:], T[:-1, :, 0, :length - w] + captain[i])]
+                if bmax:
+                    moves.append((BENCH, np.s_[:, 1:, :, w:], T[:, :-1, :, :length - w] + bench[i]))
+                for role, dst, src in moves:
+                    view = new[dst]
+                    better = src > view
+                    view[better] = src[better]
+                    d[dst][better] = role
+            decisions.append(d)
+            T = new
+
+        self.players = list(players)
+        self.costs = costs
+        self.decisions = decisions
+        self.quota = quota
+        # states with a complete quota: (starters, captain) -> values by exact cost
+        self.values = {(s, c): T[s, quota - s, c] for s in range(smin, smax + 1) for c in (0, 1)
+                       if quota - s <= bmax}
+
+    def backtrack(self, s, c, cost):
+        # roles for each chosen player: (player, BENCH | START | CAPTAIN)
+        b = self.quota - s
+        chosen = []
+        for i, d in zip(reversed(self.players), reversed(self.decisions)):
+            role = d[s, b, c, cost]
+            if role == SKIP:
+                continue
+            chosen.append((i, role))
+            if role == BENCH:
+                b -= 1
+            else:
+                s -= 1
+                if role == CAPTAIN:
+                    c = 0
+            cost -= self.costs[i]
+        return chosen
+
+
+def combine(left, right, length):
+    # merge two {(starters, captain): values} tables, remembering where each optimum came from
+    out = {}
+    for (sa, ca), a in left.items():
+        for (sb, cb), b in right.items():
+            if ca + cb > 1:
+                continue
+            key = (sa + sb, ca + cb)
+            vals, split = maxplus(a, b, length)
+            if key not in out:
+                out[key] = (vals, np.broadcast_to(np.array([sa, ca, sb, cb]), (length, 4)).copy(), split)
+                continue
+            best, src, arg = out[key]
+            better = vals > best
+            best[better] = vals[better]
+            src[better] = (sa, ca, sb, cb)
+            arg[better] = split[better]
+    return out
+
+
+class SquadDP:
+    def __init__(self, expected_scores, prices, positions, clubs, total_budget=100, sub_factor=0.2,
+                 price_unit=0.1, max_iters=40) -> None:
+        self.scores = np.asarray(expected_scores, dtype=float)
+        units = np.asarray(prices, dtype=float) / price_unit
+        self.costs = np.round(units).astype(int)
+        if not np.allclose(units, self.costs):
+            raise ValueError("prices must be multiples of price_unit={}".format(price_unit))
+        self.positions = np.asarray(positions)
+        self.clubs = np.asarray(clubs)
+        self.club_ids, self.club_of = np.unique(self.clubs, return_inverse=True)
+        self.length = int(round(total_budget / price_unit)) + 1
+        self.sub_factor = sub_factor
+        self.max_iters = max_iters
+        self.by_position = {p: np.flatnonzero(self.positions == p) for p in SQUAD_LIMITS}
+        self.incumbent, self.incumbent_roles = NEG, None
+        self.nodes = 0
+        self.dp_calls = 0
+
+    def candidates(self, p, excluded, forced, values):
+        # players dominated in every role by a full quota of others can be left out of the relaxation
+        idx = np.array([i for i in self.by_position[p] if i not in excluded], dtype=np.intp)
+        if len(idx) <= SQUAD_LIMITS[p]:
+            return idx.tolist()
+        c = self.costs[idx]
+        D = c[:, None] <= c[None, :]
+        strict = c[:, None] < c[None, :]
+        for v in values:
+            v = v[idx]
+            D &= v[:, None] >= v[None, :]
+            strict |= v[:, None] > v[None, :]
+        order = np.arange(len(idx))
+        D &= strict | (order[:, None] < order[None, :])
+        keep = D.sum(axis=0) < SQUAD_LIMITS[p]
+        keep |= np.isin(idx, list(forced))
+        return idx[keep].tolist()
+
+    def relaxed(self, excluded, forced, penalty):
+        # optimum with club limits replaced by a per-player penalty: (value, {player: role})
+        self.dp_calls += 1
+        values = (self.scores - penalty, 2 * self.scores - penalty, self.sub_factor * self.scores - penalty)
+        gk, df, md, fw = [PositionTable(self.candidates(p, excluded, forced, values), self.costs, values, p,
+                                        self.length, forced) for p in (1, 2, 3, 4)]
+        back = combine(gk.values, df.values, self.length)
+        front = combine(md.values, fw.values, self.length)
+
+        best, where = NEG, None
+        for (sa, ca), (a, _, _) in back.items():
+            key = (11 - sa, 1 - ca)
+            if key not in front:
+                continue
+            b = front[key][0]
+            # best right-hand cost not above budget minus the left-hand cost
+            prefix = np.maximum.accumulate(b)
+            totals = a + prefix[::-1]
+            k = int(np.argmax(totals))
+            if totals[k] > best:
+                best = totals[k]
+                where = ((sa, ca), k, key, int(_running_argmax(b)[self.length - 1 - k]))
+        if where is None or best == NEG:
+            return NEG, None
+
+        left_key, left_cost, right_key, right_cost = where
+        roles = {}
+        for merged, key, cost, (lo, hi) in ((back, left_key, left_cost, (gk, df)),
+                                            (front, right_key, right_cost, (md, fw))):
+            _, src, split = merged[key]
+            sa, ca, sb, cb = src[cost]
+            j = split[cost]
+            roles.update(lo.backtrack(sa, ca, j))
+            roles.update(hi.backtrack(sb, cb, cost - j))
+        return best, roles
+
+    def evaluate(self, roles):
+        # true objective and players per club of a relaxed solution
+        coef = {BENCH: self.sub_factor, START: 1.0, CAPTAIN: 2.0}
+        value = sum(coef[r] * self.scores[i] for i, r in roles.items())
+        counts = np.bincount(self.club_of[list(roles)], minlength=len(self.club_ids))
+        return value, counts
+
+    def bound(self, excluded, forced, lam, tolerance):
+        # Lagrangian bound of one node by subgradient steps; also harvests feasible squads
+        self.nodes += 1
+        best, violating, theta, stall = np.inf, None, 1.0, 0
+        for _ in range(self.max_iters):
+            value, roles = self.relaxed(excluded, forced, lam[self.club_of])
+            if roles is None:
+                return NEG, None, lam, True
+            L = value + MAX_PER_CLUB * lam.sum()
+            true_value, counts = self.evaluate(roles)
+            g = counts - MAX_PER_CLUB
+            if g.max() <= 0:
+                if true_value > self.incumbent:
+                    self.incumbent, self.incumbent_roles = true_value, roles
+            else:
+                violating = roles
+            if L < best - tolerance:
+                best, stall = L, 0
+            else:
+                stall += 1
+                if stall >= 5:
+                    theta, stall = theta / 2, 0
+            if best <= self.incumbent + tolerance:
+                return best, violating, lam, True
+            if g.max() <= 0 and not np.any(lam * g):
+                # feasible and complementary: the relaxation is exact at this node
+                return true_value, None, lam, True
+            g = np.where((lam <= 0) & (g < 0), 0, g)
+            target = self.incumbent if self.incumbent > NEG else L - 0.05 * abs(L) - 1
+            lam = np.maximum(0.0, lam + theta * (L - target) / max(float(g @ g), 1.0) * g)
+        if violating is None:
+            # every iterate was feasible: branch on the unpenalized relaxation, unless it is feasible too,
+            # in which case it is the node's optimum
+            _, violating = self.relaxed(excluded, forced, np.zeros(len(self.scores)))
+            true_value, counts = self.evaluate(violating)
+            if counts.max() <= MAX_PER_CLUB:
+                if true_value > self.incumbent:
+                    self.incumbent, self.incumbent_roles = true_value, violating
+                return true_value, None, lam, True
+        return best, violating, lam, False
+
+    def solve(self, tolerance=1e-9):
+        counter = 0
+        heap = []
+        lam = np.zeros(len(self.club_ids))
+        bound, roles, lam, closed = self.bound(set(), set(), lam, tolerance)
+        if not closed:
+            heap.append((-bound, counter, set(), set(), roles, lam))
+        while heap:
+            neg_bound, _, excluded, forced, roles, lam = heapq.heappop(heap)
+            if -neg_bound <= self.incumbent + tolerance:
+                continue
+            counts = np.bincount(self.club_of[list(roles)], minlength=len(self.club_ids))
+            over = np.flatnonzero(counts > MAX_PER_CLUB)
+            if not len(over):
+                continue
+            # only an over-full club splits the node: no child may keep MAX_PER_CLUB + 1 of its members
+            club = int(over[np.argmax(counts[over])])
+            members = [i for i in roles if self.club_of[i] == club]
+            # forced members first so they are never the one branched out
+            members.sort(key=lambda i: (i not in forced, self.scores[i]))
+            for k in range(min(len(members), MAX_PER_CLUB + 1)):
+                if members[k] in forced:
+                    continue
+                child_forced = forced | set(members[:k])
+                child_excluded = excluded | {members[k]}
+                bound, child_roles, child_lam, closed = self.bound(child_excluded, child_forced, lam, tolerance)
+                if not closed and bound > self.incumbent + tolerance:
+                    counter += 1
+                    heapq.heappush(heap, (-bound, counter, child_excluded, child_forced, child_roles, child_lam))
+        if self.incumbent_roles is None:
+            raise RuntimeError("no squad satisfies the budget and club limits")
+        return self.incumbent, self.incumbent_roles
+
+
+def _running_argmax(a):
+    # index of an element equal to the running maximum at every position
+    idx = np.arange(len(a))
+    hit = np.where(a == np.maximum.accumulate(a), idx, 0)
+    return np.maximum.accumulate(hit)
+
+
+def select_team_dp(expected_scores, prices, positions, clubs, differentials=None, total_budget=100,
+                   sub_factor=0.2, price_unit=0.1, verbose=True):
+    # drop-in for select_team (default constraints only); returns 0/1 arrays
+    if differentials is not None:
+        raise ValueError("select_team_dp does not support differential constraints, use select_team")
+    dp = SquadDP(expected_scores, prices, positions, clubs, total_budget, sub_factor, price_unit)
+    value, roles = dp.solve()
+    if verbose:
+        print("Total expected score = {}".format(value))
+
+    n = len(dp.scores)
+    decisions = np.zeros(n, dtype=int)
+    captain_decisions = np.zeros(n, dtype=int)
+    sub_decisions = np.zeros(n, dtype=int)
+    for i, role in roles.items():
+        if role == BENCH:
+            sub_decisions[i] = 1
+        else:
+            decisions[i] = 1
+            captain_decisions[i] = role == CAPTAIN
+    return decisions, captain_decisions, sub_decisions
@@ -1,11 +1,4 @@
-from fpl import FPL
-import aiohttp
-import asyncio
-import pandas as pd
 import numpy as np
-import pulp
-
-asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 def get_gw_num_factor(fixture_list, num_gws, cur_gw):
     gws = list(range(cur_gw, cur_gw + num_gws))  # list of gameweeks to consider
@@ -17,4 +10,69 @@ def get_gw_num_factor(fixture_list, num_gws, cur_gw):
 
 def get_fdr(fixture_list, num_gws) -> dict:
     tot_score = sum(fixture_list[i]['difficulty'] for i in range(num_gws))
-    return round(3 * num_gws / tot_score, 2)
\ No newline at end of file
+    return round(3 * num_gws / tot_score, 2)
+
+class FixtureTensor:
+    """Team x gameweek arrays built once from ``{team_id: fixture_list}``.
+
+    Rows are indexed by team id and columns by gameweek number (row/column 0
+    unused), so ``tensor.fdr(5)[clubs]`` gives every player's club factor.
+    """
+
+    def __init__(self, count, difficulty, home) -> None:
+        self.count = count  # fixtures per team per gameweek (2 = double, 0 = blank)
+        self.difficulty = difficulty  # summed difficulty of those fixtures
+        self.home = home  # how many of them are at home
+
+    @classmethod
+    def from_team_fixtures(cls, fixture_dict, num_gws=38):
+        fixtures = [(team, f) for team, fl in fixture_dict.items() for f in fl if f.get('event')]
+        teams = np.array([int(team) for team, _ in fixtures], dtype=np.intp)
+        events = np.array([f['event'] for _, f in fixtures], dtype=np.intp)
+        shape = (max(list(map(int, fixture_dict)) + [0]) + 1, max([num_gws] + events.tolist()) + 1)
+
+        count = np.zeros(shape, dtype=np.int8)
+        difficulty = np.zeros(shape, dtype=np.float32)
+        home = np.zeros(shape, dtype=np.int8)
+        np.add.at(count, (teams, events), 1)
+        np.add.at(difficulty, (teams, events), [f['difficulty'] for _, f in fixtures])
+        np.add.at(home, (teams, events), [bool(f.get('is_home')) for _, f in fixtures])
+        return cls(count, difficulty, home)
+
+    @property
+    def next_gameweek(self) -> int:
+        played = np.flatnonzero(self.count.any(axis=0))
+        return int(played[0]) if len(played) else 1
+
+    @property
+    def away(self) -> np.ndarray:
+        return self.count - self.home
+
+    def horizon(self, num_gws, cur_gw=None) -> slice:
+        cur_gw = self.next_gameweek if cur_gw is None else cur_gw
+        return slice(cur_gw, cur_gw + num_gws)
+
+    def fdr(self, num_gws, cur_gw=None) -> np.ndarray:
+        """3 per fixture over the summed difficulty, for every team.
+
+        Unlike get_fdr, which averages the next ``num_gws`` entries of the
+        fixture list, this averages every fixture in the next ``num_gws``
+        gameweeks: a double adds both its fixtures and a blank adds none, so
+        the two differ when either falls inside the horizon. Teams without a
+        fixture in it get 1.
+        """
+        h = self.horizon(num_gws, cur_gw)
+        n = self.count[:, h].sum(axis=1)
+        tot_score = self.difficulty[:, h].sum(axis=1)
+        return np.round(np.divide(3.0 * n, tot_score, out=np.ones(len(n)), where=tot_score > 0), 2)
+
+    def gw_num_factor(self, num_gws, cur_gw) -> np.ndarray:
+        # get_gw_num_factor for every team: linearly decaying weights times fixture counts
+        weights = np.round(1 - (1 / num_gws) * np.arange(num_gws), 2)
+        counts = self.count[:, self.horizon(num_gws, cur_gw)]
+        return counts @ weights[:counts.shape[1]]
+
+    def home_share(self, num_gws, cur_gw=None) -> np.ndarray:
+        h = self.horizon(num_gws, cur_gw)
+        n = self.count[:, h].sum(axis=1)
+        return np.divide(self.home[:, h].sum(axis=1), n, out=np.zeros(len(n)), where=n > 0)
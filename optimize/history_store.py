@@ -0,0 +1,236 @@
+import argparse
+import csv
+import json
+import os
+import numpy as np
+from .scoring import HISTORY_STATS, SEASON_GAMEWEEKS, HistoryMatrix
+
+# Player-gameweek rows for any number of seasons as one .npy file per column,
+# opened with mmap so nothing is read until a slice is used. Rows are sorted
+# by (season, element, round); the index files give the row range of every
+# season and every (season, player), and per-season row orders by gameweek.
+#
+#   <root>/meta.json            version, seasons, columns, row count
+#   <root>/col_<name>.npy       one array per column
+#   <root>/season_start.npy     first row of each season (+ end)
+#   <root>/player_index.npy     (season, element, start, stop) sorted by season, element
+#   <root>/gw_order.npy         row numbers sorted by (season, round)
+#   <root>/gw_start.npy         seasons x (gameweeks + 1) offsets into gw_order
+#   <root>/code_order.npy       row numbers sorted by the cross-season player code
+
+STORE_VERSION = 3
+KEY_COLUMNS = {"season": np.int16, "element": np.int32, "code": np.int32, "round": np.int16,
+               "fixture": np.int32, "opponent_team": np.int8, "was_home": np.int8, "value": np.int16,
+               "selected": np.int32}
+STAT_COLUMNS = {s: np.int16 for s in HISTORY_STATS}
+STAT_COLUMNS.update({"red_cards": np.int16, "own_goals": np.int16, "penalties_saved": np.int16,
+                     "penalties_missed": np.int16, "starts": np.int16})
+FLOAT_COLUMNS = {s: np.float32 for s in ("influence", "creativity", "threat", "ict_index",
+                                         "expected_goals", "expected_assists", "expected_goal_involvements",
+                                         "expected_goals_conceded")}
+COLUMNS = {**KEY_COLUMNS, **STAT_COLUMNS, **FLOAT_COLUMNS}
+MAX_GAMEWEEKS = 47  # 2019-20 ran to "gameweek 47" after the restart
+
+
+def records_from_summaries(summaries, codes=None):
+    # {element id: element summary} -> history rows; codes maps element id to the cross-season player code
+    for pid, summary in summaries.items():
+        pid = int(pid)
+        for gw in summary.get("history", []):
+            yield {**gw, "element": pid, "code": (codes or {}).get(pid, -1)}
+
+
+def records_from_csv(path):
+    # a merged gameweek CSV (one row per player-fixture, e.g. merged_gw.csv archives)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            if "round" not in row and "GW" in row:
+                row["round"] = row["GW"]
+            row["was_home"] = row.get("was_home") in ("True", "true", "1", True)
+            yield row
+
+
+def _number(value, default=0):
+    if value is None or value == "":
+        return default
+    return float(value)
+
+
+def write_store(root, seasons) -> None:
+    """Build a store from ``{season name: iterable of history row dicts}``.
+
+    Season names are kept in the given order (e.g. "2022-23", "2023-24").
+    Unknown fields are ignored and missing ones stored as 0 (code as -1).
+    """
+    names = list(seasons)
+    data = {c: [] for c in COLUMNS}
+    for s, name in enumerate(names):
+        for row in seasons[name]:
+            data["season"].append(s)
+            for c in COLUMNS:
+                if c != "season":
+                    data[c].append(_number(row.get(c), -1 if c == "code" else 0))
+    columns = {c: np.asarray(v, dtype=np.float64).astype(COLUMNS[c]) if c in FLOAT_COLUMNS
+               else np.round(np.asarray(v, dtype=np.float64)).astype(COLUMNS[c]) for c, v in data.items()}
+
+    order = np.lexsort((columns["round"], columns["element"], columns["season"]))
+    columns = {c: v[order] for c, v in columns.items()}
+    n = len(order)
+    season, element, rnd = columns["season"], columns["element"], columns["round"]
+
+    season_start = np.searchsorted(season, np.arange(len(names) + 1)).astype(np.int64)
+    new_player = np.ones(n, dtype=bool)
+    new_player[1:] = (season[1:] != season[:-1]) | (element[1:] != element[:-1])
+    starts = np.flatnonzero(new_player)
+    stops = np.append(starts[1:], n)
+    player_index = np.rec.fromarrays([season[starts], element[starts], starts, stops],
+                                     names="season,element,start,stop")
+    gw_order = np.lexsort((rnd, season)).astype(np.int64)
+    gw_keys = season[gw_order].astype(np.int64) * (MAX_GAMEWEEKS + 1) + rnd[gw_order]
+    wanted = np.arange(len(names))[:, None] * (MAX_GAMEWEEKS + 1) + np.arange(MAX_GAMEWEEKS + 2)[None, :]
+    gw_start = np.searchsorted(gw_keys, wanted).astype(np.int64)  # gw_start[s, g]: first row of gameweek g
+
+    os.makedirs(root, exist_ok=True)
+    for c, v in columns.items():
+        np.save(os.path.join(root, "col_{}.npy".format(c)), v)
+    np.save(os.path.join(root, "season_start.npy"), season_start)
+    np.save(os.path.join(root, "player_index.npy"), np.asarray(player_index))
+    np.save(os.path.join(root, "gw_order.npy"), gw_order)
+    np.save(os.path.join(root, "gw_start.npy"), gw_start)
+    np.save(os.path.join(root, "code_order.npy"), np.argsort(columns["code"], kind="stable").astype(np.int64))
+    with open(os.path.join(root, "meta.json"), "w") as f:
+        json.dump({"version": STORE_VERSION, "seasons": names, "rows": n,
+                   "columns": {c: np.dtype(t).str for c, t in COLUMNS.items()}}, f, indent=1)
+
+
+class HistoryStore:
+    """Read side of a store written by write_store; every array is memory-mapped on first use."""
+
+    def __init__(self, root) -> None:
+        self.root = root
+        with open(os.path.join(root, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["version"] != STORE_VERSION:
+            raise ValueError("history store {} has version {}, expected {}".format(
+                root, meta["version"], STORE_VERSION))
+        self.seasons = meta["seasons"]
+        self.columns = list(meta["columns"])
+        self.rows = meta["rows"]
+        self._season = {name: s for s, name in enumerate(self.seasons)}
+        self._arrays = {}
+
+    def _load(self, name) -> np.ndarray:
+        array = self._arrays.get(name)
+        if array is None:
+            array = self._arrays[name] = np.load(os.path.join(self.root, name + ".npy"), mmap_mode="r")
+        return array
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name, rows=slice(None)) -> np.ndarray:
+        if name not in self.columns:
+            raise KeyError("no column {!r} in {}".format(name, self.root))
+        return self._load("col_" + name)[rows]
+
+    def season_code(self, season) -> int:
+        try:
+            return self._season[season]
+        except KeyError:
+            raise KeyError("season {!r} not in store (have {})".format(season, ", ".join(self.seasons)))
+
+    def season_rows(self, season) -> slice:
+        s = self.season_code(season)
+        start = self._load("season_start")
+        return slice(int(start[s]), int(start[s + 1]))
+
+    def players(self, season) -> np.ndarray:
+        index = self._load("player_index")
+        s = self.season_code(season)
+        lo, hi = np.searchsorted(index["season"], [s, s + 1])
+        return np.asarray(index["element"][lo:hi])
+
+    def player_rows(self, season, element) -> slice:
+        index = self._load("player_index")
+        s = self.season_code(season)
+        lo, hi = np.searchsorted(index["season"], [s, s + 1])
+        i = lo + np.searchsorted(index["element"][lo:hi], element)
+        if i >= hi or index["element"][i] != element:
+            return slice(0, 0)
+        return slice(int(index["start"][i]), int(index["stop"][i]))
+
+    def gameweek_rows(self, season, gameweek) -> np.ndarray:
+        # row numbers of every fixture played in that gameweek
+        s = self.season_code(season)
+        start = self._load("gw_start")
+        return np.asarray(self._load("gw_order")[start[s, gameweek]:start[s, gameweek + 1]])
+
+    def career_rows(self, code) -> np.ndarray:
+        # every row of one player across seasons, by the cross-season player code
+        rows = self.code_index()
+        codes = self.column("code")
+        lo, hi = np.searchsorted(codes[rows], [code, code + 1])
+        return np.sort(rows[lo:hi])
+
+    def code_index(self) -> np.ndarray:
+        # rows sorted by code, written with the store
+        return self._load("code_order")
+
+    def matrix(self, season, elements=None, stats=HISTORY_STATS, before=None,
+               num_gameweeks=SEASON_GAMEWEEKS) -> HistoryMatrix:
+        """A HistoryMatrix for one season, reading only that season's rows.
+
+        ``elements`` picks and orders the players (default: all in the season);
+        ``before`` drops gameweeks from that one on, for point-in-time views.
+        """
+        rows = self.season_rows(season)
+        element = np.asarray(self.column("element", rows))
+        rnd = np.asarray(self.column("round", rows)).astype(np.intp)
+        present = self.players(season)
+        ids = present if elements is None else np.asarray(elements)
+        # season-wide player position -> row in the result (-1: not requested)
+        lookup = np.full(len(present), -1, dtype=np.intp)
+        known = np.isin(ids, present)
+        lookup[np.searchsorted(present, ids[known])] = np.flatnonzero(known)
+        r = lookup[np.searchsorted(present, element)]
+        keep = r >= 0
+        if before is not None:
+            keep &= rnd < before
+        r, c = r[keep], rnd[keep] - 1
+        width = max(num_gameweeks, int(c.max()) + 1 if len(c) else 0)
+        shape = (len(ids), width)
+        appearances = np.zeros(shape, dtype=np.int8)
+        np.add.at(appearances, (r, c), 1)
+        matrices = {}
+        for s in stats:
+            m = np.zeros(shape)
+            np.add.at(m, (r, c), np.asarray(self.column(s, rows))[keep])
+            matrices[s] = m
+        return HistoryMatrix(ids, matrices, appearances)
+
+
+def main(argv=None, prog=None) -> None:
+    parser = argparse.ArgumentParser(prog=prog, description="Build a memory-mapped multi-season history store")
+    parser.add_argument("out")
+    parser.add_argument("--csv", nargs=2, action="append", default=[], metavar=("SEASON", "PATH"),
+                        help="a merged gameweek CSV for a season")
+    parser.add_argument("--snapshot", nargs=2, action="append", default=[], metavar=("SEASON", "DIR"),
+                        help="a snapshot directory whose latest summaries cover a season")
+    args = parser.parse_args(argv)
+
+    from .snapshot import SnapshotStore
+    seasons = {}
+    for season, path in args.csv:
+        seasons[season] = records_from_csv(path)
+    for season, path in args.snapshot:
+        store = SnapshotStore(path, offline=True)
+        gameweek = store.current_gameweek()
+        codes = {p["id"]: p.get("code", -1) for p in store.require("players", gameweek)}
+        seasons[season] = records_from_summaries(store.require("summaries", gameweek), codes)
+    write_store(args.out, dict(sorted(seasons.items())))
+    store = HistoryStore(args.out)
+    print("{} rows, seasons {}".format(len(store), ", ".join(store.seasons)))
+
+
+if __name__ == "__main__":
+    main()
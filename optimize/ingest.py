@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+import random
+import sys
+import time
+from .snapshot import SnapshotMiss, default_store
+
+FPL_API_URL = "https://fantasy.premierleague.com/api/"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# bootstrap fields that move whenever a player's element summary would change
+FINGERPRINT_FIELDS = ("event_points", "total_points", "minutes", "news", "now_cost", "status",
+                      "chance_of_playing_this_round", "chance_of_playing_next_round", "team")
+
+
+def use_selector_event_loop() -> None:
+    # aiohttp needs the selector event loop on Windows; nothing to do elsewhere
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+
+class RateLimiter:
+    # token bucket shared by every request made through one pipeline
+    def __init__(self, rate, burst=None) -> None:
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FetchStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latencies = []
+        self.endpoints = {}  # {"element-summary": [requests, bytes], ...}
+
+    def add(self, path, size, latency) -> None:
+        self.requests += 1
+        self.bytes += size
+        self.latencies.append(latency)
+        counts = self.endpoints.setdefault(path.split("/")[0], [0, 0])
+        counts[0] += 1
+        counts[1] += size
+
+    def as_dict(self) -> dict:
+        lat = sorted(self.latencies)
+        pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] if lat else 0.0
+        return {"requests": self.requests,
+                "retries": self.retries,
+                "bytes": self.bytes,
+                "latency_p50": pct(0.5),
+                "latency_p95": pct(0.95),
+                "latency_max": lat[-1] if lat else 0.0,
+                "endpoints": {name: {"requests": r, "bytes": b} for name, (r, b) in self.endpoints.items()}}
+
+
+class Fetcher:
+    """One pooled aiohttp session with a concurrency cap, rate limit and retries."""
+
+    def __init__(self, session, base_url=FPL_API_URL, concurrency=20, rate=None,
+                 retries=5, backoff=0.5) -> None:
+        self.session = session
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(rate) if rate else None
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = FetchStats()
+
+    async def get_json(self, path):
+        import aiohttp
+        url = self.base_url + path
+        attempt = 0
+        while True:
+            if self.limiter:
+                await self.limiter.acquire()
+            async with self.semaphore:
+                start = time.perf_counter()
+                try:
+                    async with self.session.get(url) as response:
+                        if response.status in RETRY_STATUSES:
+                            raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                              status=response.status)
+                        response.raise_for_status()
+                        body = await response.read()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status = getattr(e, "status", None)
+                    if attempt >= self.retries or (status is not None and status not in RETRY_STATUSES):
+                        raise
+                else:
+                    self.stats.add(path, len(body), time.perf_counter() - start)
+                    return json.loads(body)
+            # exponential backoff with jitter, outside the semaphore so others can proceed
+            attempt += 1
+            self.stats.retries += 1
+            await asyncio.sleep(self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+
+
+class IngestResult:
+    def __init__(self, gameweek, bootstrap, players, summaries, team_fixtures, stats=None, refreshed=None) -> None:
+        self.gameweek = gameweek
+        self.bootstrap = bootstrap
+        self.players = players  # bootstrap element dicts
+        self.summaries = summaries  # {player id: element summary}
+        self.team_fixtures = team_fixtures  # {team id: fixture list}
+        self.stats = stats
+        self.refreshed = refreshed  # player ids re-fetched by a delta refresh
+
+
+def current_gameweek(bootstrap) -> int:
+    return next((e["id"] for e in bootstrap["events"] if e["is_current"]), 0)
+
+
+def next_gameweek(bootstrap):
+    # the gameweek whose deadline is next, None once the season is over
+    return next((e["id"] for e in bootstrap["events"] if e.get("is_next")), None)
+
+
+def last_finished_gameweek(bootstrap) -> int:
+    return max((e["id"] for e in bootstrap["events"] if e.get("finished")), default=0)
+
+
+def fingerprint(player) -> str:
+    raw = json.dumps([player.get(f) for f in FINGERPRINT_FIELDS], separators=(",", ":"))
+    return hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+
+def sync_state(players, finished) -> dict:
+    # {player id: [bootstrap fingerprint, last finished gameweek when its summary was fetched]}
+    return {str(p["id"]): [fingerprint(p), finished] for p in players}
+
+
+def first_player_by_team(players) -> dict:
+    # fpl's Team.get_fixtures reads the fixtures of the team's first listed player
+    firsts = {}
+    for p in players:
+        firsts.setdefault(p["team"], p["id"])
+    return firsts
+
+
+async def fetch_everything(fetcher, player_ids=None) -> IngestResult:
+    bootstrap = await fetcher.get_json("bootstrap-static/")
+    players = bootstrap["elements"]
+    if player_ids is None:
+        player_ids = [p["id"] for p in players]
+    team_ids = first_player_by_team(players)
+    # team fixtures come from a player summary, so fetch the union once
+    wanted = list(dict.fromkeys(list(player_ids) + list(team_ids.values())))
+
+    results = await asyncio.gather(*[fetcher.get_json("element-summary/{}/".format(pid)) for pid in wanted])
+    summaries = dict(zip(wanted, results))
+    team_fixtures = {team: summaries[pid]["fixtures"] for team, pid in team_ids.items()}
+    return IngestResult(current_gameweek(bootstrap), bootstrap, players,
+                        {pid: summaries[pid] for pid in player_ids}, team_fixtures, fetcher.stats)
+
+
+async def ingest(store=None, base_url=FPL_API_URL, concurrency=20, rate=None, retries=5,
+                 backoff=0.5, force=False) -> IngestResult:
+    # fill (or read back) the snapshot for the current gameweek in one pass
+    store = store or default_store()
+    gameweek = store.current_gameweek()
+    if gameweek is not None and not force:
+        cached = [store.load(name, gameweek) for name in ("bootstrap", "players", "summaries", "team_fixtures")]
+        if all(c is not None for c in cached):
+            bootstrap, players, summaries, team_fixtures = cached
+            if len(summaries) >= len(players):
+                return IngestResult(gameweek, bootstrap, players,
+                                    {int(k): v for k, v in summaries.items()},
+                                    {int(k): v for k, v in team_fixtures.items()})
+    if store.offline:
+        raise SnapshotMiss("offline mode and no complete snapshot in {}".format(store.root))
+
+    import aiohttp
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     headers={"User-Agent": ""}) as session:
+        fetcher = Fetcher(session, base_url, concurrency, rate, retries, backoff)
+        result = await fetch_everything(fetcher)
+
+    store.save("bootstrap", result.gameweek, result.bootstrap)
+    store.save("players", result.gameweek, result.players)
+    store.save("summaries", result.gameweek, {str(k): v for k, v in result.summaries.items()})
+    store.save("team_fixtures", result.gameweek, {str(k): v for k, v in result.team_fixtures.items()})
+    store.save("sync", result.gameweek, sync_state(result.players, last_finished_gameweek(result.bootstrap)))
+    store.set_current_gameweek(result.gameweek)
+    return result
+
+
+async def refresh(store=None, base_url=FPL_API_URL, concurrency=20, rate=None, retries=5,
+                  backoff=0.5) -> IngestResult:
+    """Bring the held snapshot up to date with one bootstrap request plus the
+    element summaries of players whose bootstrap row changed or who have not
+    been fetched since the last finished gameweek. Falls back to a full ingest
+    when nothing is held yet."""
+    store = store or default_store()
+    held_gameweek = store.current_gameweek(ignore_ttl=True)
+    held = None
+    if held_gameweek is not None:
+        held = [store.load(name, held_gameweek, ignore_ttl=True) for name in ("summaries", "sync")]
+    if held is None or any(h is None for h in held):
+        return await ingest(store, base_url, concurrency, rate, retries, backoff, force=True)
+    if store.offline:
+        raise SnapshotMiss("offline mode, refresh needs the network")
+    summaries, sync = held
+
+    import aiohttp
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     headers={"User-Agent": ""}) as session:
+        fetcher = Fetcher(session, base_url, concurrency, rate, retries, backoff)
+        bootstrap = await fetcher.get_json("bootstrap-static/")
+        players = bootstrap["elements"]
+        gameweek = current_gameweek(bootstrap)
+        finished = last_finished_gameweek(bootstrap)
+        state = sync_state(players, finished)
+
+        stale = [p["id"] for p in players
+                 if str(p["id"]) not in summaries or str(p["id"]) not in sync
+                 or sync[str(p["id"])][0] != state[str(p["id"])][0]
+                 or sync[str(p["id"])][1] < finished]
+        fetched = await asyncio.gather(*[fetcher.get_json("element-summary/{}/".format(pid)) for pid in stale])
+
+    for pid, summary in zip(stale, fetched):
+        summaries[str(pid)] = summary
+    # players that kept their fingerprint also keep their previous sync point
+    for pid, entry in sync.items():
+        if pid in state and int(pid) not in stale:
+            state[pid][1] = entry[1]
+    team_fixtures = {team: summaries[str(pid)]["fixtures"] for team, pid in first_player_by_team(players).items()}
+
+    store.save("bootstrap", gameweek, bootstrap)
+    store.save("players", gameweek, players)
+    store.save("summaries", gameweek, summaries)
+    store.save("team_fixtures", gameweek, {str(k): v for k, v in team_fixtures.items()})
+    store.save("sync", gameweek, state)
+    store.set_current_gameweek(gameweek)
+    return IngestResult(gameweek, bootstrap, players,
+                        {p["id"]: summaries[str(p["id"])] for p in players},
+                        team_fixtures, fetcher.stats, stale)
@@ -0,0 +1,99 @@
+from aiohttp import web
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from .snapshot import SnapshotStore
+from .ingest import ingest
+
+# Local stand-in for the FPL API that replays a recorded snapshot, so the
+# ingestion pipeline can be benchmarked without hitting the real servers.
+
+
+def load_recording(store, gameweek=None) -> dict:
+    gameweek = gameweek or store.current_gameweek()
+    players = store.require("players", gameweek)
+    bootstrap = store.load("bootstrap", gameweek) or {
+        "elements": players,
+        "events": [{"id": gameweek, "is_current": True}],
+        "teams": [],
+    }
+    summaries = store.require("summaries", gameweek)
+    return {"bootstrap": bootstrap, "summaries": summaries}
+
+
+def make_app(recording, latency=0.0, jitter=0.0, error_rate=0.0) -> web.Application:
+    async def delay():
+        if latency or jitter:
+            await asyncio.sleep(latency + random.random() * jitter)
+
+    async def bootstrap(request):
+        await delay()
+        return web.json_response(recording["bootstrap"])
+
+    async def element_summary(request):
+        await delay()
+        if error_rate and random.random() < error_rate:
+            return web.Response(status=503)
+        summary = recording["summaries"].get(request.match_info["pid"])
+        if summary is None:
+            raise web.HTTPNotFound()
+        return web.json_response(summary)
+
+    app = web.Application()
+    app.router.add_get("/api/bootstrap-static/", bootstrap)
+    app.router.add_get("/api/element-summary/{pid}/", element_summary)
+    return app
+
+
+async def start_server(recording, host="127.0.0.1", port=8089, **kwargs) -> web.AppRunner:
+    runner = web.AppRunner(make_app(recording, **kwargs))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def benchmark(recording, concurrencies, port=8089, rate=None, **kwargs) -> list:
+    runner = await start_server(recording, port=port, **kwargs)
+    base_url = "http://127.0.0.1:{}/api/".format(port)
+    rows = []
+    try:
+        for concurrency in concurrencies:
+            with tempfile.TemporaryDirectory() as tmp:
+                start = time.perf_counter()
+                result = await ingest(SnapshotStore(tmp, offline=False), base_url=base_url,
+                                      concurrency=concurrency, rate=rate, backoff=0.05)
+                elapsed = time.perf_counter() - start
+            stats = result.stats.as_dict()
+            stats.update({"concurrency": concurrency,
+                          "seconds": round(elapsed, 3),
+                          "requests_per_second": round(stats["requests"] / elapsed, 1)})
+            rows.append(stats)
+    finally:
+        await runner.cleanup()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded FPL snapshot over HTTP")
+    parser.add_argument("--snapshot-dir", default=None)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="fixed delay per response (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay per response (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of summaries answered with 503")
+    parser.add_argument("--rate", type=float, default=None, help="client rate limit (requests/s)")
+    parser.add_argument("--bench", type=int, nargs="*", default=None, metavar="CONCURRENCY",
+                        help="run the ingestion pipeline against the server at these concurrency levels")
+    args = parser.parse_args()
+
+    recording = load_recording(SnapshotStore(args.snapshot_dir, offline=True))
+    faults = {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate}
+    if args.bench is not None:
+        rows = asyncio.run(benchmark(recording, args.bench or [1, 5, 20, 50], args.port, args.rate, **faults))
+        print(f"{'conc':>5s} {'secs':>8s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'retries':>8s}")
+        for r in rows:
+            print(f"{r['concurrency']:5d} {r['seconds']:8.3f} {r['requests_per_second']:8.1f} "
+                  f"{r['latency_p50']*1000:8.1f} {r['latency_p95']*1000:8.1f} {r['retries']:8d}")
+    else:
+        web.run_app(make_app(recording, **faults), host="127.0.0.1", port=args.port)
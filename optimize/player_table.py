@@ -0,0 +1,109 @@
+import sys
+import numpy as np
+
+# The bootstrap fields the optimizer reads, as one fixed-width record per
+# player. Strings are stored as indexes into a shared list of interned names,
+# so several seasons' tables can share it.
+PLAYER_DTYPE = np.dtype([("id", np.int16),
+                         ("team", np.int8),
+                         ("element_type", np.int8),
+                         ("now_cost", np.int16),
+                         ("minutes", np.int16),
+                         ("total_points", np.int16),
+                         ("chance_of_playing_this_round", np.int8),
+                         ("selected_by_percent", np.float32),
+                         ("points_per_game", np.float32),
+                         ("form", np.float32),
+                         ("web_name", np.int32),
+                         ("first_name", np.int32)])
+STRING_FIELDS = ("web_name", "first_name")
+NO_FLAG = -1  # chance_of_playing_this_round of None: no injury flag
+
+
+class NamePool:
+    # interned strings by insertion order
+    def __init__(self) -> None:
+        self.names = []
+        self.index = {}
+
+    def code(self, name) -> int:
+        code = self.index.get(name)
+        if code is None:
+            code = self.index[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return code
+
+    def decode(self, codes) -> np.ndarray:
+        return np.array([self.names[c] for c in codes], dtype=object)
+
+
+class PlayerTable:
+    """Typed view over a structured array of bootstrap players.
+
+    ``where``/``take`` return tables that share the record array and only hold
+    the selected row numbers, so filters never copy the records. Columns come
+    back as arrays in view order; ``rows`` maps the view back to positions in
+    the source list (for aligning with e.g. a HistoryMatrix built from it).
+    """
+
+    def __init__(self, records, names, rows=None) -> None:
+        self.records = records
+        self.names = names
+        self.rows = np.arange(len(records)) if rows is None else rows
+
+    @classmethod
+    def from_players(cls, players, names=None):
+        names = names or NamePool()
+        chance = lambda p: p.get("chance_of_playing_this_round")
+        records = np.array([(p["id"], p["team"], p["element_type"], p["now_cost"], p["minutes"], p["total_points"],
+                             NO_FLAG if chance(p) is None else chance(p), float(p["selected_by_percent"]),
+                             float(p.get("points_per_game") or 0), float(p.get("form") or 0),
+                             names.code(p["web_name"]), names.code(p.get("first_name", "")))
+                            for p in players], dtype=PLAYER_DTYPE)
+        return cls(records, names)
+
+    @classmethod
+    def from_snapshot(cls, store, gameweek, names=None):
+        return cls.from_players(store.require("players", gameweek), names)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, field) -> np.ndarray:
+        values = self.records[field][self.rows]
+        return self.names.decode(values) if field in STRING_FIELDS else values
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self["id"]
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self["now_cost"] / 10.0
+
+    @property
+    def nbytes(self) -> int:
+        return self.records.nbytes + self.rows.nbytes
+
+    def where(self, mask):
+        return PlayerTable(self.records, self.names, self.rows[np.asarray(mask, dtype=bool)])
+
+    def take(self, positions):
+        return PlayerTable(self.records, self.names, self.rows[np.asarray(positions)])
+
+    def available(self, min_minutes=500, min_chance=50, unflagged=False):
+        # the scripts' filter; unflagged=True also keeps players with no injury flag at all
+        chance = self["chance_of_playing_this_round"]
+        ok = chance > min_chance
+        if unflagged:
+            ok |= chance == NO_FLAG
+        return self.where((self["minutes"] > min_minutes) & ok)
+
+    def frame(self, columns=None, **extra) -> "pd.DataFrame":
+        # decoded DataFrame of just these columns, plus extra per-row columns
+        import pandas as pd
+        columns = columns or PLAYER_DTYPE.names
+        df = pd.DataFrame({c: self[c] for c in columns})
+        for name, values in extra.items():
+            df[name] = values
+        return df
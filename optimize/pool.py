@@ -0,0 +1,66 @@
+import numpy as np
+from .fixtures import FixtureTensor
+from .ingest import next_gameweek
+from .player_table import PlayerTable
+from .scoring import HistoryMatrix, linear_kernel
+
+
+class CandidatePool:
+    """The filtered player pool as plain arrays, built once from an ingest result.
+
+    Everything the scripts derive per run (history matrix, fixture tensor,
+    prices, positions, clubs, ownership) is kept here so expected scores for
+    any parameter setting are a couple of array operations.
+
+    ``form_gameweek`` is the last gameweek with results (the bootstrap's
+    current one) and ``next_gameweek`` the first with fixtures still to play;
+    before a deadline the first is finished and has no fixtures left.
+    """
+
+    def __init__(self, ids, names, prices, positions, clubs, differentials, history, fixtures,
+                 form_gameweek, next_gameweek) -> None:
+        self.ids = ids
+        self.names = names
+        self.prices = prices
+        self.positions = positions
+        self.clubs = clubs
+        self.differentials = differentials
+        self.history = history
+        self.fixtures = fixtures
+        self.form_gameweek = form_gameweek
+        self.next_gameweek = next_gameweek
+
+    @classmethod
+    def from_ingest(cls, data, min_minutes=500, min_chance=50):
+        # same filter as the scripts, except that no injury flag (None) counts as available
+        table = PlayerTable.from_players(data.players)
+        table = table.where(np.isin(table.ids, list(data.summaries)))
+        table = table.available(min_minutes, min_chance, unflagged=True)
+        ids = table.ids.astype(int)
+        fixtures = FixtureTensor.from_team_fixtures(data.team_fixtures)
+        return cls(ids=ids,
+                   names=table["web_name"],
+                   prices=table.prices,
+                   positions=table["element_type"].astype(int),
+                   clubs=table["team"].astype(int),
+                   differentials=np.round(table["selected_by_percent"].astype(float), 1),
+                   history=HistoryMatrix.from_players([data.summaries[i] for i in ids]),
+                   fixtures=fixtures,
+                   form_gameweek=data.gameweek,
+                   next_gameweek=next_gameweek(data.bootstrap) or fixtures.next_gameweek)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def expected_scores(self, gameweek=None, depth=5, num_gws=1, fdr_horizon=5, fdr_weight=0.0) -> np.ndarray:
+        # decayed form up to the rounds before ``gameweek`` (default: the next one) times the
+        # fixture-count factor from ``gameweek`` on, optionally times FDR ** fdr_weight
+        if gameweek is None:
+            form, gameweek = self.form_gameweek, self.next_gameweek
+        else:
+            form = min(gameweek - 1, self.form_gameweek)
+        scores = self.history.score(linear_kernel(form, depth))
+        scores = scores * self.fixtures.gw_num_factor(num_gws, gameweek)[self.clubs]
+        if fdr_weight:
+            scores = scores * self.fixtures.fdr(fdr_horizon, gameweek)[self.clubs] ** fdr_weight
+        return scores
@@ -0,0 +1,300 @@
+import argparse
+import time
+import numpy as np
+from .fixtures import FixtureTensor
+from .scoring import SEASON_GAMEWEEKS, linear_kernel
+
+# A fitted alternative to the hand-picked kernels: ridge regression of the
+# points a player scores per fixture on what is known at the deadline (form
+# over the last 1/3/6 rounds and the season, minutes, how often he played,
+# the fixture's difficulty and venue, price, ownership, position). The model
+# is kept as its sufficient statistics X'X and X'y, so a finished gameweek
+# adds its rows with two small products and a k x k solve instead of a refit,
+# and the feature cache keeps running sums so a new round is one column.
+
+FEATURES = ("intercept", "points_1", "points_3", "points_6", "points_season", "minutes_3", "played_3",
+            "fdr", "home", "price", "ownership", "def", "mid", "fwd")
+WINDOWS = (1, 3, 6, None)  # the points_* features; None is the whole season
+
+
+class RidgeModel:
+    """Ridge regression from running sums, refreshed after every update.
+
+    The penalty is ``alpha`` on the standardized coefficients (all but the
+    intercept, which must be column 0), worked out from the sums themselves.
+    ``forget`` < 1 down-weights older rows by that factor per update.
+    """
+
+    def __init__(self, num_features, alpha=1.0, forget=1.0) -> None:
+        self.alpha = alpha
+        self.forget = forget
+        self.gram = np.zeros((num_features, num_features))
+        self.moment = np.zeros(num_features)
+        self.rows = 0
+        self.coef = np.zeros(num_features)
+
+    def update(self, X, y) -> None:
+        if self.forget != 1.0:
+            self.gram *= self.forget
+            self.moment *= self.forget
+        self.gram += X.T @ X
+        self.moment += X.T @ y
+        self.rows += len(y)
+        self.solve()
+
+    def solve(self) -> np.ndarray:
+        weight = self.gram[0, 0]
+        if weight <= 0:
+            return self.coef
+        mean = self.gram[0] / weight
+        var = np.maximum(np.diag(self.gram) / weight - mean ** 2, 0)
+        penalty = self.alpha * weight * var
+        penalty[0] = 0
+        # constant columns (zero variance) get a tiny ridge so the system stays solvable
+        penalty[1:] += 1e-8 * weight
+        self.coef = np.linalg.solve(self.gram + np.diag(penalty), self.moment)
+        return self.coef
+
+    def predict(self, X) -> np.ndarray:
+        return X @ self.coef
+
+
+class FeatureCache:
+    """Player x gameweek inputs of the features, filled one finished round at a time.
+
+    ``gameweek`` is the first round without results. Points, minutes,
+    appearances (fixtures) and played rounds are kept as cumulative sums, so
+    the features of any gameweek are a few column differences.
+    """
+
+    def __init__(self, positions, clubs, fixtures, num_gameweeks=SEASON_GAMEWEEKS) -> None:
+        n = len(positions)
+        self.positions = np.asarray(positions)
+        self.clubs = np.asarray(clubs)
+        self.fixtures = fixtures
+        self.gameweek = 1
+        self.cum = {s: np.zeros((n, num_gameweeks + 1)) for s in ("points", "minutes", "appearances", "played",
+                                                                  "fixture_rounds")}
+        self.points = np.zeros((n, num_gameweeks))
+        self.appearances = np.zeros((n, num_gameweeks))
+        self.prices = np.zeros((n, num_gameweeks))
+        self.selected = np.zeros((n, num_gameweeks))
+        self.position = np.column_stack([self.positions == p for p in (2, 3, 4)]).astype(float)
+
+    @property
+    def num_gameweeks(self) -> int:
+        return self.points.shape[1]
+
+    def add_gameweek(self, points, minutes, appearances, prices, selected=None) -> int:
+        # one finished round for every player: summed points/minutes/selected over its fixtures
+        j = self.gameweek - 1
+        if j >= self.num_gameweeks:
+            raise ValueError("feature cache holds {} gameweeks".format(self.num_gameweeks))
+        appearances = np.asarray(appearances, dtype=float)
+        played = appearances > 0
+        columns = {"points": points, "minutes": minutes, "appearances": appearances,
+                   "played": np.asarray(minutes) > 0, "fixture_rounds": played}
+        for s, col in columns.items():
+            self.cum[s][:, j + 1] = self.cum[s][:, j] + col
+        self.points[:, j] = points
+        self.appearances[:, j] = appearances
+        self.prices[:, j] = prices
+        # ownership per fixture, carried over rounds without one
+        previous = self.selected[:, j - 1] if j else np.zeros(len(played))
+        if selected is None:
+            self.selected[:, j] = previous
+        else:
+            self.selected[:, j] = np.where(played, np.asarray(selected) / np.maximum(appearances, 1), previous)
+        self.gameweek += 1
+        return j + 1
+
+    def _window(self, stat, c, k) -> np.ndarray:
+        # sum over the k rounds before cumulative column c (the whole season for k=None)
+        cum = self.cum[stat]
+        return cum[:, c] - cum[:, 0 if k is None else max(c - k, 0)]
+
+    def features(self, gameweek, as_of=None) -> np.ndarray:
+        """Players x FEATURES for ``gameweek``, from rounds before ``as_of`` (default: the gameweek)."""
+        c = gameweek - 1 if as_of is None else as_of - 1
+        if c > self.gameweek - 1:
+            raise ValueError("no results after gameweek {} yet".format(self.gameweek - 1))
+        n = len(self.positions)
+        form = [self._window("points", c, k) / np.maximum(self._window("appearances", c, k), 1) for k in WINDOWS]
+        minutes = self._window("minutes", c, 3) / np.maximum(self._window("appearances", c, 3), 1) / 90
+        played = self._window("played", c, 3) / np.maximum(self._window("fixture_rounds", c, 3), 1)
+
+        tensor = self.fixtures
+        if gameweek < tensor.count.shape[1]:
+            count = tensor.count[self.clubs, gameweek].astype(float)
+            safe = np.maximum(count, 1)
+            fdr = np.where(count > 0, tensor.difficulty[self.clubs, gameweek] / safe - 3, 0)
+            home = tensor.home[self.clubs, gameweek] / safe
+        else:
+            fdr = home = np.zeros(n)
+        last = max(c - 1, 0)
+        return np.column_stack([np.ones(n), *form, minutes, played, fdr, home, self.prices[:, last],
+                                np.log1p(self.selected[:, last]), self.position])
+
+    def rows(self, gameweek) -> tuple:
+        # training rows of a finished gameweek: players with a fixture in it and one before it
+        X = self.features(gameweek)
+        apps = self.appearances[:, gameweek - 1]
+        mask = (apps > 0) & (self.cum["appearances"][:, gameweek - 1] > 0)
+        return X[mask], self.points[mask, gameweek - 1] / apps[mask]
+
+
+class Projector:
+    """Expected points of every player from the fitted model.
+
+    ``observe`` takes a finished gameweek, appends it to the cache and its
+    rows to the fit; ``project`` scores any upcoming gameweeks from the
+    rounds seen so far, per fixture times the club's fixtures that week.
+    """
+
+    def __init__(self, cache, alpha=1.0, forget=1.0, min_gameweek=4) -> None:
+        self.cache = cache
+        self.model = RidgeModel(len(FEATURES), alpha, forget)
+        self.min_gameweek = min_gameweek
+
+    @classmethod
+    def from_season(cls, season, gameweek=None, fixtures=None, alpha=1.0, forget=1.0, min_gameweek=4):
+        """Fit on a backtest Season's rounds before ``gameweek`` (default: all played).
+
+        ``fixtures`` replaces the season's own tensor, e.g. combine_fixtures
+        with the upcoming fixture list when projecting past the played rounds.
+        """
+        gameweek = season.last_gameweek + 1 if gameweek is None else gameweek
+        cache = FeatureCache(season.positions, season.clubs, season.fixtures if fixtures is None else fixtures,
+                             season.history.num_gameweeks)
+        projector = cls(cache, alpha, forget, min_gameweek)
+        for g in range(1, gameweek):
+            projector.observe(*season_round(season, g))
+        return projector
+
+    @property
+    def gameweek(self) -> int:
+        return self.cache.gameweek
+
+    def observe(self, points, minutes, appearances, prices, selected=None) -> None:
+        g = self.cache.add_gameweek(points, minutes, appearances, prices, selected)
+        if g >= self.min_gameweek:
+            self.model.update(*self.cache.rows(g))
+
+    def per_fixture(self, gameweek) -> np.ndarray:
+        return self.model.predict(self.cache.features(gameweek, self.cache.gameweek))
+
+    def project(self, gameweeks) -> np.ndarray:
+        # players x weeks; zero in blanks, doubled (roughly) in doubles
+        count = self.cache.fixtures.count
+        weeks = []
+        for g in gameweeks:
+            fixtures = count[self.cache.clubs, g] if g < count.shape[1] else np.zeros(len(self.cache.clubs))
+            weeks.append(self.per_fixture(g) * fixtures)
+        return np.column_stack(weeks)
+
+    def coefficients(self) -> dict:
+        return dict(zip(FEATURES, np.round(self.model.coef, 4).tolist()))
+
+
+def season_round(season, gameweek) -> tuple:
+    # the observe() arguments for one round of a backtest Season
+    j = gameweek - 1
+    stats = season.history.stats
+    selected = stats["selected"][:, j] if "selected" in stats else None
+    return (stats["total_points"][:, j], stats["minutes"][:, j], season.history.appearances[:, j],
+            season.prices[:, j], selected)
+
+
+def combine_fixtures(played, upcoming, gameweek) -> FixtureTensor:
+    # rounds before the gameweek from the played tensor, the rest from the fixture list
+    shape = tuple(max(a, b) for a, b in zip(played.count.shape, upcoming.count.shape))
+    arrays = []
+    for old, new in ((played.count, upcoming.count), (played.difficulty, upcoming.difficulty),
+                     (played.home, upcoming.home)):
+        out = np.zeros(shape, dtype=old.dtype)
+        out[:old.shape[0], :min(gameweek, old.shape[1])] = old[:, :gameweek]
+        if gameweek < new.shape[1]:
+            out[:new.shape[0], gameweek:new.shape[1]] = new[:, gameweek:]
+        arrays.append(out)
+    return FixtureTensor(*arrays)
+
+
+def evaluate(season, start, end=None, alpha=1.0, forget=1.0, min_gameweek=4, depth=5) -> dict:
+    """Walk forward through a season: project each gameweek, then observe it.
+
+    Scores both the fitted projection and the linear kernel (rescaled by
+    one least-squares factor, which flatters it) on players with a fixture,
+    and times the incremental update against fitting from scratch.
+    """
+    from .backtest import STRATEGY_DEFAULTS
+    end = season.last_gameweek if end is None else end
+    projector = Projector.from_season(season, start, alpha=alpha, forget=forget, min_gameweek=min_gameweek)
+    strategy = {**STRATEGY_DEFAULTS, "depth": depth, "num_gws": 1}
+    fitted, kernel, actual = [], [], []
+    project_seconds, update_seconds, refit_seconds = [], [], []
+    for g in range(start, end + 1):
+        t = time.perf_counter()
+        prediction = projector.project([g])[:, 0]
+        project_seconds.append(time.perf_counter() - t)
+        mask = season.history.appearances[:, g - 1] > 0
+        fitted.append(prediction[mask])
+        kernel.append(season.expected_scores(g, strategy)[mask])
+        actual.append(season.history.stats["total_points"][mask, g - 1])
+        t = time.perf_counter()
+        projector.observe(*season_round(season, g))
+        update_seconds.append(time.perf_counter() - t)
+        t = time.perf_counter()
+        refit = RidgeModel(len(FEATURES), alpha, forget)
+        for r in range(min_gameweek, g + 1):
+            refit.update(*projector.cache.rows(r))
+        refit_seconds.append(time.perf_counter() - t)
+    fitted, kernel, actual = (np.concatenate(v) for v in (fitted, kernel, actual))
+    kernel = kernel * (kernel @ actual) / max(kernel @ kernel, 1e-12)
+
+    def metrics(p):
+        return {"rmse": round(float(np.sqrt(np.mean((p - actual) ** 2))), 3),
+                "mae": round(float(np.mean(np.abs(p - actual))), 3),
+                "corr": round(float(np.corrcoef(p, actual)[0, 1]), 3)}
+
+    return {"gameweeks": [start, end], "rows": len(actual), "fitted": metrics(fitted), "kernel": metrics(kernel),
+            "project_ms": round(1000 * float(np.mean(project_seconds)), 3),
+            "update_ms": round(1000 * float(np.mean(update_seconds)), 3),
+            "refit_ms": round(1000 * float(np.mean(refit_seconds)), 3),
+            "refit_gap": float(np.abs(refit.coef - projector.model.coef).max()) if forget == 1.0 else None,
+            "coefficients": projector.coefficients()}
+
+
+def main(argv=None, prog=None) -> None:
+    parser = argparse.ArgumentParser(prog=prog, description="Fit and walk-forward test the projection model")
+    data = parser.add_argument_group("data (default: the snapshot's current season so far)")
+    data.add_argument("--snapshot-dir", default=None)
+    data.add_argument("--synthetic", type=int, default=None, metavar="SEED", help="a generated full season")
+    data.add_argument("--players", type=int, default=600, help="players in the generated season")
+    data.add_argument("--store", default=None, help="a history store; positions and clubs from the snapshot")
+    data.add_argument("--season", default=None, help="season name in --store")
+    parser.add_argument("--start", type=int, default=8, help="first gameweek to project")
+    parser.add_argument("--end", type=int, default=None, help="last gameweek (default: the last one played)")
+    parser.add_argument("--alpha", type=float, default=1.0, help="ridge penalty on standardized features")
+    parser.add_argument("--forget", type=float, default=1.0, help="per-gameweek weight on older rows")
+    parser.add_argument("--min-gameweek", type=int, default=4, help="first gameweek used as training rows")
+    parser.add_argument("--depth", type=int, default=5, help="linear kernel depth of the baseline")
+    args = parser.parse_args(argv)
+    if args.store and not args.season:
+        parser.error("--store needs --season")
+
+    from .backtest import load_season
+    season = load_season(args)
+    result = evaluate(season, args.start, args.end, args.alpha, args.forget, args.min_gameweek, args.depth)
+    print("gameweeks {}-{}, {} player-gameweeks".format(*result["gameweeks"], result["rows"]))
+    for name in ("fitted", "kernel"):
+        m = result[name]
+        print("{:>7s}: rmse {:.3f}  mae {:.3f}  corr {:.3f}".format(name, m["rmse"], m["mae"], m["corr"]))
+    print("project {:.2f} ms, incremental update {:.2f} ms, refit {:.2f} ms per gameweek".format(
+        result["project_ms"], result["update_ms"], result["refit_ms"]))
+    if result["refit_gap"] is not None:
+        print("largest coefficient gap to a refit: {:.1e}".format(result["refit_gap"]))
+    print(" ".join("{}={}".format(k, v) for k, v in result["coefficients"].items()))
+
+
+if __name__ == "__main__":
+    main()
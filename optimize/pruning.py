@@ -0,0 +1,66 @@
+import numpy as np
+from .selection import SQUAD_LIMITS, MAX_PER_CLUB
+
+POSITION_IDS = {'GK': 1, 'DEF': 2, 'MID': 3, 'FWD': 4}
+
+
+def dominance_matrix(scores, prices) -> np.ndarray:
+    # D[a, b] is True when a can always stand in for b: no more expensive, at least as good
+    # (in every column, for players x gameweeks scores).
+    # Exact ties are broken by index so the relation stays acyclic.
+    scores = scores.reshape(len(scores), -1)
+    cheaper = prices[:, None] <= prices[None, :]
+    better = (scores[:, None, :] >= scores[None, :, :]).all(axis=2)
+    strict = (prices[:, None] < prices[None, :]) | (scores[:, None, :] > scores[None, :, :]).any(axis=2)
+    order = np.arange(len(scores))
+    return cheaper & better & (strict | (order[:, None] < order[None, :]))
+
+
+def prune_dominated(scores, prices, positions, clubs, groups=None, squad_limits=SQUAD_LIMITS,
+                    max_per_club=MAX_PER_CLUB, squad_size=15, verbose=True) -> np.ndarray:
+    """Indices of the players that can still appear in some optimal squad.
+
+    A player is dropped when, at the same position (and same ``groups`` value,
+    e.g. a differential bucket), enough other players are no more expensive and
+    score at least as well that one of them is always free to take his place.
+    "Enough" is the number of that position in a squad plus the dominators of
+    the clubs that could already be full: up to (squad_size - 1) // max_per_club
+    other clubs can hold max_per_club players, which blocks every dominator from
+    them, so those are not counted. ``scores`` may be players x gameweeks, in
+    which case a dominator has to be at least as good in every gameweek.
+    """
+    scores = np.asarray(scores, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    positions = np.asarray([POSITION_IDS.get(p, p) for p in positions])
+    clubs = np.asarray(clubs)
+    groups = np.zeros(len(scores), dtype=int) if groups is None else np.asarray(groups)
+    full_clubs = (squad_size - 1) // max_per_club
+
+    keep = np.ones(len(scores), dtype=bool)
+    removed = {}
+    for p, k in squad_limits.items():
+        for g in np.unique(groups):
+            idx = np.flatnonzero((positions == p) & (groups == g))
+            if len(idx) <= k:
+                continue
+            D = dominance_matrix(scores[idx], prices[idx])
+            club_ids, club_of = np.unique(clubs[idx], return_inverse=True)
+            # dominators of each player counted per club, own club excluded from blocking
+            per_club = D.T.astype(np.int32) @ np.eye(len(club_ids), dtype=np.int32)[club_of]
+            blockable = per_club.copy()
+            blockable[np.arange(len(idx)), club_of] = 0
+            blocked = -np.sort(-blockable, axis=1)[:, :full_clubs].sum(axis=1)
+            dominated = per_club.sum(axis=1) - blocked >= k
+            keep[idx[dominated]] = False
+            removed[p] = removed.get(p, 0) + int(dominated.sum())
+
+    if verbose:
+        print("Pruned {} of {} candidates ({})".format(
+            len(scores) - int(keep.sum()), len(scores),
+            ", ".join("{}: {}".format(p, r) for p, r in removed.items())))
+    return np.flatnonzero(keep)
+
+
+def differential_groups(differentials, thresholds=(5, 10)) -> np.ndarray:
+    # select_team constrains starters by ownership band, so only compare players within a band
+    return np.digitize(np.asarray(differentials, dtype=float), thresholds)
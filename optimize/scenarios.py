@@ -0,0 +1,123 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from .dp_solver import select_team_dp
+from .scoring import _fit
+from .selection import select_team_highs
+
+MIN_POINTS = -2.0  # a floor on a single fixture's points (own goals, cards)
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def player_moments(history, kernel, stat="total_points"):
+    # kernel-weighted mean and standard deviation of points per appearance
+    w = _fit(kernel, history.num_gameweeks)
+    played = history.appearances > 0
+    weights = played * w
+    total = weights.sum(axis=1)
+    per_game = np.divide(history.stats[stat], np.maximum(history.appearances, 1))
+    mean = np.divide((weights * per_game).sum(axis=1), total, out=np.zeros(len(history)), where=total > 0)
+    var = np.divide((weights * (per_game - mean[:, None]) ** 2).sum(axis=1), total,
+                    out=np.zeros(len(history)), where=total > 0)
+    return mean, np.sqrt(var)
+
+
+def generate_scenarios(mean, std, num_scenarios=5000, fixture_counts=None, difficulty_factor=None,
+                       clubs=None, club_correlation=0.0, seed=None, dtype=np.float32):
+    """Players x scenarios matrix of sampled gameweek points.
+
+    ``mean``/``std`` are per appearance; a player with ``fixture_counts`` of 2
+    draws twice (0 for a blank). ``difficulty_factor`` (e.g. FixtureTensor.fdr
+    per player) scales the mean. With ``clubs`` given, ``club_correlation`` of
+    the variance is a shock shared by every player of the club.
+    """
+    rng = np.random.default_rng(seed)
+    mean = np.asarray(mean, dtype=float)
+    std = np.asarray(std, dtype=float)
+    n = len(mean)
+    counts = np.ones(n) if fixture_counts is None else np.asarray(fixture_counts, dtype=float)
+    if difficulty_factor is not None:
+        mean = mean * np.asarray(difficulty_factor, dtype=float)
+
+    noise = rng.standard_normal((n, num_scenarios), dtype=np.float32)
+    if clubs is not None and club_correlation > 0:
+        club_ids, club_of = np.unique(np.asarray(clubs), return_inverse=True)
+        shocks = rng.standard_normal((len(club_ids), num_scenarios), dtype=np.float32)
+        noise = np.sqrt(1 - club_correlation) * noise + np.sqrt(club_correlation) * shocks[club_of]
+
+    points = (counts * mean)[:, None] + (np.sqrt(counts) * std)[:, None] * noise
+    points = np.maximum(points, (counts * MIN_POINTS)[:, None])
+    return points.astype(dtype, copy=False)
+
+
+def squad_weights(decisions, captain_decisions, sub_decisions, sub_factor=0.2) -> np.ndarray:
+    # the select_team objective as one row of player weights
+    return (np.asarray(decisions) + np.asarray(captain_decisions)
+            + sub_factor * np.asarray(sub_decisions)).astype(np.float32)
+
+
+def evaluate_squads(weights, scenarios, downside=0.1, threshold=None) -> dict:
+    # squads x players weights against players x scenarios outcomes, all at once
+    weights = np.atleast_2d(np.asarray(weights, dtype=scenarios.dtype))
+    totals = weights @ scenarios
+    worst = np.sort(totals, axis=1)[:, :max(1, int(downside * totals.shape[1]))]
+    metrics = {"mean": totals.mean(axis=1),
+               "std": totals.std(axis=1),
+               "cvar": worst.mean(axis=1)}  # mean of the worst ``downside`` share of scenarios
+    for q, values in zip(PERCENTILES, np.percentile(totals, PERCENTILES, axis=1)):
+        metrics["p{}".format(q)] = values
+    if threshold is not None:
+        metrics["p_below"] = (totals < threshold).mean(axis=1)
+    return metrics
+
+
+# worker state for solve_scenarios, attached once per process
+_shared = {}
+
+
+def _attach(name, shape, dtype, prices, positions, clubs, solver, sub_factor):
+    shm = shared_memory.SharedMemory(name=name)
+    _shared.update(shm=shm, scenarios=np.ndarray(shape, dtype=dtype, buffer=shm.buf), prices=prices,
+                   positions=positions, clubs=clubs, solver=solver, sub_factor=sub_factor)
+
+
+def _solve_columns(columns):
+    # one squad for the mean outcome over ``columns`` (a single scenario or an SAA batch)
+    scores = np.round(_shared["scenarios"][:, columns].mean(axis=1).astype(float), 4)
+    solve = select_team_dp if _shared["solver"] == "dp" else select_team_highs
+    x, y, z = solve(scores, _shared["prices"], _shared["positions"], _shared["clubs"],
+                    sub_factor=_shared["sub_factor"], verbose=False)
+    return squad_weights(x, y, z, _shared["sub_factor"])
+
+
+def solve_scenarios(scenarios, prices, positions, clubs, mode="saa", batch_size=100, max_solves=None,
+                    workers=None, solver="dp", sub_factor=0.2, downside=0.1):
+    """Candidate squads from many scenario-wise solves, ranked on all scenarios.
+
+    ``mode="per_scenario"`` solves each scenario on its own; ``mode="saa"``
+    solves sample-average problems over disjoint batches of ``batch_size``.
+    The scenario matrix is placed in shared memory once and every worker
+    process maps it read-only. Returns (unique squad weights, metrics).
+    """
+    num_scenarios = scenarios.shape[1]
+    if mode == "per_scenario":
+        jobs = [[j] for j in range(num_scenarios)]
+    elif mode == "saa":
+        jobs = [list(range(j, min(j + batch_size, num_scenarios))) for j in range(0, num_scenarios, batch_size)]
+    else:
+        raise ValueError("mode must be 'saa' or 'per_scenario'")
+    jobs = jobs[:max_solves]
+
+    shm = shared_memory.SharedMemory(create=True, size=scenarios.nbytes)
+    try:
+        np.ndarray(scenarios.shape, dtype=scenarios.dtype, buffer=shm.buf)[:] = scenarios
+        init = (shm.name, scenarios.shape, scenarios.dtype, np.asarray(prices), np.asarray(positions),
+                np.asarray(clubs), solver, sub_factor)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=init) as pool:
+            squads = list(pool.map(_solve_columns, jobs, chunksize=max(1, len(jobs) // (4 * (workers or 4)))))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    squads = np.unique(np.vstack(squads), axis=0)
+    return squads, evaluate_squads(squads, scenarios, downside)
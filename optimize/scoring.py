@@ -0,0 +1,118 @@
+import numpy as np
+
+SEASON_GAMEWEEKS = 38
+HISTORY_STATS = ("total_points", "minutes", "goals_scored", "assists", "clean_sheets",
+                 "goals_conceded", "bonus", "bps", "saves", "yellow_cards")
+
+
+class HistoryMatrix:
+    """Dense players x gameweeks arrays of history stats, aligned by ``round``.
+
+    Column ``g`` holds gameweek ``g + 1``. Double gameweeks are summed into one
+    column and blank gameweeks stay zero; ``appearances`` counts the fixtures
+    behind every cell so the two can be told apart.
+    """
+
+    def __init__(self, player_ids, stats, appearances) -> None:
+        self.player_ids = np.asarray(player_ids)
+        self.stats = stats
+        self.appearances = appearances
+        self.row = {pid: i for i, pid in enumerate(self.player_ids.tolist())}
+
+    @classmethod
+    def from_histories(cls, player_ids, histories, stats=HISTORY_STATS, num_gameweeks=SEASON_GAMEWEEKS):
+        rows, cols, values = [], [], {s: [] for s in stats}
+        for r, history in enumerate(histories):
+            for gw in history:
+                rows.append(r)
+                cols.append(gw["round"] - 1)
+                for s in stats:
+                    values[s].append(float(gw.get(s, 0) or 0))
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        width = max(num_gameweeks, int(cols.max()) + 1 if len(cols) else 0)
+        shape = (len(histories), width)
+
+        appearances = np.zeros(shape, dtype=np.int8)
+        np.add.at(appearances, (rows, cols), 1)
+        matrices = {}
+        for s in stats:
+            m = np.zeros(shape)
+            # add.at so double gameweeks accumulate instead of overwriting
+            np.add.at(m, (rows, cols), np.asarray(values[s]))
+            matrices[s] = m
+        return cls(player_ids, matrices, appearances)
+
+    @classmethod
+    def from_players(cls, players, stats=HISTORY_STATS, num_gameweeks=SEASON_GAMEWEEKS):
+        # fpl Player objects or element-summary dicts with a "history" list
+        ids, histories = [], []
+        for p in players:
+            if isinstance(p, dict):
+                ids.append(p.get("id"))
+                histories.append(p.get("history", []))
+            else:
+                ids.append(getattr(p, "id", None))
+                histories.append(getattr(p, "history", []))
+        return cls.from_histories(ids, histories, stats, num_gameweeks)
+
+    @property
+    def num_gameweeks(self) -> int:
+        return self.appearances.shape[1]
+
+    def __len__(self) -> int:
+        return self.appearances.shape[0]
+
+    def score(self, kernel, stat="total_points") -> np.ndarray:
+        # one matrix-vector product for every player
+        return self.stats[stat] @ _fit(kernel, self.num_gameweeks)
+
+    def score_many(self, kernels, stat="total_points") -> np.ndarray:
+        # players x kernels, one matrix-matrix product for any number of schemes
+        W = np.column_stack([_fit(k, self.num_gameweeks) for k in kernels])
+        return self.stats[stat] @ W
+
+    def take(self, pids):
+        idx = np.asarray([self.row[pid] for pid in pids], dtype=np.intp)
+        return HistoryMatrix(self.player_ids[idx], {s: m[idx] for s, m in self.stats.items()},
+                             self.appearances[idx])
+
+
+def _fit(kernel, width) -> np.ndarray:
+    kernel = np.asarray(kernel, dtype=float)
+    if len(kernel) >= width:
+        return kernel[:width]
+    return np.concatenate([kernel, np.zeros(width - len(kernel))])
+
+
+def window_kernel(gameweek, weights, num_gameweeks=SEASON_GAMEWEEKS) -> np.ndarray:
+    # weights[0] applies to ``gameweek``, weights[1] to the one before, ...
+    w = np.zeros(max(num_gameweeks, gameweek))
+    for lag, weight in enumerate(weights):
+        g = gameweek - 1 - lag
+        if g >= 0:
+            w[g] = weight
+    return w
+
+
+def linear_kernel(gameweek, depth=10, num_gameweeks=SEASON_GAMEWEEKS) -> np.ndarray:
+    # get_gameweek_score: weight (i+1)/depth over the last ``depth`` gameweeks up to ``gameweek``
+    return window_kernel(gameweek, [(depth - lag) / depth for lag in range(depth)], num_gameweeks)
+
+
+def decay_kernel(gameweek, depth=10, num_gameweeks=SEASON_GAMEWEEKS) -> np.ndarray:
+    # PlayerLoad.get_adjusted_score: 1 - i/depth from the oldest of the last ``depth`` rounds
+    return window_kernel(gameweek, [1 - (depth - 1 - lag) / depth for lag in range(depth)], num_gameweeks)
+
+
+def bucket_kernel(gameweek, buckets=((3, 1.0), (3, 0.5), (3, 0.2)), num_gameweeks=SEASON_GAMEWEEKS) -> np.ndarray:
+    # test.py: gameweeks 1-3 back at 1.0, 4-6 back at 0.5, 7-9 back at 0.2
+    weights = [0.0]  # the current gameweek itself is not counted
+    for size, weight in buckets:
+        weights += [weight] * size
+    return window_kernel(gameweek, weights, num_gameweeks)
+
+
+def exponential_kernel(gameweek, half_life, depth=None, num_gameweeks=SEASON_GAMEWEEKS) -> np.ndarray:
+    depth = depth or gameweek
+    return window_kernel(gameweek, 0.5 ** (np.arange(depth) / half_life), num_gameweeks)
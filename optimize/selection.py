@@ -0,0 +1,206 @@
+import os
+import tempfile
+import time
+import numpy as np
+from .tracing import milp_stats, pulp_stats
+
+# element_type -> (min starters, max starters) and squad size
+STARTING_LIMITS = {1: (1, 1), 2: (3, 5), 3: (3, 5), 4: (1, 3)}
+SQUAD_LIMITS = {1: 2, 2: 5, 3: 5, 4: 3}
+MAX_PER_CLUB = 3
+# (selected_by_percent below, number of starters) for the differential constraints
+DIFFERENTIAL_LIMITS = ((10, 2), (5, 1))
+
+
+def build_team_model(expected_scores, prices, positions, clubs, differentials=None, total_budget=100,
+                     sub_factor=0.2, differential_limits=DIFFERENTIAL_LIMITS):
+    import pulp
+    num_players = len(expected_scores)
+    model = pulp.LpProblem("Constrained value maximisation", pulp.LpMaximize)
+    decisions = [
+        pulp.LpVariable("x{}".format(i), lowBound=0, upBound=1, cat='Integer')
+        for i in range(num_players)
+    ]
+    captain_decisions = [
+        pulp.LpVariable("y{}".format(i), lowBound=0, upBound=1, cat='Integer')
+        for i in range(num_players)
+    ]
+    sub_decisions = [
+        pulp.LpVariable("z{}".format(i), lowBound=0, upBound=1, cat='Integer')
+        for i in range(num_players)
+    ]
+
+
+    # objective function:
+    model += sum((captain_decisions[i] + decisions[i] + sub_decisions[i]*sub_factor) * expected_scores[i]
+                 for i in range(num_players)), "Objective"
+
+    # cost constraint
+    model += sum((decisions[i] + sub_decisions[i]) * prices[i] for i in range(num_players)) <= total_budget  # total cost
+
+    # position constraints
+    # 1 starting goalkeeper
+    model += sum(decisions[i] for i in range(num_players) if positions[i] == 1) == 1
+    # 2 total goalkeepers
+    model += sum(decisions[i] + sub_decisions[i] for i in range(num_players) if positions[i] == 1) == 2
+
+    # 3-5 starting defenders
+    model += sum(decisions[i] for i in range(num_players) if positions[i] == 2) >= 3
+    model += sum(decisions[i] for i in range(num_players) if positions[i] == 2) <= 5
+    # 5 total defenders
+    model += sum(decisions[i] + sub_decisions[i] for i in range(num_players) if positions[i] == 2) == 5
+
+    # 3-5 starting midfielders
+    model += sum(decisions[i] for i in range(num_players) if positions[i] == 3) >= 3
+    model += sum(decisions[i] for i in range(num_players) if positions[i] == 3) <= 5
+    # 5 total midfielders
+    model += sum(decisions[i] + sub_decisions[i] for i in range(num_players) if positions[i] == 3) == 5
+
+    # 1-3 starting attackers
+    model += sum(decisions[i] for i in range(num_players) if positions[i] == 4) >= 1
+    model += sum(decisions[i] for i in range(num_players) if positions[i] == 4) <= 3
+    # 3 total attackers
+    model += sum(decisions[i] + sub_decisions[i] for i in range(num_players) if positions[i] == 4) == 3
+
+    # club constraint
+    for club_id in np.unique(clubs):
+        model += sum(decisions[i] + sub_decisions[i] for i in range(num_players) if clubs[i] == club_id) <= 3  # max 3 players
+
+    # differential constraint
+    if differentials is not None:
+        for threshold, starters in differential_limits:
+            model += sum(decisions[i] for i in range(num_players) if differentials[i] < threshold) == starters
+
+    # model += sum(decisions[i] for i in range(num_players) if differentials[i] < 1) == 1 
+
+    model += sum(decisions) == 11  # total team size
+    model += sum(captain_decisions) == 1  # 1 captain
+    
+    for i in range(num_players):  
+        model += (decisions[i] - captain_decisions[i]) >= 0  # captain must also be on team
+        model += (decisions[i] + sub_decisions[i]) <= 1  # subs must not be on team
+
+    return model, decisions, captain_decisions, sub_decisions
+
+
+def select_team(expected_scores, prices, positions, clubs, differentials=None, total_budget=100, sub_factor=0.2,
+                solver=None, differential_limits=DIFFERENTIAL_LIMITS, stats=None):
+    # a ``stats`` dict is filled with solver statistics (size, status, CBC nodes and gap)
+    model, decisions, captain_decisions, sub_decisions = build_team_model(
+            expected_scores, prices, positions, clubs, differentials, total_budget, sub_factor, differential_limits)
+    import pulp
+    log_path = None
+    if stats is not None and solver is None:
+        # CBC only reports nodes and gap in its log
+        fd, log_path = tempfile.mkstemp(suffix=".log")
+        os.close(fd)
+        solver = pulp.PULP_CBC_CMD(msg=False, logPath=log_path)
+    try:
+        model.solve(solver)
+        if stats is not None:
+            stats.update(pulp_stats(model, log_path))
+    finally:
+        if log_path:
+            os.remove(log_path)
+    print("Total expected score = {}".format(model.objective.value()))
+
+    return decisions, captain_decisions, sub_decisions
+
+
+def formation_limits(formation) -> dict:
+    # "3-4-3" (defenders-midfielders-forwards) as fixed starting limits
+    try:
+        counts = [int(c) for c in formation.split("-")]
+    except (AttributeError, ValueError):
+        raise ValueError("formation must look like '3-4-3', got {!r}".format(formation))
+    limits = {1: (1, 1)}
+    for position, count in zip((2, 3, 4), counts):
+        lo, hi = STARTING_LIMITS[position]
+        if not lo <= count <= hi:
+            raise ValueError("formation {} has {} players at position {}, allowed {}-{}".format(
+                formation, count, position, lo, hi))
+        limits[position] = (count, count)
+    if len(counts) != 3 or sum(counts) != 10:
+        raise ValueError("formation {} does not have 10 outfield players".format(formation))
+    return limits
+
+
+def one_hot(values, categories=None) -> "sparse.csr_matrix":
+    # categories x players indicator matrix
+    from scipy import sparse
+    values = np.asarray(values)
+    categories = np.unique(values) if categories is None else np.asarray(categories)
+    rows = np.searchsorted(categories, values)
+    return sparse.csr_matrix((np.ones(len(values)), (rows, np.arange(len(values)))),
+                             shape=(len(categories), len(values)))
+
+
+def build_squad_milp(expected_scores, prices, positions, clubs, differentials=None, total_budget=100,
+                     sub_factor=0.2, differential_limits=DIFFERENTIAL_LIMITS, locked=None,
+                     starting_limits=STARTING_LIMITS):
+    # the select_team model in matrix form over the stacked variables [x | y | z];
+    # ``locked`` are indexes that must be in the squad
+    from scipy import sparse
+    from scipy.optimize import LinearConstraint
+    scores = np.asarray(expected_scores, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    n = len(scores)
+    P = one_hot(positions, list(STARTING_LIMITS))
+    T = one_hot(clubs)
+    I = sparse.identity(n, format="csr")
+    Z = sparse.csr_matrix((1, n))
+    ones = sparse.csr_matrix(np.ones((1, n)))
+
+    rows, lower, upper = [], [], []
+
+    def add(x=None, y=None, z=None, lb=-np.inf, ub=np.inf):
+        height = next(m.shape[0] for m in (x, y, z) if m is not None)
+        blank = sparse.csr_matrix((height, n))
+        rows.append(sparse.hstack([blank if m is None else m for m in (x, y, z)]))
+        lower.append(np.broadcast_to(lb, height))
+        upper.append(np.broadcast_to(ub, height))
+
+    cost = sparse.csr_matrix(prices.reshape(1, -1))
+    add(cost, None, cost, ub=total_budget)
+    add(P, lb=[starting_limits[p][0] for p in STARTING_LIMITS], ub=[starting_limits[p][1] for p in STARTING_LIMITS])
+    squad = [SQUAD_LIMITS[p] for p in SQUAD_LIMITS]
+    add(P, None, P, lb=squad, ub=squad)
+    add(T, None, T, ub=MAX_PER_CLUB)
+    if differentials is not None:
+        differentials = np.asarray(differentials, dtype=float)
+        for threshold, starters in differential_limits:
+            add(sparse.csr_matrix((differentials < threshold).astype(float).reshape(1, -1)), lb=starters, ub=starters)
+    add(ones, lb=11, ub=11)
+    add(Z, ones, Z, lb=1, ub=1)
+    add(-I, I, None, ub=0)  # captain must also be on team
+    add(I, None, I, ub=1)  # subs must not be on team
+    if locked is not None and len(locked):
+        L = sparse.csr_matrix((np.ones(len(locked)), (np.arange(len(locked)), locked)), shape=(len(locked), n))
+        add(L, None, L, lb=1)
+
+    A = sparse.vstack(rows, format="csr")
+    c = -np.concatenate([scores, scores, sub_factor * scores])
+    constraints = LinearConstraint(A, np.concatenate(lower), np.concatenate(upper))
+    return c, constraints
+
+
+def select_team_highs(expected_scores, prices, positions, clubs, differentials=None, total_budget=100,
+                      sub_factor=0.2, time_limit=None, verbose=True, differential_limits=DIFFERENTIAL_LIMITS,
+                      stats=None, locked=None, starting_limits=STARTING_LIMITS):
+    # same model as select_team, solved in-process by HiGHS; returns 0/1 arrays
+    from scipy.optimize import Bounds, milp
+    n = len(expected_scores)
+    c, constraints = build_squad_milp(expected_scores, prices, positions, clubs, differentials,
+                                      total_budget, sub_factor, differential_limits, locked, starting_limits)
+    options = {"time_limit": time_limit} if time_limit else {}
+    start = time.perf_counter()
+    res = milp(c, constraints=constraints, integrality=np.ones(len(c)), bounds=Bounds(0, 1), options=options)
+    if stats is not None:
+        stats.update(milp_stats(res, c, constraints), solve_seconds=time.perf_counter() - start)
+    if res.x is None:
+        raise RuntimeError("squad model could not be solved: {}".format(res.message))
+    if verbose:
+        print("Total expected score = {}".format(-res.fun))
+
+    chosen = np.round(res.x).astype(int)
+    return chosen[:n], chosen[n:2 * n], chosen[2 * n:]
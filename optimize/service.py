@@ -0,0 +1,320 @@
+from aiohttp import web
+import argparse
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .ingest import ingest, use_selector_event_loop
+from .pool import CandidatePool
+from .pruning import differential_groups, prune_dominated
+from .selection import DIFFERENTIAL_LIMITS, STARTING_LIMITS, formation_limits, select_team_highs
+from .snapshot import SnapshotStore
+
+# Long-running squad optimizer over HTTP. The candidate pool is loaded once,
+# scores are kept per scoring setting, and answers are cached by a hash of
+# the canonical request; identical requests in flight share one solve.
+#
+#   POST /solve  {"budget": 99.5, "lock": [355], "exclude": [12], "formation": "3-4-3", ...}
+#   GET  /stats  cache and solve counters
+#   POST /reload re-read the snapshot (or fetch, unless offline) and drop the caches
+
+REQUEST_DEFAULTS = {
+    "budget": 100.0,
+    "sub_factor": 0.2,
+    "lock": [],
+    "exclude": [],
+    "formation": None,
+    "differentials": True,
+    "solver": "highs",
+    "gameweek": None,
+    "depth": 5,
+    "num_gws": 1,
+    "fdr_horizon": 5,
+    "fdr_weight": 0.0,
+}
+SCORE_KEYS = ("gameweek", "depth", "num_gws", "fdr_horizon", "fdr_weight")
+SOLVERS = ("highs", "pyomo")
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class SolveCancelled(RuntimeError):
+    # the request that was solving a key went away; coalesced waiters get this and may retry
+    pass
+
+
+def canonical_request(body, gameweeks=None) -> dict:
+    # defaults filled in, ids sorted and de-duplicated, numbers normalized; ``gameweeks`` is the range with fixtures
+    unknown = set(body) - set(REQUEST_DEFAULTS)
+    if unknown:
+        raise BadRequest("unknown fields: {}".format(", ".join(sorted(unknown))))
+    req = {**REQUEST_DEFAULTS, **body}
+    try:
+        for key in ("budget", "sub_factor", "fdr_weight"):
+            req[key] = round(float(req[key]), 4)
+        for key in ("depth", "num_gws", "fdr_horizon"):
+            req[key] = int(req[key])
+        req["gameweek"] = None if req["gameweek"] is None else int(req["gameweek"])
+        req["lock"] = sorted({int(i) for i in req["lock"]})
+        req["exclude"] = sorted({int(i) for i in req["exclude"]})
+    except (TypeError, ValueError) as e:
+        raise BadRequest(str(e))
+    for key in ("depth", "num_gws", "fdr_horizon"):
+        if req[key] < 1:
+            raise BadRequest("{} must be at least 1".format(key))
+    if gameweeks is not None and req["gameweek"] is not None and req["gameweek"] not in gameweeks:
+        raise BadRequest("gameweek must be between {} and {}".format(gameweeks.start, gameweeks.stop - 1))
+    req["differentials"] = bool(req["differentials"])
+    if req["solver"] not in SOLVERS:
+        raise BadRequest("solver must be one of {}".format(", ".join(SOLVERS)))
+    if set(req["lock"]) & set(req["exclude"]):
+        raise BadRequest("players both locked and excluded")
+    if req["formation"] is not None:
+        if req["solver"] == "pyomo":
+            raise BadRequest("the pyomo squad model has no lineup, so no formation")
+        try:
+            formation_limits(req["formation"])
+        except ValueError as e:
+            raise BadRequest(str(e))
+    return req
+
+
+def request_key(req) -> str:
+    raw = json.dumps(req, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+class LRUCache:
+    def __init__(self, maxsize=256) -> None:
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+
+    def get(self, key):
+        value = self.items.get(key)
+        if value is not None:
+            self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def clear(self) -> None:
+        self.items.clear()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class OptimizerService:
+    """Answers squad queries against one in-memory candidate pool.
+
+    Solves run on a thread pool so the event loop keeps serving; the Pyomo
+    model is built on first use and re-solved under a lock with the request's
+    scores, budget and fixed players.
+    """
+
+    def __init__(self, pool, cache_size=256, score_cache_size=32, workers=4) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.cache = LRUCache(cache_size)
+        self.scores = LRUCache(score_cache_size)
+        self.inflight = {}
+        self.counters = {"requests": 0, "hits": 0, "coalesced": 0, "solves": 0, "errors": 0, "solve_seconds": 0.0}
+        self.squad_model = None
+        self.squad_pool = None  # the pool squad_model was built from
+        self.squad_lock = threading.Lock()
+        self.set_pool(pool)
+
+    def set_pool(self, pool) -> None:
+        self.pool = pool
+        self.index = {int(pid): i for i, pid in enumerate(pool.ids)}
+        self.cache.clear()
+        self.scores.clear()
+
+    def expected_scores(self, req) -> np.ndarray:
+        key = tuple(req[k] for k in SCORE_KEYS)
+        scores = self.scores.get(key)
+        if scores is None:
+            scores = np.round(self.pool.expected_scores(**{k: req[k] for k in SCORE_KEYS}), 4)
+            self.scores.put(key, scores)
+        return scores
+
+    async def solve(self, body) -> dict:
+        fixtures = self.pool.fixtures
+        req = canonical_request(body, range(self.pool.next_gameweek, fixtures.count.shape[1]))
+        key = request_key(req)
+        self.counters["requests"] += 1
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.counters["hits"] += 1
+            return {**cached, "cached": True}
+        future = self.inflight.get(key)
+        if future is not None:
+            self.counters["coalesced"] += 1
+            return {**await asyncio.shield(future), "cached": True}
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.inflight[key] = future
+        try:
+            # scores and the pool are taken here so worker threads never touch shared caches
+            pool = self.pool
+            result = await loop.run_in_executor(self.executor, self._solve, req, pool, self.index,
+                                                self.expected_scores(req))
+            result["key"] = key
+            self.counters["solves"] += 1
+            self.counters["solve_seconds"] += result["seconds"]
+            if pool is self.pool:  # not reloaded meanwhile
+                self.cache.put(key, result)
+            future.set_result(result)
+        except Exception as e:
+            self.counters["errors"] += 1
+            future.set_exception(e)
+            # waiters re-raise it; mark it retrieved for the case where nobody waited
+            future.exception()
+            raise
+        except asyncio.CancelledError:
+            # the first requester disconnected; release anyone coalesced onto its solve
+            future.set_exception(SolveCancelled("the solve this request was waiting on was cancelled, retry"))
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+        return {**result, "cached": False}
+
+    def _solve(self, req, pool, index, scores) -> dict:
+        start = time.perf_counter()
+        missing = [pid for pid in req["lock"] + req["exclude"] if pid not in index]
+        if missing:
+            raise BadRequest("players not in the candidate pool: {}".format(missing))
+        locked = [index[pid] for pid in req["lock"]]
+        if req["solver"] == "pyomo":
+            x, y, z = self._solve_squad_model(req, pool, scores, locked, [index[pid] for pid in req["exclude"]])
+        else:
+            x, y, z = self._solve_highs(req, pool, scores, locked)
+        seconds = time.perf_counter() - start
+
+        roles = {"start": x, "captain": y, "sub": z}
+        squad = np.flatnonzero(x + z)
+        return {"objective": round(float(((x + y + req["sub_factor"] * z) * scores).sum()), 4),
+                "cost": round(float(pool.prices[squad].sum()), 1),
+                "starting": [int(pool.ids[i]) for i in np.flatnonzero(x)],
+                "captain": [int(pool.ids[i]) for i in np.flatnonzero(y)],
+                "subs": [int(pool.ids[i]) for i in np.flatnonzero(z)],
+                "players": [{"id": int(pool.ids[i]), "name": str(pool.names[i]),
+                             "position": int(pool.positions[i]), "club": int(pool.clubs[i]),
+                             "price": float(pool.prices[i]), "score": float(scores[i]),
+                             "roles": [r for r, v in roles.items() if v[i]]} for i in squad],
+                "solver": req["solver"],
+                "seconds": round(seconds, 4)}
+
+    def _solve_highs(self, req, pool, scores, locked):
+        n = len(pool)
+        cand = np.flatnonzero(~np.isin(pool.ids, req["exclude"]))
+        groups = differential_groups(pool.differentials[cand]) if req["differentials"] else None
+        if req["formation"] is None and not locked:
+            # pruning assumes the default lineup limits and nobody forced in
+            cand = cand[prune_dominated(scores[cand], pool.prices[cand], pool.positions[cand], pool.clubs[cand],
+                                        groups=groups, verbose=False)]
+        limits = STARTING_LIMITS if req["formation"] is None else formation_limits(req["formation"])
+        try:
+            x, y, z = select_team_highs(scores[cand], pool.prices[cand], pool.positions[cand], pool.clubs[cand],
+                                        pool.differentials[cand] if req["differentials"] else None,
+                                        total_budget=req["budget"], sub_factor=req["sub_factor"], verbose=False,
+                                        differential_limits=DIFFERENTIAL_LIMITS,
+                                        locked=np.searchsorted(cand, locked), starting_limits=limits)
+        except RuntimeError as e:
+            raise BadRequest(str(e))
+        full = [np.zeros(n, dtype=int) for _ in range(3)]
+        for out, chosen in zip(full, (x, y, z)):
+            out[cand] = chosen
+        return full
+
+    def _solve_squad_model(self, req, pool, scores, locked, excluded):
+        from .squad_model import SquadModel
+        with self.squad_lock:
+            if self.squad_model is None or self.squad_pool is not pool:
+                self.squad_model = SquadModel(scores, pool.prices, pool.positions, pool.clubs, req["budget"])
+                self.squad_pool = pool
+            model = self.squad_model
+            model.set_scores(scores)
+            model.set_budget(req["budget"])
+            model.release()
+            model.lock(*locked)
+            model.exclude(*excluded)
+            try:
+                squad = np.zeros(len(pool), dtype=int)
+                squad[model.solve()] = 1
+            except RuntimeError as e:
+                raise BadRequest(str(e))
+            finally:
+                model.release()
+        return squad, np.zeros_like(squad), np.zeros_like(squad)
+
+    def stats(self) -> dict:
+        return {**self.counters, "cached": len(self.cache), "inflight": len(self.inflight),
+                "players": len(self.pool), "gameweek": self.pool.next_gameweek}
+
+
+def make_app(service, loader=None) -> web.Application:
+    async def solve(request):
+        try:
+            body = await request.json() if request.can_read_body else {}
+            if not isinstance(body, dict):
+                raise BadRequest("request body must be a JSON object")
+            return web.json_response(await service.solve(body))
+        except json.JSONDecodeError as e:
+            return web.json_response({"error": "invalid JSON: {}".format(e)}, status=400)
+        except BadRequest as e:
+            return web.json_response({"error": str(e)}, status=400)
+        except SolveCancelled as e:
+            return web.json_response({"error": str(e)}, status=503)
+
+    async def stats(request):
+        return web.json_response(service.stats())
+
+    async def reload(request):
+        if loader is None:
+            raise web.HTTPNotImplemented()
+        service.set_pool(await loader())
+        return web.json_response(service.stats())
+
+    app = web.Application()
+    app.router.add_post("/solve", solve)
+    app.router.add_get("/stats", stats)
+    app.router.add_post("/reload", reload)
+    return app
+
+
+def pool_loader(store, min_minutes=500, min_chance=50):
+    async def load():
+        return CandidatePool.from_ingest(await ingest(store), min_minutes, min_chance)
+    return load
+
+
+def main(argv=None, prog=None) -> None:
+    parser = argparse.ArgumentParser(prog=prog, description="Serve squad optimizations over HTTP")
+    parser.add_argument("--snapshot-dir", default=None)
+    parser.add_argument("--offline", action="store_true", help="serve a recorded snapshot, never fetch")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--cache-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    use_selector_event_loop()
+    loader = pool_loader(SnapshotStore(args.snapshot_dir, offline=True if args.offline else None))
+    service = OptimizerService(asyncio.run(loader()), args.cache_size, workers=args.workers)
+    web.run_app(make_app(service, loader), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import asyncio
+import gzip
+import json
+import os
+import time
+
+# bump when the layout of a snapshot file changes so stale copies are ignored
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".fpl_optimizer", "snapshots")
+DEFAULT_TTL = 6 * 60 * 60  # seconds
+
+
+class SnapshotMiss(Exception):
+    pass
+
+
+class SnapshotStore:
+    """Versioned, gzip-compressed copies of FPL API payloads keyed by gameweek.
+
+    Files live under ``<root>/v<SNAPSHOT_VERSION>/gw<gameweek>/<name>.json.gz``.
+    A snapshot older than ``ttl`` seconds is treated as missing, except in
+    offline mode where whatever is on disk is used and nothing is fetched.
+    """
+
+    def __init__(self, root=None, ttl=DEFAULT_TTL, offline=None) -> None:
+        self.root = os.path.join(root or os.environ.get("FPL_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR),
+                                 "v{}".format(SNAPSHOT_VERSION))
+        self.ttl = ttl
+        if offline is None:
+            offline = os.environ.get("FPL_OFFLINE", "") not in ("", "0")
+        self.offline = offline
+
+    def path(self, name, gameweek) -> str:
+        return os.path.join(self.root, "gw{}".format(gameweek), "{}.json.gz".format(name))
+
+    def is_fresh(self, path, ignore_ttl=False) -> bool:
+        if not os.path.exists(path):
+            return False
+        if self.offline or self.ttl is None or ignore_ttl:
+            return True
+        return time.time() - os.path.getmtime(path) < self.ttl
+
+    def load(self, name, gameweek, ignore_ttl=False):
+        path = self.path(name, gameweek)
+        if not self.is_fresh(path, ignore_ttl):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, name, gameweek, data) -> None:
+        path = self.path(name, gameweek)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write then rename so a crashed run never leaves a truncated snapshot
+        tmp = path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def current_gameweek(self, ignore_ttl=False):
+        path = os.path.join(self.root, "current.json")
+        if not self.is_fresh(path, ignore_ttl):
+            return None
+        with open(path) as f:
+            return json.load(f)["gameweek"]
+
+    def set_current_gameweek(self, gameweek) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "current.json"), "w") as f:
+            json.dump({"gameweek": gameweek, "saved_at": time.time()}, f)
+
+    def require(self, name, gameweek):
+        data = self.load(name, gameweek)
+        if data is None:
+            raise SnapshotMiss("no snapshot '{}' for gameweek {} in {}".format(name, gameweek, self.root))
+        return data
+
+
+_default_store = None
+
+
+def default_store() -> SnapshotStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = SnapshotStore()
+    return _default_store
+
+
+async def fetch_bootstrap_players(store=None):
+    # returns (gameweek, list of bootstrap player dicts)
+    store = store or default_store()
+    gameweek = store.current_gameweek()
+    if gameweek is not None:
+        players = store.load("players", gameweek)
+        if players is not None:
+            return gameweek, players
+    if store.offline:
+        raise SnapshotMiss("offline mode and no bootstrap snapshot in {}".format(store.root))
+
+    import aiohttp
+    from fpl import FPL
+    async with aiohttp.ClientSession() as session:
+        fpl = FPL(session)
+        gameweek = fpl.current_gameweek
+        players = await fpl.get_players(return_json=True)
+    store.save("players", gameweek, players)
+    store.set_current_gameweek(gameweek)
+    return gameweek, players
+
+
+async def fetch_all_players(ret_json=True, store=None):
+    _, players = await fetch_bootstrap_players(store)
+    if ret_json:
+        return players
+    from fpl.models.player import Player
+    return [Player(p, None) for p in players]
+
+
+async def fetch_players(pids, store=None) -> list:
+    # bootstrap rows merged with their element summary, like fpl's include_summary=True
+    store = store or default_store()
+    gameweek, bootstrap = await fetch_bootstrap_players(store)
+    summaries = store.load("summaries", gameweek) or {}
+    missing = [pid for pid in pids if str(pid) not in summaries]
+
+    if missing:
+        if store.offline:
+            raise SnapshotMiss("offline mode and {} player summaries missing".format(len(missing)))
+        import aiohttp
+        from fpl import FPL
+        async with aiohttp.ClientSession() as session:
+            fpl = FPL(session)
+            fetched = await asyncio.gather(*[fpl.get_player_summary(pid, return_json=True) for pid in missing])
+        for pid, summary in zip(missing, fetched):
+            summaries[str(pid)] = summary
+        store.save("summaries", gameweek, summaries)
+
+    from fpl.models.player import Player
+    rows = {p["id"]: p for p in bootstrap}
+    return [Player({**rows[pid], **summaries[str(pid)]}, None) for pid in pids]
+
+
+async def fetch_team_fixtures(team_id, store=None) -> list:
+    store = store or default_store()
+    gameweek = store.current_gameweek()
+    if gameweek is None:
+        gameweek, _ = await fetch_bootstrap_players(store)
+    fixtures = store.load("team_fixtures", gameweek) or {}
+
+    if str(team_id) not in fixtures:
+        if store.offline:
+            raise SnapshotMiss("offline mode and no fixtures for team {}".format(team_id))
+        import aiohttp
+        from fpl import FPL
+        async with aiohttp.ClientSession() as session:
+            fpl = FPL(session)
+            team = await fpl.get_team(team_id)
+            fixtures[str(team_id)] = await team.get_fixtures()
+        store.save("team_fixtures", gameweek, fixtures)
+
+    return fixtures[str(team_id)]
@@ -0,0 +1,230 @@
+import time
+import pyomo.environ as pyo
+from pyomo.contrib import appsi
+
+SQUAD_SIZES = {'GK': 2, 'DEF': 5, 'MID': 5, 'FWD': 3}
+POSITION_NAMES = {1: 'GK', 2: 'DEF', 3: 'MID', 4: 'FWD'}
+# in-process solvers that keep the model loaded between solves, in order of preference
+PERSISTENT_SOLVERS = ('highs', 'gurobi', 'cplex', 'cbc')
+FALLBACK_SOLVERS = ('glpk', 'cbc')
+
+
+class SquadModel:
+    """The 15-man squad model from pyomo_model.py, built once and re-solved.
+
+    Scores, costs and the budget are mutable params and players can be fixed in
+    or out, so a what-if only pushes the changed coefficients to a persistent
+    solver which starts from the previous incumbent.
+    """
+
+    def __init__(self, scores, costs, positions, clubs, budget=100, max_per_club=3, solver=None) -> None:
+        positions = [POSITION_NAMES.get(p, p) for p in positions]
+        n = len(scores)
+        model = pyo.ConcreteModel()
+
+        # parameters
+        model.I = pyo.Set(initialize=list(range(n)))
+        model.P = pyo.Set(initialize=sorted(set(positions)))
+        model.T = pyo.Set(initialize=sorted(set(clubs)))
+        model.S = pyo.Param(model.I, initialize=dict(enumerate(map(float, scores))), mutable=True)  # score
+        model.C = pyo.Param(model.I, initialize=dict(enumerate(map(float, costs))), mutable=True)  # cost
+        model.budget = pyo.Param(initialize=budget, mutable=True)
+        model.squad_size = pyo.Param(model.P, initialize=SQUAD_SIZES, mutable=True)
+        model.max_per_club = pyo.Param(initialize=max_per_club, mutable=True)
+
+        by_position = {p: [i for i in range(n) if positions[i] == p] for p in model.P}
+        by_club = {t: [i for i in range(n) if clubs[i] == t] for t in model.T}
+
+        # variables
+        model.B = pyo.Var(model.I, domain=pyo.Binary)
+
+        # constraints
+        model.total_player_rule = pyo.Constraint(expr=sum(model.B[i] for i in model.I) == 15)
+        model.cost_rule = pyo.Constraint(expr=sum(model.B[i] * model.C[i] for i in model.I) <= model.budget)
+        model.position_rule = pyo.Constraint(
+            model.P, rule=lambda m, p: sum(m.B[i] for i in by_position[p]) == m.squad_size[p])
+        model.club_rule = pyo.Constraint(
+            model.T, rule=lambda m, t: sum(m.B[i] for i in by_club[t]) <= m.max_per_club)
+
+        # no-good / diversity cuts added by top_k
+        model.cuts = pyo.ConstraintList()
+
+        # objective
+        model.OBJ = pyo.Objective(expr=sum(model.B[i] * model.S[i] for i in model.I), sense=pyo.maximize)
+
+        self.model = model
+        self.positions = positions
+        self.clubs = list(clubs)
+        self.persistent, self.solver = self._make_solver(solver)
+        self.stats = {}  # statistics of the last solve
+        self._cuts = []  # (players, max_overlap) of every cut, for neighbour()
+
+    @staticmethod
+    def _make_solver(name):
+        # a persistent appsi interface if one is installed, else a cold-start solver such as glpk
+        for candidate in ([name] if name else PERSISTENT_SOLVERS):
+            solver = appsi.base.SolverFactory(candidate)
+            if solver is not None and solver.available():
+                solver.config.warmstart = True
+                solver.config.load_solution = False
+                # the variables and params never change after construction, only their values
+                solver.update_config.check_for_new_or_removed_vars = False
+                solver.update_config.check_for_new_or_removed_params = False
+                solver.update_config.update_named_expressions = False
+                # cuts are pushed explicitly in add_cut/clear_cuts
+                solver.update_config.check_for_new_or_removed_constraints = False
+                solver.update_config.update_constraints = False
+                return True, solver
+        for candidate in ([name] if name else FALLBACK_SOLVERS):
+            solver = pyo.SolverFactory(candidate)
+            if solver.available(exception_flag=False):
+                return False, solver
+        raise RuntimeError("no MILP solver available (tried {})".format(name or PERSISTENT_SOLVERS + FALLBACK_SOLVERS))
+
+    def set_scores(self, scores) -> None:
+        items = scores.items() if isinstance(scores, dict) else enumerate(scores)
+        for i, s in items:
+            self.model.S[i] = float(s)
+
+    def set_costs(self, costs) -> None:
+        items = costs.items() if isinstance(costs, dict) else enumerate(costs)
+        for i, c in items:
+            self.model.C[i] = float(c)
+
+    def set_budget(self, budget) -> None:
+        self.model.budget = budget
+
+    def exclude(self, *players) -> None:
+        for i in players:
+            self.model.B[i].fix(0)
+
+    def lock(self, *players) -> None:
+        for i in players:
+            self.model.B[i].fix(1)
+
+    def release(self, *players) -> None:
+        for i in players or list(self.model.I):
+            self.model.B[i].unfix()
+
+    def add_cut(self, players, max_overlap):
+        # at most max_overlap of these players may be picked together again
+        con = self.model.cuts.add(sum(self.model.B[i] for i in players) <= max_overlap)
+        self._cuts.append((set(players), max_overlap))
+        if self.persistent:
+            self.solver.add_constraints([con])
+        return con
+
+    def clear_cuts(self) -> None:
+        if self.persistent and len(self.model.cuts):
+            self.solver.remove_constraints(list(self.model.cuts.values()))
+        self.model.del_component(self.model.cuts)
+        self.model.cuts = pyo.ConstraintList()
+        self._cuts = []
+
+    def top_k(self, k, min_changes=1) -> list:
+        """The k best distinct squads, each differing from every earlier one in at
+        least ``min_changes`` players, as (selection, objective, cumulative seconds).
+
+        Each squad found adds one cut to the live model. The persistent solver
+        saves rebuilding the model, but every extra squad is a full
+        branch-and-bound (warm-started from neighbour()) and the cuts make later
+        ones dearer, so the time grows at least linearly in k. Fewer than k are
+        returned if the cuts make the model infeasible. The cuts stay in the
+        model until clear_cuts().
+        """
+        squad_size = pyo.value(sum(self.model.squad_size[p] for p in self.model.P))
+        results = []
+        start = time.perf_counter()
+        for _ in range(k):
+            try:
+                selection = self.solve()
+            except RuntimeError:
+                break
+            results.append((selection, self.objective(), time.perf_counter() - start))
+            self.add_cut(selection, squad_size - min_changes)
+            start_squad = self.neighbour(selection, min_changes)
+            if start_squad is not None:
+                for i in self.model.I:
+                    if not self.model.B[i].fixed:
+                        self.model.B[i].set_value(int(i in start_squad))
+        return results
+
+    def neighbour(self, selection, changes=1):
+        """A squad ``changes`` greedy best swaps away from ``selection`` that passes every cut.
+
+        top_k hands it to the next solve as the MIP start: the cut makes the
+        last incumbent infeasible, and the next-best squad is usually a swap
+        or two away, so this lets the solver prune from the start. None if
+        no swap fits the budget, club limits and cuts.
+        """
+        m = self.model
+        scores = {i: pyo.value(m.S[i]) for i in m.I}
+        costs = {i: pyo.value(m.C[i]) for i in m.I}
+        budget, max_per_club = pyo.value(m.budget), pyo.value(m.max_per_club)
+        squad = set(selection)
+        spent = sum(costs[i] for i in squad)
+        per_club = {}
+        for i in squad:
+            per_club[self.clubs[i]] = per_club.get(self.clubs[i], 0) + 1
+        moved = set()
+        for step in range(changes):
+            swaps = []
+            for o in squad - moved:
+                if m.B[o].fixed:
+                    continue
+                for i in m.I:
+                    if (i in squad or i in moved or m.B[i].fixed or self.positions[i] != self.positions[o]
+                            or spent - costs[o] + costs[i] > budget + 1e-9):
+                        continue
+                    if self.clubs[i] != self.clubs[o] and per_club.get(self.clubs[i], 0) >= max_per_club:
+                        continue
+                    swaps.append((scores[i] - scores[o], o, i))
+            swaps.sort(reverse=True)
+            if step == changes - 1:
+                # the last swap is the best one that passes every cut
+                swaps = [sw for sw in swaps if self._passes_cuts((squad - {sw[1]}) | {sw[2]})][:1]
+            if not swaps:
+                return None
+            _, o, i = swaps[0]
+            squad = (squad - {o}) | {i}
+            moved |= {o, i}
+            spent += costs[i] - costs[o]
+            per_club[self.clubs[o]] -= 1
+            per_club[self.clubs[i]] = per_club.get(self.clubs[i], 0) + 1
+        return squad
+
+    def _passes_cuts(self, squad) -> bool:
+        return all(len(squad & players) <= max_overlap for players, max_overlap in self._cuts)
+
+    def solve(self) -> list:
+        start = time.perf_counter()
+        self.stats = {"solver": getattr(self.solver, "name", type(self.solver).__name__),
+                      "variables": self.model.nvariables(),
+                      "constraints": self.model.nconstraints(),
+                      "solves": self.stats.get("solves", 0) + 1}
+        if self.persistent:
+            # the previous incumbent is still in B and is handed over as the MIP start
+            res = self.solver.solve(self.model)
+            self.stats.update(status=res.termination_condition.name, solve_seconds=time.perf_counter() - start,
+                              bound=res.best_objective_bound)
+            if res.termination_condition != appsi.base.TerminationCondition.optimal:
+                raise RuntimeError("squad model not solved: {}".format(res.termination_condition))
+            res.solution_loader.load_vars()
+        else:
+            status = self.solver.solve(self.model)
+            self.stats.update(status=status.solver.termination_condition.name,
+                              solve_seconds=time.perf_counter() - start,
+                              bound=getattr(status.problem, "upper_bound", None))
+            if status.solver.termination_condition != pyo.TerminationCondition.optimal:
+                raise RuntimeError("squad model not solved: {}".format(status.solver.termination_condition))
+        objective = self.objective()
+        bound = self.stats["bound"]
+        self.stats.update(objective=objective,
+                          gap=abs(bound - objective) / max(abs(objective), 1e-9) if bound is not None else None)
+        return self.selection()
+
+    def selection(self) -> list:
+        return [i for i in self.model.I if (pyo.value(self.model.B[i], exception=False) or 0) > 0.5]
+
+    def objective(self) -> float:
+        return pyo.value(self.model.OBJ)
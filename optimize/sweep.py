@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import csv
+import itertools
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .ingest import ingest
+from .pool import CandidatePool
+from .pruning import differential_groups, prune_dominated
+from .selection import select_team_highs
+
+# Grid search over the optimizer's tuning knobs. The data is fetched (or read
+# from the snapshot) once, the candidate pool is handed to every worker
+# process at start-up, and each result row is written as soon as it arrives.
+
+SCORE_PARAMS = ("gameweek", "depth", "num_gws", "fdr_horizon", "fdr_weight")
+SOLVE_PARAMS = ("total_budget", "sub_factor", "diff_high", "diff_low")
+COLUMNS = SCORE_PARAMS + SOLVE_PARAMS + ("objective", "solve_seconds", "captain", "squad", "error")
+
+_pool = None
+
+
+def _init(pool):
+    global _pool
+    _pool = pool
+
+
+def run_config(config) -> dict:
+    pool = _pool
+    row = dict(config)
+    start = time.perf_counter()
+    try:
+        scores = pool.expected_scores(**{k: config[k] for k in SCORE_PARAMS})
+        limits = ((config["diff_high"], 2), (config["diff_low"], 1))
+        groups = differential_groups(pool.differentials, (config["diff_low"], config["diff_high"]))
+        keep = prune_dominated(scores, pool.prices, pool.positions, pool.clubs, groups=groups, verbose=False)
+        x, y, z = select_team_highs(scores[keep], pool.prices[keep], pool.positions[keep], pool.clubs[keep],
+                                    pool.differentials[keep], total_budget=config["total_budget"],
+                                    sub_factor=config["sub_factor"], verbose=False, differential_limits=limits)
+        row["objective"] = round(float(((x + y + config["sub_factor"] * z) * scores[keep]).sum()), 3)
+        row["captain"] = int(pool.ids[keep][y.argmax()])
+        row["squad"] = ";".join(str(i) for i in pool.ids[keep][(x + z) > 0])
+    except RuntimeError as e:
+        row["error"] = str(e)
+    row["solve_seconds"] = round(time.perf_counter() - start, 4)
+    return row
+
+
+def grid(**axes) -> list:
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def sweep(pool, configs, out, workers=None) -> int:
+    writer = csv.DictWriter(out, fieldnames=COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(pool,)) as executor:
+        for future in as_completed([executor.submit(run_config, c) for c in configs]):
+            writer.writerow(future.result())
+            out.flush()
+            done += 1
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a grid of optimizer settings in parallel")
+    parser.add_argument("--gameweek", type=int, nargs="+", default=[None])
+    parser.add_argument("--depth", type=int, nargs="+", default=[5])
+    parser.add_argument("--num-gws", type=int, nargs="+", default=[1])
+    parser.add_argument("--fdr-horizon", type=int, nargs="+", default=[5])
+    parser.add_argument("--fdr-weight", type=float, nargs="+", default=[0.0])
+    parser.add_argument("--total-budget", type=float, nargs="+", default=[100])
+    parser.add_argument("--sub-factor", type=float, nargs="+", default=[0.2])
+    parser.add_argument("--diff-high", type=float, nargs="+", default=[10])
+    parser.add_argument("--diff-low", type=float, nargs="+", default=[5])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="-", help="CSV path, '-' for stdout")
+    args = parser.parse_args()
+
+    pool = CandidatePool.from_ingest(asyncio.run(ingest()))
+    if args.gameweek == [None]:
+        args.gameweek = [pool.next_gameweek]
+    configs = grid(**{name: getattr(args, name) for name in SCORE_PARAMS + SOLVE_PARAMS})
+
+    start = time.perf_counter()
+    out = sys.stdout if args.out == "-" else open(args.out, "w", newline="")
+    try:
+        done = sweep(pool, configs, out, args.workers)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print("{} configurations in {:.1f}s".format(done, time.perf_counter() - start), file=sys.stderr)
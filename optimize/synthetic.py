@@ -0,0 +1,119 @@
+import numpy as np
+from .ingest import IngestResult, first_player_by_team
+
+# Deterministic fake leagues in the shapes the code reads from the FPL API:
+# bootstrap elements/events, element-summary history and fixtures, and the
+# per-team fixture lists that teams.get_team_fixtures returns.
+
+POSITION_SHARE = (0.11, 0.33, 0.39, 0.17)
+BASE_POINTS = {1: 3.2, 2: 3.0, 3: 3.4, 4: 3.8}
+
+
+def round_robin(num_clubs, num_gameweeks, rng):
+    # double round robin, repeated/truncated to num_gameweeks: [[(home, away), ...] per gameweek]
+    clubs = list(range(1, num_clubs + 1))
+    if num_clubs % 2:
+        clubs.append(None)
+    rounds = []
+    for _ in range(len(clubs) - 1):
+        pairs = [(clubs[i], clubs[-1 - i]) for i in range(len(clubs) // 2)]
+        rounds.append([(h, a) for h, a in pairs if h is not None and a is not None])
+        clubs = [clubs[0]] + [clubs[-1]] + clubs[1:-1]
+    season = rounds + [[(a, h) for h, a in r] for r in rounds]
+    order = rng.permutation(len(season))
+    return [season[order[g % len(season)]] for g in range(num_gameweeks)]
+
+
+def schedule(num_clubs, num_gameweeks, double_gameweeks, blank_gameweeks, rng):
+    # list of (gameweek, home, away); blanks drop a club's match, doubles add matches between listed clubs
+    fixtures = []
+    for g, matches in enumerate(round_robin(num_clubs, num_gameweeks, rng), start=1):
+        blanks = set(blank_gameweeks.get(g, ()))
+        fixtures += [(g, h, a) for h, a in matches if h not in blanks and a not in blanks]
+        doubles = list(double_gameweeks.get(g, ()))
+        fixtures += [(g, doubles[i], doubles[i + 1]) for i in range(0, len(doubles) - 1, 2)]
+    return fixtures
+
+
+def generate_league(num_players=600, num_clubs=20, num_gameweeks=38, current_gameweek=27,
+                    double_gameweeks=None, blank_gameweeks=None, seed=0) -> IngestResult:
+    """A full season's worth of fake FPL data as an IngestResult.
+
+    ``double_gameweeks``/``blank_gameweeks`` map a gameweek to the clubs that
+    play twice / not at all. ``current_gameweek`` is the next one to be played,
+    as before a deadline: history covers the finished gameweeks before it,
+    the fixtures lists start at it, and the bootstrap events mark the last
+    finished gameweek ``is_current`` and ``current_gameweek`` ``is_next``,
+    so the result's ``gameweek`` is ``current_gameweek - 1`` like the API's.
+    """
+    rng = np.random.default_rng(seed)
+    double_gameweeks = double_gameweeks or {}
+    blank_gameweeks = blank_gameweeks or {}
+    fixtures = schedule(num_clubs, num_gameweeks, double_gameweeks, blank_gameweeks, rng)
+    strength = rng.normal(0, 1, num_clubs + 1)
+    difficulty = {c: int(np.clip(np.round(3 + strength[c]), 2, 5)) for c in range(1, num_clubs + 1)}
+
+    positions = rng.choice([1, 2, 3, 4], size=num_players, p=POSITION_SHARE)
+    clubs = rng.integers(1, num_clubs + 1, size=num_players)
+    quality = rng.gamma(2.0, 0.5, size=num_players) + 0.3 * strength[clubs]
+    regular = rng.random(num_players) < 0.7
+
+    players, summaries = [], {}
+    for i in range(num_players):
+        pid, club, pos = i + 1, int(clubs[i]), int(positions[i])
+        history, upcoming = [], []
+        for fixture_id, (g, h, a) in enumerate(fixtures, start=1):
+            if club not in (h, a):
+                continue
+            home = club == h
+            opponent = a if home else h
+            if g < current_gameweek:
+                minutes = int(rng.choice([0, 90, 60, 20], p=[0.1, 0.6, 0.2, 0.1]) if regular[i]
+                              else rng.choice([0, 20, 90], p=[0.6, 0.3, 0.1]))
+                mean = (BASE_POINTS[pos] * max(quality[i], 0.1) - 0.4 * (difficulty[opponent] - 3)) * minutes / 90
+                points = int(max(-2, rng.poisson(max(mean, 0.05)) - (rng.random() < 0.05))) if minutes else 0
+                history.append({"element": pid, "fixture": fixture_id, "opponent_team": opponent, "round": g,
+                                "was_home": home, "minutes": minutes, "total_points": points,
+                                "goals_scored": int(points >= 6 and pos > 1), "assists": int(points in (5, 7)),
+                                "clean_sheets": int(minutes >= 60 and rng.random() < 0.3),
+                                "goals_conceded": int(rng.poisson(1.2)) if minutes else 0,
+                                "bonus": int(points >= 8), "bps": max(0, points * 3), "saves": 0,
+                                "yellow_cards": int(rng.random() < 0.05),
+                                "value": 0, "selected": 0})
+            else:
+                upcoming.append({"id": fixture_id, "event": g, "team_h": h, "team_a": a, "is_home": home,
+                                 "difficulty": difficulty[opponent], "finished": False})
+        total = sum(h["total_points"] for h in history)
+        minutes = sum(h["minutes"] for h in history)
+        played = sum(1 for h in history if h["minutes"]) or 1
+        price = int(np.clip(np.round(38 + 18 * quality[i] + rng.normal(0, 4)), 38, 140))
+        if pos == 1:
+            price = min(price, 65)
+        for h in history:
+            h["value"] = price
+        players.append({"id": pid, "first_name": "First{}".format(pid), "second_name": "Last{}".format(pid),
+                        "web_name": "Player{}".format(pid), "team": club, "element_type": pos,
+                        "now_cost": price, "minutes": minutes, "total_points": total,
+                        "event_points": history[-1]["total_points"] if history else 0,
+                        "points_per_game": "{:.1f}".format(total / played),
+                        "selected_by_percent": "{:.1f}".format(float(min(80, rng.gamma(0.8, 6) * (1 + quality[i])))),
+                        "chance_of_playing_this_round": None if rng.random() < 0.85 else int(rng.choice([0, 25, 50, 75, 100])),
+                        "chance_of_playing_next_round": None, "status": "a", "news": "", "form": "0.0"})
+        summaries[pid] = {"history": history, "fixtures": upcoming, "history_past": []}
+
+    events = [{"id": g, "is_current": g == current_gameweek - 1, "is_next": g == current_gameweek,
+               "finished": g < current_gameweek} for g in range(1, num_gameweeks + 1)]
+    teams = [{"id": c, "name": "Club{}".format(c), "short_name": "C{:02d}".format(c), "strength": int(difficulty[c])}
+             for c in range(1, num_clubs + 1)]
+    bootstrap = {"elements": players, "events": events, "teams": teams}
+    team_fixtures = {team: summaries[pid]["fixtures"] for team, pid in first_player_by_team(players).items()}
+    return IngestResult(current_gameweek - 1, bootstrap, players, summaries, team_fixtures)
+
+
+def save_snapshot(store, league) -> None:
+    # write a generated league where the loaders, mock_server and offline mode look for it
+    store.save("bootstrap", league.gameweek, league.bootstrap)
+    store.save("players", league.gameweek, league.players)
+    store.save("summaries", league.gameweek, {str(k): v for k, v in league.summaries.items()})
+    store.save("team_fixtures", league.gameweek, {str(k): v for k, v in league.team_fixtures.items()})
+    store.set_current_gameweek(league.gameweek)
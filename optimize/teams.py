@@ -1,16 +1,5 @@
-from fpl import FPL
-import aiohttp
-import asyncio
-import pandas as pd
-import numpy as np
-import pulp
+from .snapshot import fetch_team_fixtures
 
-asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-
-async def get_team_fixtures(team_id):
-    async with aiohttp.ClientSession() as session:
-        fpl = FPL(session)
-        team = await fpl.get_team(team_id)
-        fixtures = await team.get_fixtures()
-    return fixtures
+async def get_team_fixtures(team_id, store=None):
+    return await fetch_team_fixtures(team_id, store)
 
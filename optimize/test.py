@@ -1,19 +1,12 @@
-from fpl import FPL
-import aiohttp
 import asyncio
-import pandas as pd
 import numpy as np
-import pulp
-
-asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+from .ingest import use_selector_event_loop
+from .snapshot import fetch_all_players, fetch_players
+from .scoring import HistoryMatrix, bucket_kernel
+from .player_table import PlayerTable
 
 async def get_players(pids):
-    async with aiohttp.ClientSession() as session:
-        fpl = FPL(session)
-        players = await fpl.get_players(
-                pids,
-                include_summary=True)
-    return players
+    return await fetch_players(pids)
 
 def get_gameweek_score(player, gameweek):
     points_1_to_3 = 0
@@ -34,17 +27,19 @@ def get_gameweek_score(player, gameweek):
     return tot_points
 
 async def get_all_players(ret_json):
-    session = aiohttp.ClientSession()
-    fpl = FPL(session)
-    players = await fpl.get_players(return_json = ret_json)
-    await session.close()
-    return players
+    return await fetch_all_players(ret_json)
+
+def main() -> None:
+    use_selector_event_loop()
+
+    players = PlayerTable.from_players(asyncio.run(get_all_players(ret_json=True)))
 
-players = asyncio.run(get_all_players(ret_json=True))
-players = pd.json_normalize(players)
+    all_ids = players.ids.tolist()
+    ret = asyncio.run(get_players(all_ids))
+    history = HistoryMatrix.from_players(ret)
+    weighted_scores = np.round(history.score(bucket_kernel(25)), 0).tolist()
+    print(weighted_scores)
 
-all_ids = players['id'].values.tolist()
-ret = asyncio.run(get_players(all_ids))
-weighted_scores = [get_gameweek_score(player, 25) for player in ret]
-print(weighted_scores)
 
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
-from fpl import FPL
-import aiohttp
 import asyncio
-import pandas as pd
-import numpy as np
-from fixtures import get_gw_num_factor
-from fixtures import get_fdr
-from teams import *
+from .fixtures import get_gw_num_factor
+from .fixtures import get_fdr
+from .teams import *
+from .ingest import ingest, use_selector_event_loop
 
-asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+def main() -> None:
+    use_selector_event_loop()
 
-fixture_dict = {id: asyncio.run(get_team_fixtures(id)) for id in range(1, 21)}
-fixture_num_dict = get_gw_num_factor(fixture_dict[15], 4, 25)
-print(fixture_num_dict)
+    fixture_dict = asyncio.run(ingest()).team_fixtures
+    fixture_num_dict = get_gw_num_factor(fixture_dict[15], 4, 25)
+    print(fixture_num_dict)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Stage-level timing for a run: wall and CPU time, peak traced memory, and
+# whatever counters a stage attaches (request counts, solver statistics).
+# Scripts pick it up from the environment:
+#   FPL_TRACE=trace.json    write the trace there at the end of the run
+#   FPL_TRACE_MEMORY=1      track peak memory per stage (tracemalloc, slower)
+#   FPL_PROFILE=solve       run cProfile over the named stage
+
+
+class Trace:
+    def __init__(self, path=None, memory=False, profile=None, profile_top=25) -> None:
+        self.path = path
+        self.memory = memory
+        self.profile = profile
+        self.profile_top = profile_top
+        self.spans = []
+        self._stack = []  # [traced memory at entry, highest peak seen] per open stage
+        self.started = time.perf_counter()
+
+    @classmethod
+    def from_env(cls):
+        return cls(path=os.environ.get("FPL_TRACE") or None,
+                   memory=os.environ.get("FPL_TRACE_MEMORY", "") not in ("", "0"),
+                   profile=os.environ.get("FPL_PROFILE") or None)
+
+    @contextmanager
+    def stage(self, name, **attrs):
+        """Time the block; the yielded dict is the span, so counters can be added to it."""
+        span = {"stage": name, "depth": len(self._stack), **attrs}
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._stack.append([current, current])
+        else:
+            self._stack.append(None)
+        profiler = cProfile.Profile() if name == self.profile else None
+        start, cpu = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield span
+        finally:
+            if profiler:
+                profiler.disable()
+            span["start"] = round(start - self.started, 6)
+            span["seconds"] = round(time.perf_counter() - start, 6)
+            span["cpu_seconds"] = round(time.process_time() - cpu, 6)
+            entry = self._stack.pop()
+            if entry is not None:
+                peak = max(entry[1], tracemalloc.get_traced_memory()[1])
+                span["peak_bytes"] = peak - entry[0]
+                if self._stack:
+                    # the parent's peak was reset when this stage began
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+            if profiler:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(self.profile_top)
+                span["profile"] = out.getvalue()
+            self.spans.append(span)
+
+    def traced(self, name=None):
+        # decorator form of stage()
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self.stage(name or fn.__name__):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def as_dict(self) -> dict:
+        return {"total_seconds": round(time.perf_counter() - self.started, 6),
+                "memory": self.memory,
+                "stages": sorted(self.spans, key=lambda s: s["start"])}
+
+    def save(self, path=None) -> None:
+        with open(path or self.path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2, default=str)
+
+    def finish(self) -> None:
+        # write the trace if a path was configured, and stop memory tracking
+        if self.path:
+            self.save()
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def pulp_stats(model, log_path=None) -> dict:
+    import pulp
+    stats = {"solver": "pulp",
+             "variables": model.numVariables(),
+             "constraints": model.numConstraints(),
+             "status": pulp.LpStatus[model.status],
+             "objective": model.objective.value(),
+             "solve_seconds": getattr(model, "solutionTime", None)}
+    if log_path and os.path.exists(log_path):
+        stats.update(cbc_log_stats(log_path))
+    return stats
+
+
+def cbc_log_stats(path) -> dict:
+    # node count and gap from a CBC log; pulp does not expose them otherwise
+    with open(path) as f:
+        log = f.read()
+    stats = {"solver": "cbc"}
+    for key, pattern in (("nodes", r"Enumerated nodes:\s+(\d+)"),
+                         ("iterations", r"Total iterations:\s+(\d+)"),
+                         ("gap", r"Gap:\s+([\d.eE+-]+)")):
+        match = re.search(pattern, log)
+        if match:
+            stats[key] = float(match.group(1)) if key == "gap" else int(match.group(1))
+    stats.setdefault("gap", 0.0 if "Optimal solution found" in log else None)
+    return stats
+
+
+def milp_stats(res, c, constraints) -> dict:
+    # scipy.optimize.milp (HiGHS) result; objective and bound are flipped back to the maximization
+    return {"solver": "highs",
+            "variables": len(c),
+            "constraints": constraints.A.shape[0],
+            "status": res.message,
+            "objective": None if res.fun is None else -res.fun,
+            "nodes": getattr(res, "mip_node_count", None),
+            "gap": getattr(res, "mip_gap", None),
+            "bound": None if getattr(res, "mip_dual_bound", None) is None else -res.mip_dual_bound}
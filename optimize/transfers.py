@@ -0,0 +1,500 @@
+import argparse
+import sys
+import time
+import numpy as np
+from .pruning import prune_dominated
+from .scoring import linear_kernel
+from .selection import MAX_PER_CLUB, SQUAD_LIMITS, STARTING_LIMITS
+
+# Weekly transfer plans over the next N gameweeks. One MILP covers a horizon:
+# per gameweek a squad binary s, buys b and sells q linked by
+# s_t = s_{t-1} + b_t - q_t, the bank carried from week to week at buying and
+# selling prices, banked free transfers and -4 hits. As in two_stage, each
+# week's lineup enters only as continuous starter/captain shares x, y <= s.
+# The free-transfer rule is exact: transfers - free = hits - unused with a
+# binary that lets only one of the two be positive (so no hit is taken to
+# bank a transfer), and next week's free = unused + 1, capped at 5 by an
+# overflow binary. A small cost per transfer breaks ties towards holding.
+#
+# Tractability comes from pruning (with a cap on transfers, a player beaten
+# in every gameweek by enough cheaper ones is never needed), from an optional
+# rolling horizon (solve `window` weeks, keep the first, roll on), and from
+# warm starts: the "no transfers" plan, or the previous window's plan shifted
+# by a week, is handed to HiGHS as the first incumbent. The LP relaxation is
+# about 1% above the optimum, and closing that gap is most of the solve time,
+# so the command line stops at DEFAULT_GAP unless given --gap 0.
+
+HIT_COST = 4
+MAX_FREE_TRANSFERS = 5
+TRANSFER_TIE_BREAK = 1e-3  # per transfer, so moves that gain nothing are not proposed
+# whole-horizon solves over every candidate take minutes beyond 4 weeks even at DEFAULT_GAP,
+# so the command line then keeps the best DEFAULT_PER_POSITION per position unless told otherwise
+LONG_HORIZON = 4
+DEFAULT_PER_POSITION = 25
+DEFAULT_GAP = 5e-3
+SQUAD, STARTERS, CAPTAIN, BUYS, SELLS = range(5)
+
+
+def selling_prices(prices, purchase_prices) -> np.ndarray:
+    # the game keeps half of any rise (rounded down to 0.1m) and passes on every fall
+    prices = np.asarray(prices, dtype=float)
+    bought = np.asarray(purchase_prices, dtype=float)
+    gain = np.floor(np.round((prices - bought) * 10) / 2) / 10
+    return np.where(prices > bought, bought + gain, prices)
+
+
+def next_free_transfers(free, transfers, max_free=MAX_FREE_TRANSFERS) -> int:
+    # one more each week, unused ones banked up to max_free
+    return min(max_free, max(free - transfers, 0) + 1)
+
+
+def gameweek_scores(pool, gameweeks, depth=5, fdr_weight=0.0) -> np.ndarray:
+    """Expected points per player for each of ``gameweeks`` (players x weeks).
+
+    Form is the history kernel at the pool's form gameweek; each week
+    scales it by the club's number of fixtures that week (0 in a blank, 2 in
+    a double) and optionally by that week's FDR ** fdr_weight, from the team
+    fixture tensor.
+    """
+    form = pool.history.score(linear_kernel(pool.form_gameweek, depth))
+    count = pool.fixtures.count
+    weeks = []
+    for g in gameweeks:
+        factor = count[:, g].astype(float) if g < count.shape[1] else np.zeros(len(count))
+        if fdr_weight:
+            factor = factor * pool.fixtures.fdr(1, g) ** fdr_weight
+        weeks.append(form * factor[pool.clubs])
+    return np.column_stack(weeks)
+
+
+class TransferModel:
+    """The multi-gameweek model over n candidates as matrices for HiGHS.
+
+    Per week the columns are [s | x | y | b | q] (n each), then hits, free
+    transfers at the deadline, the bank after that week's transfers, unused
+    free transfers, the carry binary (unused may be positive, hits may not)
+    and the overflow binary (unused free transfers at the cap).
+    """
+
+    def __init__(self, scores, prices, sell_prices, positions, clubs, owned, bank, free_transfers,
+                 sub_factor=0.2, hit_cost=HIT_COST, max_free=MAX_FREE_TRANSFERS, max_transfers=None,
+                 discount=1.0, starting_limits=STARTING_LIMITS, transfer_cost=TRANSFER_TIE_BREAK) -> None:
+        from scipy import sparse
+        self.scores = np.asarray(scores, dtype=float)
+        self.n, self.periods = n, periods = self.scores.shape
+        self.prices = np.asarray(prices, dtype=float)
+        self.sell_prices = np.asarray(sell_prices, dtype=float)
+        self.positions = np.asarray(positions)
+        self.owned = np.asarray(owned, dtype=float)
+        self.bank0, self.free0 = float(bank), min(int(free_transfers), max_free)
+        self.sub_factor, self.hit_cost, self.max_free = sub_factor, hit_cost, max_free
+        self.width = 5 * n + 6
+        clubs = np.asarray(clubs)
+        ncol = self.width * periods
+
+        blocks, lower, upper = [], [], []
+
+        def add(cols, vals, lo, hi):
+            # a block of rows, one per row of ``cols``: lo <= sum(vals * columns) <= hi
+            cols = np.atleast_2d(cols)
+            vals = np.broadcast_to(np.asarray(vals, dtype=float), cols.shape)
+            rows = np.repeat(np.arange(len(cols)), cols.shape[1])
+            blocks.append(sparse.csr_matrix((vals.ravel(), (rows, cols.ravel())), shape=(len(cols), ncol)))
+            lower.append(np.broadcast_to(lo, len(cols)))
+            upper.append(np.broadcast_to(hi, len(cols)))
+
+        members = {p: np.flatnonzero(self.positions == p) for p in SQUAD_LIMITS}
+        by_club = [np.flatnonzero(clubs == c) for c in np.unique(clubs)]
+        ones = np.ones(n)
+        c = np.zeros(ncol)
+        for t in range(periods):
+            s, x, y, b, q = (self.block(t, k) for k in range(5))
+            if t:
+                add(np.column_stack([s, self.block(t - 1, SQUAD), b, q]), [1, -1, -1, 1], 0, 0)
+                add(np.concatenate([[self.bank(t), self.bank(t - 1)], q, b]),
+                    np.concatenate([[1, -1], -self.sell_prices, self.prices]), 0, 0)
+            else:
+                # s_0 = current squad + buys - sells; bank_0 = bank + sales - purchases
+                add(np.column_stack([s, b, q]), [1, -1, 1], self.owned, self.owned)
+                add(np.concatenate([[self.bank(t)], q, b]), np.concatenate([[1], -self.sell_prices, self.prices]),
+                    self.bank0, self.bank0)
+            add(np.column_stack([x, s]), [1, -1], -np.inf, 0)
+            add(np.column_stack([y, s]), [1, -1], -np.inf, 0)
+            for p, idx in members.items():
+                add(s[idx], 1, SQUAD_LIMITS[p], SQUAD_LIMITS[p])
+                add(x[idx], 1, *starting_limits[p])
+            for idx in by_club:
+                add(s[idx], 1, -np.inf, MAX_PER_CLUB)
+            add(x, 1, 11, 11)
+            add(y, 1, 1, 1)
+            # transfers - free = hits - unused, and only one of hits and unused is positive
+            add(np.concatenate([b, [self.free(t), self.hits(t), self.unused(t)]]),
+                np.concatenate([ones, [-1, -1, 1]]), 0, 0)
+            add([self.hits(t), self.carry(t)], [1, 15], -np.inf, 15)
+            add([self.unused(t), self.carry(t)], [1, -max_free], -np.inf, 0)
+            if t + 1 < periods:
+                # free(t + 1) = unused + 1 - overflow, overflow only when unused is at the cap
+                add([self.free(t + 1), self.unused(t), self.overflow(t)], [1, -1, 1], 1, 1)
+                add([self.unused(t), self.overflow(t)], [1, -max_free], 0, np.inf)
+
+            weight = discount ** t
+            c[s] = -weight * sub_factor * self.scores[:, t]
+            c[x] = -weight * (1 - sub_factor) * self.scores[:, t]
+            c[y] = -weight * self.scores[:, t]
+            c[self.hits(t)] = hit_cost
+            c[b] = transfer_cost
+            if max_transfers is not None:
+                add(b, 1, -np.inf, max_transfers)
+
+        self.c = c
+        self.A = sparse.vstack(blocks, format="csc")
+        self.row_lower = np.concatenate(lower).astype(float)
+        self.row_upper = np.concatenate(upper).astype(float)
+        self.lower = np.zeros(ncol)
+        self.upper = np.ones(ncol)
+        self.integrality = np.zeros(ncol)
+        for t in range(periods):
+            for k in (SQUAD, BUYS, SELLS):
+                self.integrality[self.block(t, k)] = 1
+            self.integrality[[self.hits(t), self.free(t), self.unused(t), self.carry(t), self.overflow(t)]] = 1
+            self.upper[self.hits(t)] = 15
+            self.upper[self.free(t)] = self.upper[self.unused(t)] = max_free
+            self.upper[self.bank(t)] = np.inf
+        self.lower[self.free(0)] = self.upper[self.free(0)] = self.free0
+
+    def block(self, t, k) -> np.ndarray:
+        start = t * self.width + k * self.n
+        return np.arange(start, start + self.n)
+
+    def hits(self, t) -> int:
+        return t * self.width + 5 * self.n
+
+    def free(self, t) -> int:
+        return t * self.width + 5 * self.n + 1
+
+    def bank(self, t) -> int:
+        return t * self.width + 5 * self.n + 2
+
+    def unused(self, t) -> int:
+        return t * self.width + 5 * self.n + 3
+
+    def carry(self, t) -> int:
+        return t * self.width + 5 * self.n + 4
+
+    def overflow(self, t) -> int:
+        return t * self.width + 5 * self.n + 5
+
+    def vector(self, squads) -> np.ndarray:
+        """The solution vector of a plan given as per-week squads (periods x n, 0/1).
+
+        Transfers, bank, hits and free transfers are replayed and each week's
+        lineup is the best one for that squad, so the vector is feasible
+        whenever the squads are (used for warm starts).
+        """
+        from .two_stage import best_lineup
+        v = np.zeros(len(self.c))
+        previous, bank, free = self.owned, self.bank0, self.free0
+        for t, squad in enumerate(np.asarray(squads, dtype=float)):
+            buys, sells = np.clip(squad - previous, 0, 1), np.clip(previous - squad, 0, 1)
+            transfers = int(buys.sum())
+            bank += float(sells @ self.sell_prices - buys @ self.prices)
+            members = np.flatnonzero(squad > 0.5)
+            x, y, _ = best_lineup(self.scores[members, t], self.positions[members], self.sub_factor)
+            v[self.block(t, SQUAD)], v[self.block(t, BUYS)], v[self.block(t, SELLS)] = squad, buys, sells
+            v[self.block(t, STARTERS)[members]], v[self.block(t, CAPTAIN)[members]] = x, y
+            hits, unused = max(transfers - free, 0), max(free - transfers, 0)
+            v[self.hits(t)], v[self.free(t)], v[self.bank(t)] = hits, free, bank
+            v[self.unused(t)], v[self.carry(t)], v[self.overflow(t)] = unused, hits == 0, unused == self.max_free
+            previous, free = squad, next_free_transfers(free, transfers, self.max_free)
+        return v
+
+    def squads(self, v) -> np.ndarray:
+        return np.array([np.round(v[self.block(t, SQUAD)]) for t in range(self.periods)], dtype=int)
+
+
+def solve_model(model, x0=None, time_limit=None, gap=None) -> tuple:
+    """(solution, objective, stats) of a TransferModel.
+
+    Uses highspy when installed, which takes ``x0`` as a starting incumbent;
+    otherwise scipy's milp (the same HiGHS, without warm starts).
+    """
+    start = time.perf_counter()
+    try:
+        import highspy
+    except ImportError:
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        options = {k: v for k, v in (("time_limit", time_limit), ("mip_rel_gap", gap)) if v is not None}
+        res = milp(model.c, constraints=LinearConstraint(model.A, model.row_lower, model.row_upper),
+                   integrality=model.integrality, bounds=Bounds(model.lower, model.upper), options=options)
+        if res.x is None:
+            raise RuntimeError("transfer model could not be solved: {}".format(res.message))
+        return res.x, -res.fun, {"solver": "milp", "status": res.message, "warm_start": False,
+                                 "nodes": getattr(res, "mip_node_count", None), "gap": getattr(res, "mip_gap", None),
+                                 "solve_seconds": time.perf_counter() - start}
+
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    if time_limit:
+        h.setOptionValue("time_limit", float(time_limit))
+    if gap is not None:
+        h.setOptionValue("mip_rel_gap", float(gap))
+    lp = highspy.HighsLp()
+    lp.num_col_, lp.num_row_ = model.A.shape[1], model.A.shape[0]
+    lp.col_cost_, lp.col_lower_, lp.col_upper_ = model.c, model.lower, model.upper
+    lp.row_lower_, lp.row_upper_ = model.row_lower, model.row_upper
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.num_col_, lp.a_matrix_.num_row_ = lp.num_col_, lp.num_row_
+    lp.a_matrix_.start_, lp.a_matrix_.index_, lp.a_matrix_.value_ = model.A.indptr, model.A.indices, model.A.data
+    lp.integrality_ = [highspy.HighsVarType.kInteger if v else highspy.HighsVarType.kContinuous
+                       for v in model.integrality]
+    h.passModel(lp)
+    if x0 is not None:
+        solution = highspy.HighsSolution()
+        solution.col_value = list(x0)
+        solution.value_valid = True
+        h.setSolution(solution)
+    h.run()
+    status = h.modelStatusToString(h.getModelStatus())
+    info = h.getInfo()
+    if info.primal_solution_status != 2:  # feasible
+        raise RuntimeError("transfer model could not be solved: {}".format(status))
+    return np.asarray(h.getSolution().col_value), -info.objective_function_value, {
+        "solver": "highspy", "status": status, "warm_start": x0 is not None, "nodes": int(info.mip_node_count),
+        "gap": float(info.mip_gap), "solve_seconds": time.perf_counter() - start}
+
+
+def candidates(scores, prices, positions, clubs, owned, max_transfers=None, per_position=None, keep=()) -> np.ndarray:
+    """Players the model needs: the current squad plus the rest after pruning.
+
+    With ``max_transfers`` (per week) the pruning is exact: at most that many
+    players join each week, so a player beaten in every week by that many
+    more cheaper players per week (beyond the clubs that could fill up)
+    always has a free stand-in.
+    ``per_position`` additionally keeps only the best that many per position
+    by total score, which is a heuristic. ``keep`` are always kept.
+    """
+    others = np.flatnonzero(~np.asarray(owned, dtype=bool))
+    if max_transfers is not None:
+        joining = max_transfers * scores.shape[1]
+        limits = {p: k + joining for p, k in SQUAD_LIMITS.items()}
+        others = others[prune_dominated(scores[others], prices[others], positions[others], clubs[others],
+                                        squad_limits=limits, squad_size=15 + joining, verbose=False)]
+    if per_position is not None:
+        total = scores[others].sum(axis=1)
+        others = np.concatenate([others[positions[others] == p][np.argsort(-total[positions[others] == p],
+                                                                             kind="stable")[:per_position]]
+                                 for p in SQUAD_LIMITS])
+    return np.union1d(np.union1d(np.flatnonzero(owned), others), np.asarray(keep, dtype=int))
+
+
+def plan_transfers(scores, prices, positions, clubs, squad, bank, free_transfers=1, purchase_prices=None,
+                   window=None, sub_factor=0.2, hit_cost=HIT_COST, max_free=MAX_FREE_TRANSFERS, max_transfers=None,
+                   per_position=None, discount=1.0, time_limit=None, gap=None, warm_start=True) -> dict:
+    """A week-by-week transfer plan over every column of ``scores`` (players x weeks).
+
+    ``squad`` holds the indexes of the current 15 and ``purchase_prices``
+    their buying prices (selling prices follow the game's rule). With
+    ``window`` the horizon is solved ``window`` weeks at a time and only the
+    first week of each solve is kept; ``max_transfers`` caps the transfers
+    of each week and makes pruning exact.
+    """
+    scores = np.asarray(scores, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    positions, clubs = np.asarray(positions), np.asarray(clubs)
+    n, horizon = scores.shape
+    window = min(window or horizon, horizon)
+    free_transfers = min(int(free_transfers), max_free)
+    owned = np.zeros(n, dtype=bool)
+    owned[list(squad)] = True
+    sell = prices.copy()
+    if purchase_prices is not None:
+        sell[list(squad)] = selling_prices(prices[list(squad)], purchase_prices)
+
+    weeks, solves = [], []
+    shifted = None  # the previous solve's later weeks, as full-pool squads
+    start = time.perf_counter()
+    t = 0
+    while t < horizon:
+        span = scores[:, t:t + window]
+        keep = np.flatnonzero(shifted.any(axis=0)) if shifted is not None else ()
+        cand = candidates(span, prices, positions, clubs, owned, max_transfers, per_position, keep)
+        model = TransferModel(span[cand], prices[cand], sell[cand], positions[cand], clubs[cand], owned[cand],
+                              bank, free_transfers, sub_factor, hit_cost, max_free, max_transfers, discount)
+        x0 = None
+        if warm_start:
+            plan = shifted[:, cand] if shifted is not None else np.tile(owned[cand], (model.periods, 1))
+            if len(plan) < model.periods:
+                plan = np.vstack([plan, np.repeat(plan[-1:], model.periods - len(plan), axis=0)])
+            x0 = model.vector(plan[:model.periods])
+        v, objective, stats = solve_model(model, x0, time_limit, gap)
+        stats.update(week=t, weeks=model.periods, candidates=len(cand), objective=objective)
+        solves.append(stats)
+
+        # commit the first week (all of them when solving the whole horizon at once)
+        commit = model.periods if window >= horizon else 1
+        for k in range(commit):
+            squad_k = np.zeros(n, dtype=bool)
+            squad_k[cand] = np.round(v[model.block(k, SQUAD)]) > 0
+            week = _week(model, v, k, cand, owned, squad_k, scores[:, t + k], free_transfers)
+            weeks.append(week)
+            for i in np.flatnonzero(squad_k & ~owned):
+                sell[i] = prices[i]  # bought at today's price, sold at it within the horizon
+            owned, bank = squad_k, week["bank"]
+            free_transfers = next_free_transfers(free_transfers, len(week["buy"]), max_free)
+        full = np.zeros((model.periods, n), dtype=bool)
+        full[:, cand] = model.squads(v) > 0
+        shifted = full[commit:] if commit < model.periods else None
+        t += commit
+
+    points = sum(w["expected"] * discount ** i for i, w in enumerate(weeks))
+    hits = sum(w["hits"] for w in weeks)
+    return {"weeks": weeks, "expected": round(points, 3), "hits": hits,
+            "objective": round(sum(w["objective"] * discount ** i for i, w in enumerate(weeks)) - hit_cost * hits, 3),
+            "solves": solves, "seconds": round(time.perf_counter() - start, 4)}
+
+
+def _week(model, v, k, cand, owned, squad, scores, free) -> dict:
+    # one committed week of a solution, in full-pool indexes
+    from .two_stage import best_lineup
+    buys = np.flatnonzero(squad & ~owned)
+    sells = np.flatnonzero(owned & ~squad)
+    members = np.flatnonzero(squad)
+    x, y, z = best_lineup(scores[members], model.positions[np.searchsorted(cand, members)], model.sub_factor)
+    # the game's rule on the replayed free transfers; the model has to agree with it
+    hits = max(len(buys) - free, 0)
+    if int(round(v[model.hits(k)])) != hits or int(round(v[model.free(k)])) != free:
+        raise RuntimeError("week {}: model has {} hits with {} free transfers, the rules give {} with {}".format(
+            k, int(round(v[model.hits(k)])), int(round(v[model.free(k)])), hits, free))
+    return {"buy": buys.tolist(), "sell": sells.tolist(), "hits": hits,
+            "free_transfers": free,
+            "bank": round(float(v[model.bank(k)]), 1) + 0.0,
+            "squad": members.tolist(), "starters": members[x > 0].tolist(), "captain": int(members[y > 0][0]),
+            "expected": round(float(scores[members] @ (x + y)), 3),
+            "objective": round(float(scores[members] @ (x + y + model.sub_factor * z)), 3)}
+
+
+def horizon_benchmark(scores, prices, positions, clubs, squad, bank, horizons=(1, 2, 4, 6, 8), window=3,
+                      **kw) -> list:
+    # solve time and plan value against horizon length, whole-horizon vs rolling
+    rows = []
+    for h in horizons:
+        for mode, w in (("full", None), ("rolling", window)):
+            if mode == "rolling" and (not window or window >= h):
+                continue
+            plan = plan_transfers(scores[:, :h], prices, positions, clubs, squad, bank, window=w, **kw)
+            rows.append({"horizon": h, "mode": mode, "window": w or h, "seconds": plan["seconds"],
+                         "solves": len(plan["solves"]), "objective": plan["objective"], "hits": plan["hits"],
+                         "transfers": sum(len(wk["buy"]) for wk in plan["weeks"]),
+                         "candidates": max(s["candidates"] for s in plan["solves"]),
+                         "nodes": sum(s["nodes"] or 0 for s in plan["solves"])})
+    return rows
+
+
+def main(argv=None, prog=None) -> None:
+    parser = argparse.ArgumentParser(prog=prog, description="Plan transfers over the next gameweeks")
+    parser.add_argument("--snapshot-dir", default=None)
+    parser.add_argument("--offline", action="store_true")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="SEED",
+                        help="plan on a generated league instead of the snapshot")
+    parser.add_argument("--double", type=int, nargs=2, action="append", default=[], metavar=("GW", "CLUB"),
+                        help="with --synthetic: CLUB plays twice in GW")
+    parser.add_argument("--blank", type=int, nargs=2, action="append", default=[], metavar=("GW", "CLUB"),
+                        help="with --synthetic: CLUB has no fixture in GW")
+    parser.add_argument("--squad", type=int, nargs="*", default=None, metavar="ID",
+                        help="the current 15 (default: the best squad for this week)")
+    parser.add_argument("--purchase-prices", type=float, nargs="*", default=None, help="in --squad order")
+    parser.add_argument("--bank", type=float, default=None, help="default: 100 minus the squad's value")
+    parser.add_argument("--free-transfers", type=int, default=1)
+    parser.add_argument("--horizon", type=int, default=6)
+    parser.add_argument("--window", type=int, default=None, help="rolling-horizon window (default: whole horizon)")
+    parser.add_argument("--max-transfers", type=int, default=None, help="per gameweek; makes pruning exact")
+    parser.add_argument("--per-position", type=int, default=None,
+                        help="keep only this many candidates per position (default: {} when the horizon is over {} "
+                             "weeks and there is no --window; 0 keeps all)".format(DEFAULT_PER_POSITION, LONG_HORIZON))
+    parser.add_argument("--projection", choices=("kernel", "fitted"), default="kernel",
+                        help="expected points from the linear kernel or the fitted projection model")
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--fdr-weight", type=float, default=0.0)
+    parser.add_argument("--sub-factor", type=float, default=0.2)
+    parser.add_argument("--hit-cost", type=float, default=HIT_COST)
+    parser.add_argument("--discount", type=float, default=1.0)
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--gap", type=float, default=DEFAULT_GAP,
+                        help="relative MIP gap (default: %(default)s; 0 proves the optimum)")
+    parser.add_argument("--no-warm-start", action="store_true")
+    parser.add_argument("--benchmark", type=int, nargs="*", default=None, metavar="H",
+                        help="time these horizons, whole vs rolling --window")
+    args = parser.parse_args(argv)
+
+    from .pool import CandidatePool
+    if args.synthetic is not None:
+        from .synthetic import generate_league
+        doubles, blanks = {}, {}
+        for g, club in args.double:
+            doubles.setdefault(g, []).append(club)
+        for g, club in args.blank:
+            blanks.setdefault(g, []).append(club)
+        data = generate_league(seed=args.synthetic, double_gameweeks=doubles, blank_gameweeks=blanks)
+    else:
+        import asyncio
+        from .ingest import ingest, use_selector_event_loop
+        from .snapshot import SnapshotStore
+        use_selector_event_loop()
+        data = asyncio.run(ingest(SnapshotStore(args.snapshot_dir, offline=True if args.offline else None)))
+    pool = CandidatePool.from_ingest(data)
+    horizon = max(args.benchmark or [args.horizon])
+    gameweeks = range(pool.next_gameweek, pool.next_gameweek + horizon)
+    if args.projection == "fitted":
+        from .backtest import Season
+        from .projection import Projector, combine_fixtures
+        season = Season.from_ingest(data)
+        projector = Projector.from_season(season, pool.next_gameweek,
+                                          combine_fixtures(season.fixtures, pool.fixtures, pool.next_gameweek))
+        row = {int(pid): i for i, pid in enumerate(season.ids)}
+        scores = projector.project(gameweeks)[[row[int(pid)] for pid in pool.ids]]
+    else:
+        scores = gameweek_scores(pool, gameweeks, args.depth, args.fdr_weight)
+
+    if args.squad:
+        index = {int(pid): i for i, pid in enumerate(pool.ids)}
+        missing = [pid for pid in args.squad if pid not in index]
+        if missing:
+            parser.error("not in the candidate pool: {}".format(missing))
+        squad = [index[pid] for pid in args.squad]
+    else:
+        from .two_stage import select_team_two_stage
+        x, _, z = select_team_two_stage(scores[:, 0], pool.prices, pool.positions, pool.clubs, verbose=False)
+        squad = np.flatnonzero(x + z).tolist()
+    bank = args.bank if args.bank is not None else round(100 - float(pool.prices[squad].sum()), 1)
+    per_position = args.per_position or None
+    if args.per_position is None and args.window is None and horizon > LONG_HORIZON:
+        per_position = DEFAULT_PER_POSITION
+        print("horizon over {} weeks: keeping the best {} candidates per position (--per-position 0 keeps all)".format(
+            LONG_HORIZON, per_position), file=sys.stderr)
+    kw = {"free_transfers": args.free_transfers, "sub_factor": args.sub_factor, "hit_cost": args.hit_cost,
+          "max_transfers": args.max_transfers, "per_position": per_position, "discount": args.discount,
+          "time_limit": args.time_limit, "gap": args.gap, "warm_start": not args.no_warm_start}
+
+    if args.benchmark:
+        rows = horizon_benchmark(scores, pool.prices, pool.positions, pool.clubs, squad, bank, args.benchmark,
+                                 args.window, **kw)
+        print(f"{'horizon':>7s} {'mode':>8s} {'window':>6s} {'solves':>6s} {'cands':>5s} {'nodes':>6s} "
+              f"{'seconds':>8s} {'objective':>9s} {'transfers':>9s}")
+        for r in rows:
+            print(f"{r['horizon']:7d} {r['mode']:>8s} {r['window']:6d} {r['solves']:6d} {r['candidates']:5d} "
+                  f"{r['nodes']:6d} {r['seconds']:8.2f} {r['objective']:9.2f} {r['transfers']:9d}")
+        return
+
+    plan = plan_transfers(scores, pool.prices, pool.positions, pool.clubs, squad, bank,
+                          purchase_prices=args.purchase_prices, window=args.window, **kw)
+    for g, week in enumerate(plan["weeks"], start=pool.next_gameweek):
+        moves = ", ".join("{} -> {}".format(pool.names[o], pool.names[i]) for o, i in zip(week["sell"], week["buy"]))
+        print("GW{:<3d} {:<60s} hits {} FT {} bank {:.1f} captain {} expected {:.1f}".format(
+            g, moves or "no transfers", week["hits"], week["free_transfers"], week["bank"],
+            pool.names[week["captain"]], week["expected"]))
+    print("expected {:.1f} after {} hits, {} solves in {:.2f}s".format(
+        plan["expected"] - args.hit_cost * plan["hits"], plan["hits"], len(plan["solves"]), plan["seconds"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import itertools
+import time
+import numpy as np
+from .selection import MAX_PER_CLUB, SQUAD_LIMITS, STARTING_LIMITS, one_hot
+from .tracing import milp_stats
+
+# The squad/lineup split of select_team. Stage one has one binary w per player
+# (in the squad or not); the lineup only enters as continuous starter and
+# captain shares x <= w, y <= w under the starting limits. For a fixed squad
+# those constraints are two laminar families, hence totally unimodular, so the
+# continuous lineup value bounds the best lineup exactly and the MILP optimum
+# is select_team's. Stage two reads the XI, captain and bench off the 15 by
+# scoring every valid formation in NumPy: with bench weight s <= 1 the best
+# lineup of a formation is the top players of each position, and the captain
+# is the best player of the squad.
+
+
+def formations(limits=STARTING_LIMITS) -> np.ndarray:
+    # every (GK, DEF, MID, FWD) starting count within the limits that makes eleven
+    ranges = [range(lo, hi + 1) for lo, hi in (limits[p] for p in SQUAD_LIMITS)]
+    return np.array([f for f in itertools.product(*ranges) if sum(f) == 11], dtype=np.intp)
+
+
+def lineup_values(squads, sub_factor=0.2, limits=STARTING_LIMITS):
+    """Best lineup value and formation of many squads at once.
+
+    ``squads`` is (num_squads, 15) scores laid out by position (2 GK, 5 DEF,
+    5 MID, 3 FWD). Every formation is scored with one cumulative sum per
+    position block; returns (values, formation index into formations(limits)).
+    """
+    squads = np.atleast_2d(np.asarray(squads, dtype=float))
+    forms = formations(limits)
+    totals = np.zeros((len(squads), len(forms)))
+    start = 0
+    for p, size in enumerate(SQUAD_LIMITS.values()):
+        block = -np.sort(-squads[:, start:start + size], axis=1)
+        cum = np.hstack([np.zeros((len(squads), 1)), np.cumsum(block, axis=1)])
+        totals += cum[:, forms[:, p]]
+        start += size
+    best = totals.argmax(axis=1)
+    starters = totals[np.arange(len(squads)), best]
+    return sub_factor * squads.sum(axis=1) + (1 - sub_factor) * starters + squads.max(axis=1), best
+
+
+def best_lineup(scores, positions, sub_factor=0.2, limits=STARTING_LIMITS):
+    # (x, y, z) over one 15-player squad: the XI, the captain and the bench
+    scores = np.asarray(scores, dtype=float)
+    positions = np.asarray(positions)
+    order = np.lexsort((-scores, positions))
+    _, best = lineup_values(scores[order], sub_factor, limits)
+    counts = formations(limits)[best[0]]
+    x = np.zeros(len(scores), dtype=int)
+    start = 0
+    for p, size in enumerate(SQUAD_LIMITS.values()):
+        x[order[start:start + counts[p]]] = 1
+        start += size
+    y = np.zeros_like(x)
+    y[np.flatnonzero(x)[scores[x > 0].argmax()]] = 1
+    return x, y, 1 - x
+
+
+def build_squad_bound_milp(expected_scores, prices, positions, clubs, total_budget=100, sub_factor=0.2,
+                           locked=None, starting_limits=STARTING_LIMITS):
+    """Stage one as (c, constraints, integrality) for scipy.optimize.milp.
+
+    Variables are [w | x | y]: w binary, x and y continuous in [0, 1].
+    Compared with build_squad_milp there is no z and only n integers.
+    """
+    from scipy import sparse
+    from scipy.optimize import LinearConstraint
+    scores = np.asarray(expected_scores, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    n = len(scores)
+    P = one_hot(positions, list(STARTING_LIMITS))
+    T = one_hot(clubs)
+    I = sparse.identity(n, format="csr")
+    ones = sparse.csr_matrix(np.ones((1, n)))
+
+    rows, lower, upper = [], [], []
+
+    def add(w=None, x=None, y=None, lb=-np.inf, ub=np.inf):
+        height = next(m.shape[0] for m in (w, x, y) if m is not None)
+        blank = sparse.csr_matrix((height, n))
+        rows.append(sparse.hstack([blank if m is None else m for m in (w, x, y)]))
+        lower.append(np.broadcast_to(lb, height))
+        upper.append(np.broadcast_to(ub, height))
+
+    add(sparse.csr_matrix(prices.reshape(1, -1)), ub=total_budget)
+    squad = [SQUAD_LIMITS[p] for p in SQUAD_LIMITS]
+    add(P, lb=squad, ub=squad)
+    add(T, ub=MAX_PER_CLUB)
+    add(None, P, lb=[starting_limits[p][0] for p in STARTING_LIMITS], ub=[starting_limits[p][1] for p in STARTING_LIMITS])
+    add(None, ones, lb=11, ub=11)
+    add(None, None, ones, lb=1, ub=1)
+    add(-I, I, ub=0)  # starters come from the squad
+    add(-I, None, I, ub=0)  # so does the captain, who is then the best of it
+    if locked is not None and len(locked):
+        add(sparse.csr_matrix((np.ones(len(locked)), (np.arange(len(locked)), locked)), shape=(len(locked), n)), lb=1)
+
+    A = sparse.vstack(rows, format="csr")
+    c = -np.concatenate([sub_factor * scores, (1 - sub_factor) * scores, scores])
+    integrality = np.concatenate([np.ones(n), np.zeros(2 * n)])
+    return c, LinearConstraint(A, np.concatenate(lower), np.concatenate(upper)), integrality
+
+
+def select_team_two_stage(expected_scores, prices, positions, clubs, differentials=None, total_budget=100,
+                          sub_factor=0.2, time_limit=None, verbose=True, stats=None, locked=None,
+                          starting_limits=STARTING_LIMITS):
+    # drop-in for select_team_highs without differential limits; returns 0/1 arrays
+    from scipy.optimize import Bounds, milp
+    if differentials is not None:
+        raise ValueError("select_team_two_stage does not support differential constraints, use select_team_highs")
+    if not 0 <= sub_factor <= 1:
+        raise ValueError("the two-stage model needs 0 <= sub_factor <= 1, got {}".format(sub_factor))
+    scores = np.asarray(expected_scores, dtype=float)
+    n = len(scores)
+    c, constraints, integrality = build_squad_bound_milp(
+        scores, prices, positions, clubs, total_budget, sub_factor, locked, starting_limits)
+    options = {"time_limit": time_limit} if time_limit else {}
+    start = time.perf_counter()
+    res = milp(c, constraints=constraints, integrality=integrality, bounds=Bounds(0, 1), options=options)
+    if stats is not None:
+        stats.update(milp_stats(res, c, constraints), solve_seconds=time.perf_counter() - start)
+    if res.x is None:
+        raise RuntimeError("squad model could not be solved: {}".format(res.message))
+    if verbose:
+        print("Total expected score = {}".format(-res.fun))
+
+    squad = np.flatnonzero(np.round(res.x[:n]) > 0)
+    chosen = best_lineup(scores[squad], np.asarray(positions)[squad], sub_factor, starting_limits)
+    x, y, z = (np.zeros(n, dtype=int) for _ in range(3))
+    for out, part in zip((x, y, z), chosen):
+        out[squad] = part
+    return x, y, z
+
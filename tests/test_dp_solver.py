@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from optimize.dp_solver import select_team_dp
+from optimize.selection import MAX_PER_CLUB, SQUAD_LIMITS, STARTING_LIMITS, select_team_highs
+
+
+def instance(seed, num_players=80, num_clubs=20):
+    rng = np.random.default_rng(seed)
+    positions = rng.choice([1, 2, 3, 4], size=num_players, p=(0.12, 0.33, 0.37, 0.18))
+    clubs = rng.integers(1, num_clubs + 1, size=num_players)
+    scores = np.round(rng.gamma(2.0, 2.0, size=num_players), 1)
+    prices = np.round(np.clip(4 + 0.6 * scores + rng.normal(0, 1, num_players), 4, 14), 1)
+    return scores, prices, positions, clubs
+
+
+def value(picks, scores, sub_factor):
+    x, y, z = picks
+    return float(((x + y + sub_factor * z) * scores).sum())
+
+
+def assert_valid(picks, prices, positions, clubs, budget):
+    x, y, z = picks
+    squad = x + z
+    assert x.sum() == 11 and y.sum() == 1 and squad.max() == 1 and (y <= x).all()
+    assert (squad * prices).sum() <= budget + 1e-9
+    assert all(squad[positions == p].sum() == k for p, k in SQUAD_LIMITS.items())
+    assert all(lo <= x[positions == p].sum() <= hi for p, (lo, hi) in STARTING_LIMITS.items())
+    assert np.bincount(clubs[squad > 0]).max() <= MAX_PER_CLUB
+
+
+def solve_both(scores, prices, positions, clubs, budget, sub_factor):
+    kw = {"total_budget": budget, "sub_factor": sub_factor, "verbose": False}
+    return (select_team_dp(scores, prices, positions, clubs, **kw),
+            select_team_highs(scores, prices, positions, clubs, **kw))
+
+
+@pytest.mark.parametrize("sub_factor", [0.0, 0.2, 1.0])
+@pytest.mark.parametrize("num_clubs", [8, 20])
+@pytest.mark.parametrize("budget", [82, 100])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_matches_highs(seed, budget, num_clubs, sub_factor):
+    # eight clubs and a tight budget: the relaxed optimum is over-full, so the club branching has to work
+    scores, prices, positions, clubs = instance(seed, num_clubs=num_clubs)
+    picks, reference = solve_both(scores, prices, positions, clubs, budget, sub_factor)
+    assert_valid(picks, prices, positions, clubs, budget)
+    assert value(picks, scores, sub_factor) == pytest.approx(value(reference, scores, sub_factor), abs=1e-6)
+
+
+def test_five_clubs():
+    # nearly every club is over-full in the relaxation; the slow case for the DP
+    scores, prices, positions, clubs = instance(1, num_clubs=5)
+    picks, reference = solve_both(scores, prices, positions, clubs, 100, 0.2)
+    assert_valid(picks, prices, positions, clubs, 100)
+    assert value(picks, scores, 0.2) == pytest.approx(value(reference, scores, 0.2), abs=1e-6)
+
+
+def test_stars_at_one_club():
+    # the best player of every position at the same club: at most three of them fit
+    scores, prices, positions, clubs = instance(2, num_clubs=10)
+    best = [int(np.flatnonzero(positions == p)[np.argmax(scores[positions == p])]) for p in SQUAD_LIMITS]
+    clubs = clubs.copy()
+    clubs[best] = 1
+    scores = scores.copy()
+    scores[best] += 10
+    reference = select_team_highs(scores, prices, positions, clubs, verbose=False)
+    picks = select_team_dp(scores, prices, positions, clubs, verbose=False)
+    assert_valid(picks, prices, positions, clubs, 100)
+    assert value(picks, scores, 0.2) == pytest.approx(value(reference, scores, 0.2), abs=1e-6)
+
+
+def test_infeasible_budget():
+    scores, prices, positions, clubs = instance(3)
+    with pytest.raises(RuntimeError):
+        select_team_dp(scores, prices, positions, clubs, total_budget=40, verbose=False)
+
+
+def test_rejects_differentials():
+    scores, prices, positions, clubs = instance(4)
+    with pytest.raises(ValueError):
+        select_team_dp(scores, prices, positions, clubs, np.zeros(len(scores)), verbose=False)
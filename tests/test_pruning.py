@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from optimize.pruning import differential_groups, dominance_matrix, prune_dominated
+from optimize.selection import select_team_highs
+
+
+def instance(seed, num_players=300, num_clubs=20):
+    # coarse scores and prices, so there are many ties and many dominated players
+    rng = np.random.default_rng(seed)
+    positions = rng.choice([1, 2, 3, 4], size=num_players, p=(0.12, 0.33, 0.37, 0.18))
+    clubs = rng.integers(1, num_clubs + 1, size=num_players)
+    scores = np.round(2 * rng.gamma(2.0, 2.0, size=num_players)) / 2
+    prices = np.round(2 * np.clip(4 + 0.6 * scores + rng.normal(0, 1, num_players), 4, 14)) / 2
+    differentials = np.round(rng.gamma(0.8, 8, size=num_players), 1)
+    return scores, prices, positions, clubs, differentials
+
+
+def objective(scores, picks, sub_factor=0.2):
+    x, y, z = picks
+    return float(((x + y + sub_factor * z) * scores).sum())
+
+
+@pytest.mark.parametrize("num_clubs", [6, 20])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_pruning_keeps_the_optimum(seed, num_clubs):
+    scores, prices, positions, clubs, _ = instance(seed, num_clubs=num_clubs)
+    keep = prune_dominated(scores, prices, positions, clubs, verbose=False)
+    assert len(keep) < len(scores)
+    full = select_team_highs(scores, prices, positions, clubs, verbose=False)
+    pruned = select_team_highs(scores[keep], prices[keep], positions[keep], clubs[keep], verbose=False)
+    assert objective(scores[keep], pruned) == pytest.approx(objective(scores, full), abs=1e-6)
+
+
+@pytest.mark.parametrize("seed", [3, 4, 5])
+def test_pruning_by_differential_group_keeps_the_optimum(seed):
+    scores, prices, positions, clubs, differentials = instance(seed)
+    keep = prune_dominated(scores, prices, positions, clubs, groups=differential_groups(differentials),
+                           verbose=False)
+    assert len(keep) < len(scores)
+    full = select_team_highs(scores, prices, positions, clubs, differentials, verbose=False)
+    pruned = select_team_highs(scores[keep], prices[keep], positions[keep], clubs[keep], differentials[keep],
+                               verbose=False)
+    assert objective(scores[keep], pruned) == pytest.approx(objective(scores, full), abs=1e-6)
+
+
+def test_dominance_is_acyclic_with_ties():
+    scores = np.array([[1.0, 2.0], [1.0, 2.0], [1.0, 1.0], [2.0, 0.0]])
+    prices = np.array([5.0, 5.0, 5.0, 4.0])
+    D = dominance_matrix(scores, prices)
+    assert D[0, 1] and not D[1, 0]  # exact tie: the lower index wins
+    assert D[0, 2] and not D[2, 0]
+    assert not D[3, 0] and not D[0, 3]  # cheaper but worse in one gameweek
+    assert not (D & D.T).any()
+
+
+@pytest.mark.parametrize("body, pruned", [({}, True), ({"formation": "4-4-2"}, False), ("lock", False)])
+def test_service_skips_pruning_with_formation_or_lock(monkeypatch, body, pruned):
+    pytest.importorskip("aiohttp")
+    import asyncio
+    from optimize import service
+    from optimize.pool import CandidatePool
+    from optimize.synthetic import generate_league
+
+    pool = CandidatePool.from_ingest(generate_league(seed=0))
+    calls = []
+
+    def recording(*args, **kwargs):
+        calls.append(args)
+        return prune_dominated(*args, **kwargs)
+
+    monkeypatch.setattr(service, "prune_dominated", recording)
+    if body == "lock":
+        body = {"lock": [int(pool.ids[0])]}
+    svc = service.OptimizerService(pool, workers=1)
+    try:
+        result = asyncio.run(svc.solve(body))
+    finally:
+        svc.executor.shutdown()
+    assert bool(calls) == pruned
+    if "lock" in body:
+        assert body["lock"][0] in [player["id"] for player in result["players"]]
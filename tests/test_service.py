@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip("scipy")
+pytest.importorskip("aiohttp")
+
+from aiohttp.test_utils import TestClient, TestServer
+from optimize import service
+from optimize.pool import CandidatePool
+from optimize.synthetic import generate_league
+
+
+@pytest.fixture(scope="module")
+def pool():
+    return CandidatePool.from_ingest(generate_league(seed=0))
+
+
+def serve(pool, check):
+    # run ``check(svc, client)`` against a fresh service behind the aiohttp test client
+    async def main():
+        svc = service.OptimizerService(pool, workers=2)
+        try:
+            async with TestClient(TestServer(service.make_app(svc))) as client:
+                await check(svc, client)
+        finally:
+            svc.executor.shutdown()
+    asyncio.run(main())
+
+
+def held_solves(svc):
+    # make every solve wait until the returned event is set, so requests can pile up behind it
+    release = threading.Event()
+    solve = svc._solve
+
+    def held(*args):
+        assert release.wait(10)
+        return solve(*args)
+
+    svc._solve = held
+    return release
+
+
+async def until(condition):
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+def test_cache_hit(pool):
+    async def check(svc, client):
+        first = await (await client.post("/solve", json={"budget": 99.5, "lock": [63]})).json()
+        # the same request spelled differently: same canonical form, same key
+        again = await (await client.post("/solve", json={"lock": [63, 63], "budget": "99.5"})).json()
+        assert not first["cached"] and again["cached"]
+        assert again["key"] == first["key"] and again["objective"] == first["objective"]
+        stats = await (await client.get("/stats")).json()
+        assert (stats["requests"], stats["hits"], stats["solves"], stats["cached"]) == (2, 1, 1, 1)
+
+    serve(pool, check)
+
+
+def test_coalesced_requests_share_one_solve(pool):
+    async def check(svc, client):
+        release = held_solves(svc)
+        first = asyncio.create_task(client.post("/solve", json={"depth": 3}))
+        await until(lambda: svc.inflight)
+        second = asyncio.create_task(client.post("/solve", json={"depth": 3}))
+        await until(lambda: svc.counters["coalesced"])
+        release.set()
+        a, b = [await (await task).json() for task in (first, second)]
+        assert a["key"] == b["key"] and a["objective"] == b["objective"]
+        assert not a["cached"] and b["cached"]
+        assert svc.counters["solves"] == 1 and not svc.inflight
+
+    serve(pool, check)
+
+
+def test_cancelled_first_requester_releases_waiters(pool):
+    async def check(svc, client):
+        release = held_solves(svc)
+        first = asyncio.create_task(svc.solve({"depth": 4}))
+        await until(lambda: svc.inflight)
+        waiter = asyncio.create_task(svc.solve({"depth": 4}))
+        response = asyncio.create_task(client.post("/solve", json={"depth": 4}))
+        await until(lambda: svc.counters["coalesced"] == 2)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        with pytest.raises(service.SolveCancelled):
+            await waiter
+        response = await response
+        assert response.status == 503 and "retry" in (await response.json())["error"]
+        assert not svc.inflight and not len(svc.cache)
+        release.set()
+        # nothing is left behind: the same request solves afresh
+        assert not (await svc.solve({"depth": 4}))["cached"]
+
+    serve(pool, check)
+
+
+@pytest.mark.parametrize("body", [
+    {"num_gws": 0},
+    {"depth": 0},
+    {"depth": -3},
+    {"fdr_horizon": 0},
+    {"gameweek": 50},
+    {"gameweek": 26},  # finished, no fixtures left
+    {"budget": "lots"},
+    {"colour": "red"},
+    {"solver": "cbc"},
+    {"formation": "4-4-3"},
+    {"formation": "4-4-2", "solver": "pyomo"},
+    {"lock": [63], "exclude": [63]},
+    {"lock": [999999]},
+    {"budget": 40},
+    [1, 2],
+])
+def test_bad_requests(pool, body):
+    async def check(svc, client):
+        response = await client.post("/solve", json=body)
+        assert response.status == 400
+        assert (await response.json())["error"]
+
+    serve(pool, check)
+
+
+def test_invalid_json(pool):
+    async def check(svc, client):
+        response = await client.post("/solve", data="{budget: 100", headers={"Content-Type": "application/json"})
+        assert response.status == 400 and "invalid JSON" in (await response.json())["error"]
+
+    serve(pool, check)
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from optimize.selection import MAX_PER_CLUB, SQUAD_LIMITS, STARTING_LIMITS, formation_limits, select_team_highs
+from optimize.two_stage import best_lineup, formations, lineup_values, select_team_two_stage
+
+BUDGET = 100
+
+
+def instance(seed, num_players=120):
+    rng = np.random.default_rng(seed)
+    positions = rng.choice([1, 2, 3, 4], size=num_players, p=(0.12, 0.33, 0.37, 0.18))
+    clubs = rng.integers(1, 21, size=num_players)
+    scores = np.round(rng.gamma(2.0, 2.0, size=num_players) - 0.5, 2)
+    prices = np.round(np.clip(4 + 0.6 * scores + rng.normal(0, 1, num_players), 4, 14), 1)
+    return scores, prices, positions, clubs
+
+
+def value(picks, scores, sub_factor):
+    x, y, z = picks
+    return float(((x + y + sub_factor * z) * scores).sum())
+
+
+def assert_valid(picks, prices, positions, clubs, limits=STARTING_LIMITS, locked=None):
+    x, y, z = picks
+    squad = x + z
+    assert x.sum() == 11 and y.sum() == 1 and squad.max() == 1 and (y <= x).all()
+    assert (squad * prices).sum() <= BUDGET + 1e-9
+    assert all(squad[positions == p].sum() == k for p, k in SQUAD_LIMITS.items())
+    assert all(lo <= x[positions == p].sum() <= hi for p, (lo, hi) in limits.items())
+    assert np.bincount(clubs[squad > 0]).max() <= MAX_PER_CLUB
+    assert locked is None or squad[locked].all()
+
+
+def solve_both(scores, prices, positions, clubs, **kw):
+    kw = {"total_budget": BUDGET, "verbose": False, **kw}
+    return (select_team_two_stage(scores, prices, positions, clubs, None, **kw),
+            select_team_highs(scores, prices, positions, clubs, None, **kw))
+
+
+@pytest.mark.parametrize("sub_factor", [0.0, 0.2, 0.5, 1.0])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matches_three_variable(seed, sub_factor):
+    scores, prices, positions, clubs = instance(seed)
+    two_stage, reference = solve_both(scores, prices, positions, clubs, sub_factor=sub_factor)
+    assert_valid(two_stage, prices, positions, clubs)
+    assert value(two_stage, scores, sub_factor) == pytest.approx(value(reference, scores, sub_factor), abs=1e-6)
+
+
+@pytest.mark.parametrize("formation", ["4-4-2", "3-5-2", "5-3-2", "4-3-3"])
+def test_fixed_formation(formation):
+    scores, prices, positions, clubs = instance(3)
+    limits = formation_limits(formation)
+    two_stage, reference = solve_both(scores, prices, positions, clubs, sub_factor=0.2, starting_limits=limits)
+    assert_valid(two_stage, prices, positions, clubs, limits)
+    assert value(two_stage, scores, 0.2) == pytest.approx(value(reference, scores, 0.2), abs=1e-6)
+
+
+@pytest.mark.parametrize("seed", [4, 5])
+def test_locked_players(seed):
+    scores, prices, positions, clubs = instance(seed)
+    # the two worst players, so the lock actually binds
+    locked = np.argsort(scores)[:2]
+    two_stage, reference = solve_both(scores, prices, positions, clubs, sub_factor=0.2, locked=locked)
+    assert_valid(two_stage, prices, positions, clubs, locked=locked)
+    assert value(two_stage, scores, 0.2) == pytest.approx(value(reference, scores, 0.2), abs=1e-6)
+
+
+def test_lineup_values_match_brute_force():
+    rng = np.random.default_rng(6)
+    squads = rng.normal(3, 2, size=(50, 15))
+    values, best = lineup_values(squads, 0.2)
+    forms = formations()
+    for squad, v, b in zip(squads, values, best):
+        blocks = np.split(squad, np.cumsum(list(SQUAD_LIMITS.values()))[:-1])
+        totals = [sum(np.sort(block)[::-1][:k].sum() for block, k in zip(blocks, f)) for f in forms]
+        assert b == int(np.argmax(totals))
+        assert v == pytest.approx(0.2 * squad.sum() + 0.8 * max(totals) + squad.max())
+
+
+def test_best_lineup_picks_a_valid_eleven():
+    scores = instance(7, 15)[0]
+    positions = np.repeat([1, 2, 3, 4], list(SQUAD_LIMITS.values()))
+    x, y, z = best_lineup(scores, positions)
+    assert x.sum() == 11 and (x + z == 1).all()
+    assert y.sum() == 1 and scores[y > 0][0] == scores[x > 0].max()
+
+
+def test_rejects_differentials_and_bad_sub_factor():
+    scores, prices, positions, clubs = instance(8)
+    with pytest.raises(ValueError):
+        select_team_two_stage(scores, prices, positions, clubs, np.zeros(len(scores)), verbose=False)
+    with pytest.raises(ValueError):
+        select_team_two_stage(scores, prices, positions, clubs, sub_factor=1.5, verbose=False)